@@ -0,0 +1,277 @@
+"""Accuracy and latency benchmark for the message classifier backends.
+
+Runs every requested classifier type over a labelled evaluation corpus and writes a JSON
+report with accuracy, confusion matrix, p50/p95/p99 latency, throughput per batch size and
+peak RSS. Each classifier type runs in its own process so memory figures are not mixed up.
+
+The rule and embedding tiers are built from labelled examples, so they are never scored
+on those examples: with --corpus (a JSONL file of {"message": ..., "category": ...} lines)
+the tiers are built from CATEGORY_EXAMPLES and scored on the file; without it a stratified
+share of CATEGORY_EXAMPLES is held out for scoring and the tiers are built from the rest.
+Keep the corpus out of CLASSIFIER_EXTRA_EXAMPLES_PATH.
+
+Usage:
+    python scripts/benchmark_classifiers.py [--types bart,embedding,gemini] [--corpus FILE]
+        [--batch-sizes 1,8,32] [--cascade rules,embedding,bart,gemini] [--online] [--output FILE]
+
+Gemini is replaced by a local stub with simulated latency unless --online is given. The
+stub cannot see the labels, so messages it decides are left out of the accuracy figures.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.constants import CATEGORIES, CATEGORY_EXAMPLES
+from src.services.llm_providers import LLMProvider
+from src.services.llm_routing import LLMRoute
+
+DEFAULT_TYPES = ["bart", "bart_onnx", "embedding", "gemini"]
+
+class StubGeminiModel(LLMProvider):
+    """Offline stand-in for the Gemini provider: answers "Others" after a simulated delay, blind to the labels."""
+
+    def __init__(self, latency_ms: float = 400, jitter_ms: float = 150, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+
+    def generate(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        delay_ms = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms))
+        time.sleep(delay_ms / 1000)
+        return "Others"
+
+    async def generate_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        return await asyncio.to_thread(self.generate, prompt, system_instruction, route)
+
+    async def stream_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> AsyncIterator[str]:
+        return self._chunks(await self.generate_async(prompt, system_instruction, route))
+
+    @staticmethod
+    async def _chunks(text: str) -> AsyncIterator[str]:
+        yield text
+
+def split_examples(
+    examples: Dict[str, List[str]],
+    holdout_fraction: float = 1 / 3,
+    seed: int = 0
+) -> Tuple[Dict[str, List[str]], List[Tuple[str, str]]]:
+    """Hold out a share of each category for scoring; return (training examples, held-out pairs).
+
+    Every category keeps at least one training example and, when it has two or more,
+    gives at least one to the held-out set.
+    """
+    rng = random.Random(seed)
+    training: Dict[str, List[str]] = {}
+    held_out: List[Tuple[str, str]] = []
+    for category, messages in examples.items():
+        shuffled = list(messages)
+        rng.shuffle(shuffled)
+        count = min(len(shuffled) - 1, max(1, round(len(shuffled) * holdout_fraction)))
+        training[category] = shuffled[count:]
+        held_out.extend((message, category) for message in shuffled[:count])
+    return training, held_out
+
+def build_corpus(path: Optional[str] = None) -> Tuple[Dict[str, List[str]], List[Tuple[str, str]]]:
+    """Return (training examples, evaluation pairs): CATEGORY_EXAMPLES and the JSONL file, or a held-out split."""
+    if path is None:
+        return split_examples(CATEGORY_EXAMPLES)
+
+    from src.services.embedding_classifier import load_labelled_examples
+
+    evaluation = load_labelled_examples(path)
+    return dict(CATEGORY_EXAMPLES), [
+        (message, category) for category, messages in evaluation.items() for message in messages
+    ]
+
+def build_classifier(
+    classifier_type: str,
+    cascade: Optional[List[str]],
+    training_examples: Dict[str, List[str]],
+    online: bool,
+    stub_latency_ms: float
+):
+    """Create the classifier under test with its example-based tiers built from ``training_examples`` only."""
+    from src.services.message_classifier import MessageClassifier
+    from src.services.rule_classifier import RuleClassifier
+
+    is_cascade = classifier_type == "cascade"
+    # No cache so every message pays for inference; rules only when the cascade asks for them
+    classifier = MessageClassifier(
+        "gemini" if is_cascade else classifier_type,
+        rules=RuleClassifier(examples=training_examples) if is_cascade and "rules" in cascade else None,
+        cascade=cascade if is_cascade else None
+    )
+    if hasattr(classifier, "embedding_classifier"):
+        embedding = classifier.embedding_classifier
+        embedding.centroids = embedding.build_centroids(training_examples)
+    if not online and hasattr(classifier, "provider"):
+        classifier.provider = StubGeminiModel(latency_ms=stub_latency_ms)
+    return classifier
+
+def score(
+    outcomes: List[Tuple[str, str, str]],
+    unscored_tiers: Tuple[str, ...] = ()
+) -> Dict:
+    """Accuracy and confusion matrix over (expected, predicted, tier) outcomes, skipping ``unscored_tiers``."""
+    categories = list(CATEGORIES)
+    confusion = {expected: {predicted: 0 for predicted in categories} for expected in categories}
+    scored = [(expected, predicted) for expected, predicted, tier in outcomes if tier not in unscored_tiers]
+    for expected, predicted in scored:
+        confusion[expected][predicted] += 1
+    correct = sum(1 for expected, predicted in scored if expected == predicted)
+    return {
+        "scored_messages": len(scored),
+        # None when every message was decided by an unscored (stubbed) tier
+        "accuracy": correct / len(scored) if scored else None,
+        "confusion_matrix": confusion
+    }
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "mean": float(np.mean(samples)),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(np.max(samples))
+    }
+
+def run_benchmark(
+    classifier_type: str,
+    training_examples: Dict[str, List[str]],
+    corpus: List[Tuple[str, str]],
+    batch_sizes: List[int],
+    cascade: Optional[List[str]],
+    online: bool,
+    stub_latency_ms: float
+) -> Dict:
+    """Benchmark one classifier type on ``corpus``; meant to run in a fresh process."""
+    started_at = time.perf_counter()
+    classifier = build_classifier(classifier_type, cascade, training_examples, online, stub_latency_ms)
+    load_seconds = time.perf_counter() - started_at
+
+    # Warm-up so lazy initialization does not skew the first latency sample
+    classifier.classify_with_details(corpus[0][0])
+
+    outcomes = []
+    latencies_ms = []
+    tiers: Dict[str, int] = {}
+    for message, expected in corpus:
+        call_started_at = time.perf_counter()
+        result = classifier.classify_with_details(message)
+        latencies_ms.append((time.perf_counter() - call_started_at) * 1000)
+        outcomes.append((expected, result["category"], result["tier"]))
+        tiers[result["tier"]] = tiers.get(result["tier"], 0) + 1
+
+    throughput = {}
+    messages = [message for message, _ in corpus]
+    for batch_size in batch_sizes:
+        # Repeat the corpus so even large batches are full
+        repeated = (messages * (batch_size // len(messages) + 1))[:max(batch_size, len(messages))]
+        batch_started_at = time.perf_counter()
+        for start in range(0, len(repeated), batch_size):
+            classifier.classify_batch_with_details(repeated[start:start + batch_size])
+        elapsed = time.perf_counter() - batch_started_at
+        throughput[str(batch_size)] = len(repeated) / elapsed
+
+    return {
+        "messages": len(corpus),
+        "load_seconds": load_seconds,
+        **score(outcomes, () if online else ("gemini",)),
+        "latency_ms": _percentiles(latencies_ms),
+        "throughput_messages_per_second": throughput,
+        "decided_by_tier": tiers,
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    }
+
+def run_isolated(classifier_type: str, **kwargs) -> Dict:
+    """Run a benchmark in a spawned process; failures (missing dependencies, models) are reported, not raised."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        try:
+            return executor.submit(run_benchmark, classifier_type, **kwargs).result()
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--types", default=",".join(DEFAULT_TYPES), help="Comma-separated classifier types")
+    parser.add_argument("--corpus", help="JSONL file of labelled messages to score on (default: held-out examples)")
+    parser.add_argument("--batch-sizes", default="1,8,32", help="Comma-separated batch sizes for throughput")
+    parser.add_argument("--cascade", help="Also benchmark this comma-separated cascade of tiers")
+    parser.add_argument("--online", action="store_true", help="Call the real Gemini API instead of the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=400, help="Mean latency of the Gemini stub")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    training_examples, corpus = build_corpus(args.corpus)
+    types = [name.strip() for name in args.types.split(",") if name.strip()]
+    cascade = [tier.strip() for tier in args.cascade.split(",")] if args.cascade else None
+    if cascade:
+        types.append("cascade")
+
+    results = {}
+    for classifier_type in types:
+        print(f"Benchmarking {classifier_type}...", file=sys.stderr)
+        results[classifier_type] = run_isolated(
+            classifier_type,
+            training_examples=training_examples,
+            corpus=corpus,
+            batch_sizes=[int(size) for size in args.batch_sizes.split(",")],
+            cascade=cascade,
+            online=args.online,
+            stub_latency_ms=args.stub_latency_ms
+        )
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "corpus": args.corpus or "held-out CATEGORY_EXAMPLES",
+            "corpus_size": len(corpus),
+            "gemini": "online" if args.online else "stub",
+            "cascade": cascade
+        },
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
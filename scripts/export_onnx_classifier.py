@@ -0,0 +1,41 @@
+"""Export the zero-shot NLI classifier to an int8-quantized ONNX model.
+
+Usage:
+    python scripts/export_onnx_classifier.py [--output-dir DIR] [--force] [--verify]
+
+Then set CLASSIFIER_TYPE=bart_onnx (and ONNX_MODEL_DIR if DIR differs from the default).
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import settings
+from src.core.constants import CATEGORY_CONFIDENCE_THRESHOLDS
+from src.services.onnx_classifier import OnnxNLIClassifier, export_quantized_model, verify_parity
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output-dir", default=settings.ONNX_MODEL_DIR, help="Where to cache the exported artifacts")
+    parser.add_argument("--force", action="store_true", help="Re-export even if artifacts exist")
+    parser.add_argument("--verify", action="store_true", help="Check parity with PyTorch on CATEGORY_EXAMPLES")
+    args = parser.parse_args()
+
+    model_path = export_quantized_model(args.output_dir, force=args.force)
+    print(f"Quantized model: {model_path}")
+
+    if args.verify:
+        classifier = OnnxNLIClassifier(
+            args.output_dir,
+            intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+            inter_op_threads=settings.ONNX_INTER_OP_THREADS
+        )
+        report = verify_parity(classifier, CATEGORY_CONFIDENCE_THRESHOLDS)
+        print(json.dumps(report, indent=2))
+        if report["decision_agreement"] < 1.0:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Per-intent report of the prompt tokens sent to Gemini per request, before and after precompiled prompts.
+
+"before" is the indented f-string prompt (intent context, safety guidelines,
+preferences, history and message) that used to be rebuilt and sent on every call.
+"after" is what AIService now sends: only the dynamic part when the SDK supports
+system instructions, otherwise the precompiled static prefix plus the dynamic part.
+"dynamic_tokens" is the per-request part alone, i.e. "after" once the SDK is upgraded.
+
+Usage:
+    python scripts/prompt_token_report.py [--history-turns 4] [--api] [--output FILE]
+
+Token counts are estimated (about four characters per token) unless --api is given,
+in which case Gemini's count_tokens is called (needs GEMINI_API_KEY).
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.constants import CATEGORY_EXAMPLES
+from src.core.message_contexts import MESSAGE_CONTEXTS
+from src.core.prompt_safety import PromptSafety
+from src.services.intent_prompts import estimate_tokens, render_dynamic_prompt, render_static_prompt
+from src.services.llm_providers import SYSTEM_INSTRUCTION_SUPPORTED
+
+SAMPLE_PREFERENCES = {"dietary_restrictions": "vegetarian", "cuisine": "italian", "budget": "not_set"}
+
+def sample_history(turns: int) -> List[Dict[str, str]]:
+    history = []
+    for index in range(turns):
+        history.append({"role": "user", "message": f"Can you suggest dinner idea number {index + 1}?"})
+        history.append({"role": "assistant", "message": "Try a tomato and basil pasta with garlic bread on the side."})
+    return history
+
+def format_history(history: List[Dict[str, str]]) -> str:
+    return "\n".join(f"{msg['role'].capitalize()}: {msg['message']}" for msg in history)
+
+def legacy_prompt(message_type: str, sanitized: str, history_text: str, preferences: Dict[str, str]) -> str:
+    """The prompt as AIService built it before intent prompts were precompiled."""
+    context = MESSAGE_CONTEXTS[message_type]
+    preferences_text = "\nUser Preferences:\n" + "\n".join(
+        f"- {pref}: {value}" for pref, value in preferences.items() if value != "not_set"
+    )
+    return f"""
+        {context['persona']}
+        
+        Task: {context['task']}
+        Context: {context['context']}
+        
+        References to consider:
+        {chr(10).join(f"- {ref}" for ref in context['references'])}
+        
+        {preferences_text}
+        
+        Chat History:
+        {history_text or 'No previous conversation.'}
+        
+        User Message: {sanitized}
+        
+        {PromptSafety.add_safety_context("")}
+        
+        Please provide a helpful response considering the above context, references, and user preferences.
+        """
+
+def build_report(history_turns: int, count: Callable[[str], int]) -> Dict[str, Dict[str, int]]:
+    history_text = format_history(sample_history(history_turns)) or None
+    report = {}
+    for message_type in MESSAGE_CONTEXTS:
+        examples = CATEGORY_EXAMPLES.get(message_type) or ["What can you help me with?"]
+        sanitized = PromptSafety.sanitize_prompt(examples[0])
+        static_prompt = render_static_prompt(message_type)
+        dynamic_prompt = render_dynamic_prompt(sanitized, history_text, SAMPLE_PREFERENCES)
+        before = count(legacy_prompt(message_type, sanitized, history_text, SAMPLE_PREFERENCES))
+        dynamic = count(dynamic_prompt)
+        after = dynamic if SYSTEM_INSTRUCTION_SUPPORTED else count(f"{static_prompt}\n\n{dynamic_prompt}")
+        report[message_type] = {
+            "static_tokens": count(static_prompt),
+            "dynamic_tokens": dynamic,
+            "before_tokens": before,
+            "after_tokens": after,
+            "saved_tokens": before - after
+        }
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history-turns", type=int, default=4, help="user/assistant exchanges in the sample history")
+    parser.add_argument("--api", action="store_true", help="count tokens with Gemini's count_tokens")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    count = estimate_tokens
+    if args.api:
+        from src.core.config import settings
+        from src.services.llm_providers import GeminiProvider
+
+        count = GeminiProvider(settings.GEMINI_API_KEY, settings.GEMINI_MODEL_NAME).count_tokens
+
+    report = {
+        "counting": "count_tokens" if args.api else "estimate",
+        "system_instruction": SYSTEM_INSTRUCTION_SUPPORTED,
+        "intents": build_report(args.history_turns, count)
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,57 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 
 from src.core.config import settings
+from src.core.database import db
+from src.core.deadline import deadline_after, deadline_scope
+from src.core.lazy import all_services_ready, service_status, warm_up_services
 from src.core.logging import get_logger
+from src.core.metrics import metrics
 from src.services.chat_service import chat_service
+from src.services.classification_batcher import classification_batcher
+from src.services.inference_pool import InferencePoolFull, inference_pool
+from src.services.job_queue import job_queue
+from src.services.shopping_list_service import shopping_list_service
 from src.services.user_preferences import user_preferences
 
 logger = get_logger(__name__)
 
+async def _warm_up() -> None:
+    services = await asyncio.to_thread(warm_up_services)
+    logger.info("Service warm-up finished", services=services)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up models and the database in the background so the server binds immediately."""
+    warm_up_task = None
+    job_queue_task = None
+    if settings.WARM_UP_ON_STARTUP:
+        warm_up_task = asyncio.create_task(_warm_up())
+    if settings.BACKGROUND_JOBS_ENABLED:
+        # Started eagerly so durable jobs left by a previous run are picked up
+        job_queue_task = asyncio.create_task(job_queue.start())
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    if job_queue_task is not None:
+        await job_queue.stop()
+    classification_batcher.stop()
+    if inference_pool.is_ready:
+        inference_pool.shutdown()
+    db.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -33,9 +72,23 @@ class PreferenceRequest(BaseModel):
     preference: str = Field(..., min_length=1, description="Preference name")
     value: str = Field(..., min_length=1, description="Preference value")
 
+async def _pool_message_type(message: str, deadline: Optional[float]) -> Optional[str]:
+    """Classify in the worker processes when the inference pool is enabled, within the request's deadline."""
+    if not settings.INFERENCE_POOL_ENABLED:
+        return None
+    # get() blocks until warm-up has started the workers, so keep it off the loop
+    pool = await run_in_threadpool(inference_pool.get)
+    with deadline_scope(deadline):
+        return await pool.classify(message)
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post(f"{settings.API_V1_STR}/chat")
 async def chat(request: ChatRequest) -> Dict[str, Any]:
     """Handle chat requests and return bot response with shopping list."""
+    # Every stage below shares this budget
+    deadline = deadline_after(settings.CHAT_REQUEST_DEADLINE_SECONDS)
     try:
         logger.info(
             "Received chat request",
@@ -44,16 +97,33 @@ async def chat(request: ChatRequest) -> Dict[str, Any]:
         )
         
         # Get user preferences
-        user_prefs = user_preferences.get_all_preferences(request.user_id)
+        user_prefs = await run_in_threadpool(user_preferences.get_all_preferences, request.user_id)
+        
+        message_type = await _pool_message_type(request.user_message, deadline)
         
-        response = chat_service.process_message(
+        # LLM calls are awaited and MongoDB calls run in worker threads, so the
+        # event loop stays free while generations are in flight
+        service = await run_in_threadpool(chat_service.get)
+        response = await service.process_message_async(
             request.user_id,
             request.user_message,
-            user_preferences=user_prefs
+            user_preferences=user_prefs,
+            message_type=message_type,
+            deadline=deadline
         )
         
         return response
         
+    except InferencePoolFull as e:
+        logger.warning(
+            "Inference pool full, rejecting chat request",
+            user_id=request.user_id,
+            error=str(e)
+        )
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly"
+        )
     except ValueError as e:
         logger.error(
             "Validation error in chat request",
@@ -75,6 +145,78 @@ async def chat(request: ChatRequest) -> Dict[str, Any]:
             detail="Internal server error"
         )
 
+@app.post(f"{settings.API_V1_STR}/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Stream the bot response as server-sent events, ending with the updated shopping list."""
+    started_at = time.perf_counter()
+    deadline = deadline_after(settings.CHAT_REQUEST_DEADLINE_SECONDS)
+    try:
+        logger.info(
+            "Received streaming chat request",
+            user_id=request.user_id,
+            message_length=len(request.user_message)
+        )
+        
+        user_prefs = await run_in_threadpool(user_preferences.get_all_preferences, request.user_id)
+        message_type = await _pool_message_type(request.user_message, deadline)
+        service = await run_in_threadpool(chat_service.get)
+        
+    except InferencePoolFull as e:
+        logger.warning(
+            "Inference pool full, rejecting chat request",
+            user_id=request.user_id,
+            error=str(e)
+        )
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly"
+        )
+    except Exception as e:
+        logger.error(
+            "Error processing streaming chat request",
+            user_id=request.user_id,
+            error=str(e)
+        )
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+    
+    async def events():
+        first_event = True
+        async for event in service.stream_message_async(
+            request.user_id,
+            request.user_message,
+            user_preferences=user_prefs,
+            message_type=message_type,
+            deadline=deadline
+        ):
+            if first_event:
+                # Time to first byte is what users perceive for long answers
+                metrics.observe("chat_stream_ttfb_ms", (time.perf_counter() - started_at) * 1000)
+                first_event = False
+            yield _sse(event['event'], event['data'])
+        metrics.observe("chat_stream_duration_ms", (time.perf_counter() - started_at) * 1000)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get(f"{settings.API_V1_STR}/shopping-list/{{user_id}}")
+async def get_shopping_list(user_id: str) -> Dict[str, Any]:
+    """Get a user's shopping list, e.g. after a background update has finished."""
+    try:
+        items = await run_in_threadpool(shopping_list_service.get_shopping_list, user_id)
+        return {"user_id": user_id, "shopping_list": items}
+    except Exception as e:
+        logger.error(f"Error getting shopping list for user {user_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
 @app.get(f"{settings.API_V1_STR}/preferences/{{user_id}}")
 async def get_user_preferences(user_id: str) -> Dict[str, str]:
     """Get all preferences for a user."""
@@ -118,7 +260,28 @@ async def clear_user_preferences(user_id: str) -> Dict[str, bool]:
             detail="Internal server error"
         )
 
+@app.get(f"{settings.API_V1_STR}/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """Expose in-process service metrics."""
+    return metrics.snapshot()
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """Health check endpoint."""
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """Readiness endpoint: 200 once models and the database are usable, 503 while warming up."""
+    components = service_status()
+    if all_services_ready():
+        status = "ready"
+    elif "failed" in components.values():
+        status = "degraded"
+    else:
+        status = "starting"
+    return JSONResponse(
+        status_code=200 if status == "ready" else 503,
+        content={"status": status, "components": components}
+    )
+ 
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Deque, Iterator, Tuple
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Exported as the circuit_breaker_state gauge
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops calling a failing or slow dependency for a while, then probes it.
+
+    Outcomes of the last ``window_size`` calls are kept; once at least ``min_calls``
+    are recorded the breaker opens if the failure rate reaches ``failure_rate`` or the
+    share of calls slower than ``slow_call_ms`` reaches ``slow_call_rate``. After
+    ``open_seconds`` it lets ``half_open_calls`` probes through: it closes if they all
+    succeed quickly and opens again on the first bad one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_ms: float = 10000,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30,
+        half_open_calls: int = 3,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (failed, slow) per call
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[CLOSED], breaker=name)
+
+    @property
+    def state(self) -> str:
+        if not self.enabled:
+            return CLOSED
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def check(self) -> None:
+        """Raise CircuitOpenError while open; cheap enough to call before queueing for the dependency."""
+        if self.state == OPEN:
+            metrics.increment("circuit_breaker_rejected_total", breaker=self.name)
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run one call through the breaker, recording its outcome and latency."""
+        self._admit()
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self._record(failed=True, latency_ms=(time.perf_counter() - started_at) * 1000)
+            raise
+        self._record(failed=False, latency_ms=(time.perf_counter() - started_at) * 1000)
+
+    @asynccontextmanager
+    async def guard_async(self) -> AsyncIterator[None]:
+        """Async variant of guard; a call cancelled after running slowly (e.g. by a deadline) counts as failed."""
+        self._admit()
+        started_at = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            latency_ms = (time.perf_counter() - started_at) * 1000
+            self._record(failed=latency_ms >= self.slow_call_ms, latency_ms=latency_ms)
+            raise
+        except Exception:
+            self._record(failed=True, latency_ms=(time.perf_counter() - started_at) * 1000)
+            raise
+        self._record(failed=False, latency_ms=(time.perf_counter() - started_at) * 1000)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._outcomes.clear()
+            self._transition(CLOSED)
+
+    def _admit(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes_started < self.half_open_calls:
+                self._probes_started += 1
+                return
+        metrics.increment("circuit_breaker_rejected_total", breaker=self.name)
+        raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def _record(self, failed: bool, latency_ms: float) -> None:
+        if not self.enabled:
+            return
+        slow = latency_ms >= self.slow_call_ms
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN)
+                else:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_calls:
+                        self._outcomes.clear()
+                        self._transition(CLOSED)
+                return
+            if self._state == OPEN:
+                # A call admitted before the breaker opened
+                return
+
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for was_failed, _ in self._outcomes if was_failed)
+            slow_calls = sum(1 for _, was_slow in self._outcomes if was_slow)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._transition(OPEN)
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        """Change state; caller holds the lock."""
+        if state == self._state:
+            return
+        logger.warning("Circuit breaker state changed", breaker=self.name, previous=self._state, state=state)
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        if state == HALF_OPEN:
+            self._probes_started = self._probes_succeeded = 0
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[state], breaker=self.name)
+        metrics.increment("circuit_breaker_transitions_total", breaker=self.name, state=state)
+
+# Shared by every Gemini call in the process (chat responses and classification)
+llm_breaker = CircuitBreaker(
+    "llm",
+    window_size=settings.LLM_BREAKER_WINDOW,
+    min_calls=settings.LLM_BREAKER_MIN_CALLS,
+    failure_rate=settings.LLM_BREAKER_FAILURE_RATE,
+    slow_call_ms=settings.LLM_BREAKER_SLOW_CALL_MS,
+    slow_call_rate=settings.LLM_BREAKER_SLOW_CALL_RATE,
+    open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+    half_open_calls=settings.LLM_BREAKER_HALF_OPEN_CALLS,
+    enabled=settings.LLM_BREAKER_ENABLED
+)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -14,10 +14,109 @@ class Settings(BaseSettings):
     # AI Model Settings
     GEMINI_API_KEY: str = "dummy_key"  # Default for testing
     GEMINI_MODEL_NAME: str = "gemini-1.5-pro"
-    CLASSIFIER_TYPE: str = "bart"  # Options: "bart" or "gemini"
+    # Model and generation config per MESSAGE_CONTEXTS intent and internal task ("classification",
+    # "extraction", "summarization") as JSON; unlisted routes use GEMINI_MODEL_NAME with the model's defaults
+    LLM_ROUTES: Dict[str, Dict[str, Any]] = {
+        "Item Addition type": {"model": "gemini-1.5-flash", "max_output_tokens": 128},
+        "Update Cart type": {"model": "gemini-1.5-flash", "max_output_tokens": 128},
+        "Item Information type": {"model": "gemini-1.5-flash", "max_output_tokens": 512},
+        "Others": {"model": "gemini-1.5-flash", "max_output_tokens": 256},
+        "classification": {"model": "gemini-1.5-flash", "max_output_tokens": 8, "temperature": 0},
+        "extraction": {"model": "gemini-1.5-flash", "max_output_tokens": 256, "temperature": 0},
+        "summarization": {"model": "gemini-1.5-flash", "max_output_tokens": 400, "temperature": 0.2}
+    }
+    LLM_PROVIDER: str = "gemini"  # Options: "gemini" or "stub" (offline canned answers for load tests and CI)
+    LLM_STUB_RESPONSES: Dict[str, str] = {}  # Stub: regex -> answer template (JSON), tried before the built-in ones
+    LLM_STUB_LATENCY_MS: float = 800.0  # Stub: median time to the first token
+    LLM_STUB_LATENCY_DISTRIBUTION: str = "lognormal"  # Stub: "fixed", "uniform" or "lognormal"
+    LLM_STUB_LATENCY_SPREAD: float = 0.5  # Stub: sigma for lognormal, +/- fraction of the median for uniform
+    LLM_STUB_TOKENS_PER_SECOND: float = 60.0  # Stub: output rate after the first token; 0 answers at once
+    LLM_STUB_ERROR_RATE: float = 0.0  # Stub: share of calls that fail, to exercise retries and the breaker
+    LLM_STUB_SEED: int = 0  # Stub: seed for the latency and failure draws
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_MAX_WAIT_SECONDS: float = 10.0  # Cap on the jittered backoff between async attempts
+    LLM_DEADLINE_SECONDS: float = 30.0  # Overall budget for one async generation, retries included
+    CHAT_REQUEST_DEADLINE_SECONDS: float = 45.0  # Budget for a whole chat request, shared by every stage; 0 disables
+    LLM_HEDGING_ENABLED: bool = False  # Duplicate interactive generations still running after the observed latency percentile
+    LLM_HEDGE_PERCENTILE: float = 95.0  # Per-intent latency percentile after which the duplicate is sent
+    LLM_HEDGE_MIN_SAMPLES: int = 50  # Latency samples per intent needed before hedging starts
+    LLM_SINGLE_FLIGHT_ENABLED: bool = True  # Concurrent identical prompts share one upstream call
+    LLM_SCHEDULER_ENABLED: bool = True  # Admission control for every Gemini call in the process
+    LLM_MAX_CONCURRENCY: int = 32  # Gemini calls running at once per process
+    LLM_REQUESTS_PER_MINUTE: int = 0  # This process's share of the requests quota; 0 disables the bucket
+    LLM_TOKENS_PER_MINUTE: int = 0  # This process's share of the tokens quota; 0 disables the bucket
+    LLM_EXPECTED_OUTPUT_TOKENS: int = 400  # Added to the prompt estimate when charging the tokens bucket
+    LLM_SCHEDULER_MAX_QUEUE: int = 1000  # Calls allowed to wait for a slot before rejecting
+    LLM_SCHEDULER_MAX_WAIT_SECONDS: float = 30.0  # How long blocking (thread) callers wait for a slot
+    LLM_BREAKER_ENABLED: bool = True  # Fail fast with degraded answers while Gemini is failing or slow
+    LLM_BREAKER_WINDOW: int = 20  # Recent Gemini calls the error and slow-call rates are computed over
+    LLM_BREAKER_MIN_CALLS: int = 10  # Calls needed in the window before the breaker can open
+    LLM_BREAKER_FAILURE_RATE: float = 0.5  # Share of failed calls that opens the breaker
+    LLM_BREAKER_SLOW_CALL_MS: float = 15000  # Calls at least this slow count as slow
+    LLM_BREAKER_SLOW_CALL_RATE: float = 0.8  # Share of slow calls that opens the breaker
+    LLM_BREAKER_OPEN_SECONDS: float = 30.0  # How long the breaker stays open before probing
+    LLM_BREAKER_HALF_OPEN_CALLS: int = 3  # Probe calls that must succeed to close the breaker
+    RESPONSE_CACHE_ENABLED: bool = False  # Reuse answers to history-independent messages
+    RESPONSE_CACHE_TTL_SECONDS: Dict[str, float] = {"Item Information type": 3600, "Recipe type": 86400}  # Cached intents (JSON)
+    RESPONSE_CACHE_HISTORY_INDEPENDENT: List[str] = ["Item Information type"]  # Cached even when the user has chat history
+    RESPONSE_CACHE_SIZE: int = 5000  # In-process LRU entries
+    RESPONSE_CACHE_SHARED: bool = False  # Also share entries across processes through a MongoDB TTL collection
+    SEMANTIC_CACHE_ENABLED: bool = False  # Reuse cached answers for paraphrases (embeds with EMBEDDING_MODEL_NAME)
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9  # Cosine similarity a cached message needs to be reused
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 50000  # Least recently used intent/preference partitions are evicted beyond this
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_PARTITION: int = 2000  # Bounds the rows scanned per lookup; oldest overwritten first
+    CLASSIFIER_TYPE: str = "bart"  # Options: "bart", "bart_onnx", "gemini" or "embedding"
+    BART_CLASSIFICATION_MODE: str = "single_pass"  # Options: "single_pass" or "per_category"
+    CLASSIFIER_BATCHING_ENABLED: bool = True
+    CLASSIFIER_BATCH_MAX_SIZE: int = 32
+    CLASSIFIER_BATCH_MAX_WAIT_MS: float = 5.0
+    CLASSIFIER_BATCH_QUEUE_SIZE: int = 1024
+    CLASSIFIER_CACHE_SIZE: int = 10000  # 0 disables the classification cache
+    CLASSIFIER_CACHE_TTL_SECONDS: float = 3600
+    CLASSIFIER_CACHE_PRELOAD: bool = True  # Seed the cache from CATEGORY_EXAMPLES
+    CLASSIFIER_RULES_ENABLED: bool = True  # Pattern/keyword fast path before the model
+    CLASSIFIER_EXTRA_RULES: Dict[str, List[str]] = {}  # Extra regexes per category (JSON)
+    EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_TEMPERATURE: float = 0.05  # Softmax temperature over centroid similarities
+    CLASSIFIER_EXTRA_EXAMPLES_PATH: Optional[str] = None  # JSONL of {"message", "category"}
+    ONNX_MODEL_DIR: str = "models/bart-large-mnli-onnx"  # Output of scripts/export_onnx_classifier.py
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 lets ONNX Runtime choose
+    ONNX_INTER_OP_THREADS: int = 0
+    INFERENCE_POOL_ENABLED: bool = False  # Classify in worker processes instead of the API process
+    INFERENCE_POOL_WORKERS: int = 2  # Each worker holds its own copy of the model
+    INFERENCE_POOL_MAX_PENDING: int = 64  # Classifications allowed in flight before rejecting
+    INFERENCE_POOL_TIMEOUT_SECONDS: float = 5.0
+    INFERENCE_WORKER_TORCH_THREADS: int = 1  # torch intra-op threads per worker (0 keeps the default)
+    CLASSIFIER_CASCADE: List[str] = []  # e.g. ["rules", "embedding", "bart", "gemini"]; empty uses CLASSIFIER_TYPE alone
+    CLASSIFIER_CASCADE_MARGIN: float = 0.1  # Score above the category threshold a non-final tier needs to decide
+    CLASSIFIER_CASCADE_MARGINS: Dict[str, float] = {}  # Per-tier overrides of CLASSIFIER_CASCADE_MARGIN
+    INGREDIENT_EXTRACTION_MAX_TURNS: int = 5  # Unextracted exchanges sent per extraction (bounds catch-up)
+    INGREDIENT_EXTRACTOR: str = "local"  # Options: "local" (lexicon) or "llm" (Gemini for every turn)
+    INGREDIENT_LLM_FALLBACK: bool = True  # Ask Gemini about item-like phrases the lexicon does not know
+    INGREDIENT_EXTRA_SYNONYMS: Dict[str, List[str]] = {}  # Extra canonical name -> synonyms (JSON)
     PREFERENCE_MODEL_TYPE: str = "bart"  # Options: "bart" or "gemini"
     STRUCTURED_PROMPTING_API_KEY: str = "dummy_key"  # Default for testing
     
+    # Chat History Settings
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2000  # Prompt tokens for chat history, summary included
+    CHAT_HISTORY_MAX_TURNS: int = 50  # Most recent exchanges read when filling the budget
+    CHAT_SUMMARY_ENABLED: bool = True  # Fold exchanges that leave the window into a rolling per-user summary
+    CHAT_SUMMARY_MAX_TOKENS: int = 300  # Reserved out of CHAT_HISTORY_TOKEN_BUDGET for the summary
+    CHAT_SUMMARY_BATCH_TURNS: int = 20  # Exchanges folded per update (bounds catch-up)
+    
+    # Background Job Settings
+    BACKGROUND_JOBS_ENABLED: bool = False  # Store, extract and update the list after the response is sent
+    JOB_QUEUE_WORKERS: int = 4
+    JOB_QUEUE_MAX_ATTEMPTS: int = 5
+    JOB_QUEUE_RETRY_BASE_SECONDS: float = 1.0  # Doubles after every failed attempt
+    JOB_QUEUE_DURABLE: bool = False  # Persist jobs in MongoDB so they survive restarts
+    JOB_QUEUE_LEASE_SECONDS: float = 60.0  # A claimed durable job is retried if not finished by then
+    JOB_QUEUE_POLL_SECONDS: float = 5.0
+    SHOPPING_LIST_PUSH_TIMEOUT_SECONDS: float = 10.0  # How long /chat/stream waits to push the updated list
+    
+    # Startup Settings
+    WARM_UP_ON_STARTUP: bool = True  # Load models and connect to MongoDB in the background at startup
+    
     # Logging Settings
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(levelname)s - %(message)s"
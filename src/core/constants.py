@@ -9,6 +9,10 @@ HEALTH_CHECK_ENDPOINT = f"{API_V1_STR}/health"
 CHAT_COLLECTION = "chat_history"
 SHOPPING_LIST_COLLECTION = "shopping_list"
 USER_PREFERENCES_COLLECTION = "user_preferences"
+INGREDIENT_WATERMARK_COLLECTION = "ingredient_watermarks"
+JOB_QUEUE_COLLECTION = "job_queue"
+CHAT_SUMMARY_COLLECTION = "chat_summaries"
+RESPONSE_CACHE_COLLECTION = "response_cache"
 
 # Message Categories
 CATEGORIES = {
@@ -62,6 +66,54 @@ CATEGORY_EXAMPLES = {
     ]
 }
 
+# Minimum score for a category to be accepted; lower scores fall back to Others
+CATEGORY_CONFIDENCE_THRESHOLDS = {
+    "Recipe type": 0.7,
+    "Item Addition type": 0.7,
+    "Item Information type": 0.6,
+    "Update Cart type": 0.7,
+    "Others": 0.3
+}
+
+# Zero-shot NLI hypothesis templates, one per category. The pipeline formats
+# each template with the category name, so hypotheses are built the same way.
+CATEGORY_HYPOTHESIS_TEMPLATES = {
+    "Recipe type": "This message is asking for cooking instructions or a recipe for {}",
+    "Item Addition type": "This message is requesting to add items to a shopping list, mentioning {}",
+    "Item Information type": "This message is asking for information about a product or item {}",
+    "Update Cart type": "This message is requesting to modify, remove, or delete items from a shopping list, mentioning {}",
+    "Others": "This is a general conversation message about {}"
+}
+
+# Fast-path rules matched against the normalized message (lowercase, punctuation
+# folded to spaces). A message matching rules of more than one category is left
+# to the model.
+CATEGORY_RULE_PATTERNS = {
+    "Recipe type": [
+        # Not figurative "recipe for disaster", nor "make my shopping list shorter"
+        r"^(?:what s |what is )?(?:the |a )?recipe (?:for|of) (?!(?:disaster|success|trouble|failure|happiness)\b)\w+",
+        r"^how (?:do|can|should) i (?:make|cook|prepare|bake) (?!.*\b(?:list|cart)\b)\w+",
+        r"^how to (?:make|cook|prepare|bake) (?!.*\b(?:list|cart)\b)\w+",
+        r"^(?:steps|instructions) (?:to|for) (?:make|making|cook|cooking|prepare|preparing|bake|baking) \w+"
+    ],
+    "Item Addition type": [
+        r"^(?:please |can you |could you )?(?:add|put|include) .+ (?:to|on|in|into) (?:my |the )?(?:shopping )?(?:list|cart)$",
+        r"^(?:i )?need to buy \w+"
+    ],
+    "Item Information type": [
+        r"^(?:what s|what is|what are) (?:the )?(?:price|prices|cost) (?:of|for) \w+",
+        r"^how much (?:is|are|does|do) .+(?: cost)?$",
+        r"^(?:is|are) .+ (?:available|in stock)$"
+    ],
+    "Update Cart type": [
+        r"^(?:please )?(?:remove|delete|take) .+ (?:from|off) (?:my |the )?(?:shopping )?(?:list|cart)$",
+        r"^(?:please )?(?:clear|empty) (?:my |the )?(?:shopping )?(?:list|cart)$"
+    ],
+    "Others": [
+        r"^(?:hi|hello|hey|thanks|thank you|bye|goodbye|see you later|how are you|good (?:morning|afternoon|evening|night))(?: there)?$"
+    ]
+}
+
 # AI Service Prompts
 CATEGORIZATION_PROMPT = """
 You are an AI assistant that categorizes user messages into one of the following types:
@@ -92,6 +144,29 @@ Instructions:
 Conversation History:  
 """
 
+CHAT_SUMMARY_PROMPT = """
+You are maintaining a running summary of a conversation between a user and a grocery shopping assistant.
+Update the summary below with the new exchanges.
+
+Instructions:
+- Keep the user's goals, dishes discussed, ingredients and items mentioned, and stated preferences.
+- Drop greetings, pleasantries and step-by-step recipe details.
+- Write plain prose in at most {max_words} words and return only the updated summary.
+
+Current Summary:
+{summary}
+
+New Exchanges:
+{conversation}
+"""
+
+# Answers served without the model while the LLM circuit breaker is open
+DEGRADED_RESPONSES = {
+    "ITEM_ADDITION": "I'll add {} to your shopping list.",
+    "UPDATE_CART": "I can't change your shopping list right now. Please try again in a few minutes.",
+    "TRY_LATER": "I'm having trouble answering right now. Please try again in a few minutes."
+}
+
 # Error Messages
 ERROR_MESSAGES = {
     "API_KEY_MISSING": "Gemini API key not found in environment variables",
@@ -1,12 +1,15 @@
+import threading
 from typing import Optional
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from src.core.config import settings
+from src.core.lazy import LazyService
 
 class DatabaseManager:
     _client: Optional[MongoClient] = None
+    _lock = threading.Lock()
     
     @classmethod
     @retry(
@@ -16,16 +19,20 @@ class DatabaseManager:
     )
     def get_client(cls) -> MongoClient:
         if cls._client is None:
-            try:
-                cls._client = MongoClient(
-                    settings.MONGO_URI,
-                    tlsAllowInvalidCertificates=True,
-                    serverSelectionTimeoutMS=5000
-                )
-                # Verify connection
-                cls._client.admin.command('ping')
-            except ConnectionFailure as e:
-                raise ConnectionFailure(f"Failed to connect to MongoDB: {e}")
+            # Services warm up in parallel; only one of them should connect
+            with cls._lock:
+                if cls._client is None:
+                    try:
+                        client = MongoClient(
+                            settings.MONGO_URI,
+                            tlsAllowInvalidCertificates=True,
+                            serverSelectionTimeoutMS=5000
+                        )
+                        # Verify connection
+                        client.admin.command('ping')
+                        cls._client = client
+                    except ConnectionFailure as e:
+                        raise ConnectionFailure(f"Failed to connect to MongoDB: {e}")
         return cls._client
     
     @classmethod
@@ -39,4 +46,7 @@ class DatabaseManager:
             cls._client = None
 
 # Create a singleton instance
-db = DatabaseManager() 
\ No newline at end of file
+db = DatabaseManager()
+
+# Registered so the connection is established during application warm-up
+mongo_client: LazyService[MongoClient] = LazyService("database", db.get_client)
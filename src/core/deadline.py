@@ -0,0 +1,58 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Monotonic time by which the current request must be answered; copied into tasks and asyncio.to_thread calls
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    """Raised when the request deadline passed before a stage could start."""
+
+def deadline_after(seconds: float) -> Optional[float]:
+    """Deadline ``seconds`` from now; None (no deadline) when ``seconds`` is not positive."""
+    if seconds <= 0:
+        return None
+    return time.monotonic() + seconds
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[None]:
+    """Apply ``deadline`` to everything called within the block; an enclosing earlier deadline still wins."""
+    current = _request_deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        yield
+        return
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        try:
+            _request_deadline.reset(token)
+        except ValueError:
+            # An async generator finalized from another context; that context never saw the value
+            pass
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (negative once passed), or None without one."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+def budget(limit: Optional[float]) -> Optional[float]:
+    """Timeout for the next stage: its own ``limit`` capped by the time left.
+
+    Raises DeadlineExceededError once the deadline has passed, so no stage starts
+    without time to finish.
+    """
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        raise DeadlineExceededError("Request deadline exceeded")
+    return left if limit is None else min(limit, left)
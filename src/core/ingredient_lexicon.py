@@ -0,0 +1,174 @@
+"""Grocery and ingredient lexicon used by the local ingredient extractor.
+
+Keys are the canonical names written to shopping lists; values are synonyms and
+alternative spellings. Plural and singular forms are matched automatically.
+"""
+
+INGREDIENT_LEXICON = {
+    # Dairy and eggs
+    "eggs": ["egg", "egg white", "egg yolk"],
+    "milk": ["whole milk", "skim milk", "semi skimmed milk", "dairy milk"],
+    "butter": ["unsalted butter", "salted butter"],
+    "cheese": [],
+    "cheddar": ["cheddar cheese"],
+    "mozzarella": ["mozzarella cheese"],
+    "parmesan": ["parmesan cheese", "parmigiano reggiano", "parmigiano"],
+    "feta": ["feta cheese"],
+    "ricotta": ["ricotta cheese"],
+    "cream cheese": [],
+    "heavy cream": ["double cream", "whipping cream", "heavy whipping cream"],
+    "sour cream": [],
+    "cream": ["single cream", "light cream"],
+    "ice cream": [],
+    "yogurt": ["yoghurt", "greek yogurt", "greek yoghurt", "plain yogurt"],
+    "buttermilk": [],
+    # Meat and seafood
+    "chicken": ["whole chicken"],
+    "chicken breasts": ["chicken breast", "chicken fillet"],
+    "chicken thighs": ["chicken thigh"],
+    "ground beef": ["minced beef", "beef mince", "hamburger meat"],
+    "beef": ["steak", "beef steak", "sirloin", "brisket"],
+    "pork": ["pork chop", "pork loin", "pork shoulder"],
+    "bacon": ["streaky bacon"],
+    "ham": [],
+    "sausages": ["sausage"],
+    "lamb": ["lamb chop"],
+    "turkey": ["ground turkey", "turkey breast"],
+    "salmon": ["salmon fillet"],
+    "tuna": ["canned tuna", "tuna steak"],
+    "shrimp": ["prawn", "prawns"],
+    "cod": ["cod fillet"],
+    "tofu": ["bean curd"],
+    # Vegetables
+    "tomatoes": ["tomato", "cherry tomato", "roma tomato"],
+    "onions": ["onion", "yellow onion", "red onion", "white onion"],
+    "scallions": ["scallion", "green onion", "spring onion"],
+    "shallots": ["shallot"],
+    "garlic": ["garlic clove", "clove of garlic"],
+    "ginger": ["ginger root", "fresh ginger"],
+    "potatoes": ["potato"],
+    "sweet potatoes": ["sweet potato", "yam"],
+    "carrots": ["carrot"],
+    "celery": ["celery stalk", "celery stick"],
+    "bell peppers": ["bell pepper", "capsicum", "sweet pepper", "red pepper", "green pepper", "yellow pepper"],
+    "chili peppers": ["chili pepper", "chilli", "chili", "jalapeno", "serrano"],
+    "cucumbers": ["cucumber"],
+    "zucchini": ["courgette"],
+    "eggplant": ["aubergine"],
+    "broccoli": [],
+    "cauliflower": [],
+    "cabbage": [],
+    "spinach": ["baby spinach"],
+    "kale": [],
+    "lettuce": ["romaine", "iceberg lettuce"],
+    "arugula": ["rocket"],
+    "mushrooms": ["mushroom", "button mushroom", "cremini", "portobello", "shiitake"],
+    "peas": ["pea", "green pea", "garden pea"],
+    "green beans": ["green bean", "string bean"],
+    "corn": ["sweetcorn", "sweet corn", "maize"],
+    "asparagus": [],
+    "avocados": ["avocado"],
+    "pumpkin": ["squash", "butternut squash"],
+    "beets": ["beet", "beetroot"],
+    "leeks": ["leek"],
+    "radishes": ["radish"],
+    # Fruit
+    "apples": ["apple"],
+    "bananas": ["banana"],
+    "oranges": ["orange"],
+    "lemons": ["lemon"],
+    "limes": ["lime"],
+    "strawberries": ["strawberry"],
+    "blueberries": ["blueberry"],
+    "raspberries": ["raspberry"],
+    "grapes": ["grape"],
+    "pineapple": [],
+    "mangoes": ["mango"],
+    "peaches": ["peach"],
+    "pears": ["pear"],
+    "cherries": ["cherry"],
+    "watermelon": [],
+    "coconut": [],
+    "raisins": ["raisin"],
+    # Herbs and spices
+    "basil": ["fresh basil"],
+    "cilantro": ["coriander leaves", "fresh coriander"],
+    "parsley": ["flat leaf parsley"],
+    "mint": ["mint leaves", "fresh mint"],
+    "rosemary": [],
+    "thyme": [],
+    "oregano": [],
+    "dill": [],
+    "bay leaves": ["bay leaf"],
+    "salt": ["sea salt", "kosher salt", "table salt"],
+    "black pepper": ["pepper", "ground pepper", "peppercorn", "ground black pepper"],
+    "cumin": ["ground cumin", "cumin seed"],
+    "paprika": ["smoked paprika"],
+    "turmeric": [],
+    "cinnamon": ["ground cinnamon", "cinnamon stick"],
+    "nutmeg": [],
+    "chili flakes": ["red pepper flakes", "chilli flakes", "crushed red pepper"],
+    "chili powder": ["chilli powder", "cayenne", "cayenne pepper"],
+    "curry powder": [],
+    "garam masala": [],
+    "vanilla extract": ["vanilla", "vanilla essence"],
+    # Pantry
+    "flour": ["all purpose flour", "plain flour", "wheat flour", "self raising flour", "bread flour"],
+    "sugar": ["white sugar", "granulated sugar", "caster sugar"],
+    "brown sugar": [],
+    "powdered sugar": ["icing sugar", "confectioners sugar"],
+    "honey": [],
+    "maple syrup": [],
+    "baking powder": [],
+    "baking soda": ["bicarbonate of soda", "bicarb"],
+    "yeast": ["dry yeast", "instant yeast"],
+    "cornstarch": ["corn starch", "cornflour"],
+    "olive oil": ["extra virgin olive oil", "evoo"],
+    "vegetable oil": ["canola oil", "sunflower oil", "cooking oil"],
+    "sesame oil": [],
+    "vinegar": ["white vinegar", "apple cider vinegar", "cider vinegar", "balsamic vinegar", "red wine vinegar", "rice vinegar"],
+    "soy sauce": ["soya sauce", "tamari"],
+    "fish sauce": [],
+    "worcestershire sauce": [],
+    "hot sauce": ["sriracha", "tabasco"],
+    "ketchup": ["tomato ketchup"],
+    "mustard": ["dijon mustard", "dijon"],
+    "mayonnaise": ["mayo"],
+    "tomato paste": ["tomato puree"],
+    "tomato sauce": ["passata", "marinara", "marinara sauce"],
+    "canned tomatoes": ["chopped tomatoes", "diced tomatoes", "crushed tomatoes", "tinned tomatoes"],
+    "chicken stock": ["chicken broth"],
+    "vegetable stock": ["vegetable broth", "veggie stock"],
+    "beef stock": ["beef broth"],
+    "coconut milk": [],
+    "peanut butter": [],
+    "jam": ["jelly", "preserves"],
+    # Grains, pasta and bread
+    "pasta": ["spaghetti", "penne", "fusilli", "macaroni", "linguine", "fettuccine", "lasagna sheets", "noodles"],
+    "rice": ["white rice", "brown rice", "basmati rice", "jasmine rice", "basmati", "arborio rice"],
+    "quinoa": [],
+    "oats": ["oat", "rolled oats", "oatmeal", "porridge oats"],
+    "couscous": [],
+    "bread": ["loaf of bread", "sourdough", "baguette", "whole wheat bread"],
+    "tortillas": ["tortilla"],
+    "breadcrumbs": ["breadcrumb", "panko"],
+    "cereal": ["cornflakes", "granola", "muesli"],
+    # Legumes, nuts and seeds
+    "chickpeas": ["chickpea", "garbanzo bean", "garbanzo"],
+    "black beans": ["black bean"],
+    "kidney beans": ["kidney bean"],
+    "lentils": ["lentil", "red lentil", "green lentil"],
+    "almonds": ["almond"],
+    "walnuts": ["walnut"],
+    "peanuts": ["peanut"],
+    "cashews": ["cashew"],
+    "sesame seeds": ["sesame seed", "sesame"],
+    "chia seeds": ["chia seed", "chia"],
+    # Drinks and other
+    "coffee": ["coffee beans", "ground coffee"],
+    "tea": ["tea bag", "green tea", "black tea"],
+    "orange juice": ["oj"],
+    "apple juice": [],
+    "wine": ["red wine", "white wine", "cooking wine"],
+    "chocolate": ["dark chocolate", "milk chocolate", "chocolate chip", "cocoa", "cocoa powder"],
+}
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_registry: List["LazyService"] = []
+
+class LazyService(Generic[T]):
+    """Proxy for a singleton that is constructed on first use (or by warm_up_services).
+
+    Attribute access is forwarded to the underlying instance, so modules can keep
+    exposing ``service = LazyService(...)`` in place of ``service = Service()``.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], warm_up: bool = True):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_warm_up", warm_up)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_error", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        _registry.append(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def is_ready(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        """Return the instance, building it on the first call."""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                started_at = time.perf_counter()
+                try:
+                    instance = self._factory()
+                except Exception as e:
+                    object.__setattr__(self, "_error", str(e))
+                    logger.error(f"Failed to initialize {self._name}", error=str(e))
+                    raise
+                elapsed = time.perf_counter() - started_at
+                object.__setattr__(self, "_instance", instance)
+                object.__setattr__(self, "_error", None)
+                metrics.set_gauge("service_init_seconds", elapsed, service=self._name)
+                logger.info(f"Initialized {self._name}", seconds=round(elapsed, 3))
+            return self._instance
+
+    def status(self) -> str:
+        if self._instance is not None:
+            return "ready"
+        return "failed" if self._error else "pending"
+
+    def reset(self) -> None:
+        """Drop the instance so the next access rebuilds it."""
+        with self._lock:
+            object.__setattr__(self, "_instance", None)
+            object.__setattr__(self, "_error", None)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.get(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        setattr(self.get(), attribute, value)
+
+    def __repr__(self) -> str:
+        return f"<LazyService {self._name} ({self.status()})>"
+
+def warm_up_services(max_workers: Optional[int] = None) -> Dict[str, str]:
+    """Build every registered service in parallel; failures are logged and left for retry on use."""
+    services = [service for service in _registry if service._warm_up]
+    with ThreadPoolExecutor(max_workers=max_workers or len(services) or 1, thread_name_prefix="warm-up") as executor:
+        futures = [executor.submit(service.get) for service in services]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+    return service_status()
+
+def service_status() -> Dict[str, str]:
+    """Return ``name -> ready | pending | failed`` for every service that is warmed up at startup."""
+    return {service.name: service.status() for service in _registry if service._warm_up}
+
+def all_services_ready() -> bool:
+    return all(service.is_ready for service in _registry if service._warm_up)
@@ -0,0 +1,100 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List
+
+import numpy as np
+
+class MetricsRegistry:
+    """Thread-safe in-process registry for counters, gauges and latency histograms."""
+
+    def __init__(self, max_samples: int = 2048):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, List[float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> str:
+        """Build a metric key such as ``name{label=value}``."""
+        if not labels:
+            return name
+        rendered = ",".join(f"{key}={value}" for key, value in sorted(labels.items()))
+        return f"{name}{{{rendered}}}"
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increase a counter."""
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a sample (latency, size, ...) for a histogram."""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self._max_samples)
+                self._totals[key] = [0, 0.0]
+            self._samples[key].append(value)
+            self._totals[key][0] += 1
+            self._totals[key][1] += value
+
+    def get_counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def get_gauge(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._gauges.get(self._key(name, labels), 0)
+
+    def count(self, name: str, **labels: Any) -> int:
+        """Number of samples ever recorded for a histogram."""
+        with self._lock:
+            totals = self._totals.get(self._key(name, labels))
+            return int(totals[0]) if totals else 0
+
+    def percentile(self, name: str, percentile: float, **labels: Any) -> float:
+        """Percentile over the most recent samples of a histogram, 0 when empty."""
+        with self._lock:
+            samples = list(self._samples.get(self._key(name, labels), ()))
+        if not samples:
+            return 0.0
+        return float(np.percentile(samples, percentile))
+
+    def _summarize(self, key: str) -> Dict[str, float]:
+        samples = np.fromiter(self._samples[key], dtype=float)
+        count, total = self._totals[key]
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count,
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(samples.max())
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return every metric as plain JSON-serializable data."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {key: self._summarize(key) for key in self._samples}
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+            self._totals.clear()
+
+# Create a singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from src.core.metrics import metrics
+
+T = TypeVar("T")
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Share one execution among concurrent callers with the same key.
+
+    Callers arriving while a call for their key is running wait for it and get its
+    result or exception instead of starting another. Nothing is cached: the next
+    call after it finishes runs again. ``do`` coordinates threads, ``do_async``
+    coroutines on one event loop.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.increment("coalesced_calls_total", flight=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await the shared call; a caller that is cancelled (e.g. by its own deadline) leaves it running for the rest."""
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._futures[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            metrics.increment("coalesced_calls_total", flight=self.name)
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._futures.get(key) is future:
+            del self._futures[key]
+        if not future.cancelled():
+            # Mark the exception retrieved even if every caller gave up waiting
+            future.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._futures)
@@ -1,15 +1,13 @@
 import uvicorn
 from src.core.logging import get_logger
-from src.core.database import db
 
 logger = get_logger(__name__)
 
 def main():
     """Main entry point for the application."""
     try:
-        # Verify database connection
-        db.get_client().admin.command('ping')
-        logger.info("Database connection verified")
+        # The database connection and models are warmed up by the app's
+        # lifespan hook; readiness is reported on /ready
         
         # Start the FastAPI application
         uvicorn.run(
@@ -1,38 +1,102 @@
-from typing import List, Dict, Any, Optional
-import google.generativeai as genai
-from tenacity import retry, stop_after_attempt, wait_exponential
+import ast
+import asyncio
+import hashlib
 import json
+import queue
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Tuple
+from tenacity import (
+    AsyncRetrying,
+    retry,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_random_exponential
+)
 
+from src.core.circuit_breaker import CircuitOpenError, llm_breaker
 from src.core.config import settings
+from src.core.deadline import budget, expired
+from src.core.lazy import LazyService
 from src.core.logging import get_logger
+from src.core.metrics import metrics
+from src.core.single_flight import SingleFlight
 from src.core.constants import (
+    CHAT_SUMMARY_PROMPT,
     INGREDIENT_EXTRACTION_PROMPT,
     ERROR_MESSAGES,
     SUCCESS_MESSAGES
 )
-from src.core.message_contexts import MESSAGE_CONTEXTS
 from src.core.prompt_safety import PromptSafety
 from src.services.message_classifier import message_classifier
+from src.services.classification_batcher import classification_batcher
+from src.services.degraded_responses import degraded_response
+from src.services.ingredient_extractor import ingredient_extractor
+from src.services.llm_scheduler import Priority, llm_scheduler
+from src.services.response_cache import response_cache
+from src.services.llm_providers import llm_provider
+from src.services.llm_routing import (
+    EXTRACTION_ROUTE,
+    SUMMARIZATION_ROUTE,
+    LLMRoute,
+    record_route_usage,
+    route_for
+)
+from src.services.intent_prompts import (
+    IntentPrompts,
+    estimate_tokens,
+    render_dynamic_prompt,
+    truncate_to_tokens
+)
 
 logger = get_logger(__name__)
 
+class UnsafeResponseError(Exception):
+    """Raised when streamed model output fails safety validation part-way through."""
+    
+    def __init__(self, safe_response: str):
+        super().__init__(safe_response)
+        self.safe_response = safe_response
+
+class IngredientExtractionError(Exception):
+    """Raised by a strict extraction when the model step fails; ``ingredients`` holds the lexicon matches."""
+    
+    def __init__(self, ingredients: List[str]):
+        super().__init__("Ingredient extraction failed")
+        self.ingredients = ingredients
+
+def _stop(max_attempts: int) -> Callable[[Any], bool]:
+    """Retry stop condition: ``max_attempts`` reached or the request deadline has passed."""
+    attempts = stop_after_attempt(max_attempts)
+    return lambda retry_state: attempts(retry_state) or expired()
+
+def _release_boundary(text: str) -> int:
+    """Return how much of ``text`` ends on a word boundary; the trailing partial word is held back."""
+    for index in range(len(text) - 1, -1, -1):
+        if not (text[index].isalnum() or text[index] == "_"):
+            return index + 1
+    return 0
+
 class AIService:
     def __init__(self):
-        if not settings.GEMINI_API_KEY:
-            logger.error(ERROR_MESSAGES["API_KEY_MISSING"])
-            raise ValueError(ERROR_MESSAGES["API_KEY_MISSING"])
-            
         try:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
+            # Gemini or the offline stub, per LLM_PROVIDER
+            self.provider = llm_provider.get()
+            # Static per-intent prompts are rendered once; see _system_instruction and _build_prompt
+            self.intent_prompts = IntentPrompts(self.provider.supports_system_instruction)
+            # Async generations currently awaiting the model (only touched on the event loop)
+            self._in_flight = 0
+            # Identical prompts already in flight share one upstream call
+            self._single_flight = SingleFlight("llm")
             logger.info(SUCCESS_MESSAGES["AI_SERVICE_INIT"])
         except Exception as e:
             logger.error(ERROR_MESSAGES["AI_SERVICE_INIT_FAILED"], error=str(e))
             raise
     
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
+        stop=_stop(3),
+        wait=wait_random_exponential(multiplier=1, max=settings.LLM_RETRY_MAX_WAIT_SECONDS),
+        retry=retry_if_not_exception_type(CircuitOpenError),
         reraise=True
     )
     def generate_response(
@@ -40,71 +104,467 @@ class AIService:
         prompt: str,
         chat_history: Optional[List[Dict[str, str]]] = None,
         message_type: str = "Others",
-        user_preferences: Optional[Dict[str, str]] = None
+        user_preferences: Optional[Dict[str, str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        route_name: Optional[str] = None
     ) -> str:
-        """Generate a response from the AI model."""
-        if not prompt or not isinstance(prompt, str):
-            logger.error(ERROR_MESSAGES["INVALID_PROMPT"])
-            raise ValueError(ERROR_MESSAGES["INVALID_PROMPT"])
+        """Generate a response from the AI model.
+        
+        The model and generation config come from the LLM_ROUTES entry for
+        ``route_name``, or for ``message_type`` when no route is named. While the LLM
+        circuit breaker is open, interactive requests get a degraded answer (see
+        _degraded_response); other priorities raise CircuitOpenError.
+        """
+        self._check_prompt(prompt)
             
         try:
-            # Validate and sanitize the prompt
-            validation_results = PromptSafety.validate_prompt(prompt, message_type)
-            if not validation_results['is_safe']:
-                logger.warning(f"Prompt validation failed: {validation_results['violations']}")
+            # Validate the prompt before spending a model call on it
+            if not self._is_safe(prompt, message_type):
                 return PromptSafety.get_safe_response('prohibited_content')
             
-            # Sanitize the prompt
-            sanitized_prompt = PromptSafety.sanitize_prompt(prompt)
+            cache_key = response_cache.key_for(prompt, chat_history, message_type, user_preferences)
+            if cache_key is not None:
+                cached = response_cache.get(cache_key, message_type, prompt, user_preferences)
+                if cached is not None:
+                    return cached
             
-            # Get the context for the message type
-            context = MESSAGE_CONTEXTS.get(message_type, MESSAGE_CONTEXTS["Others"])
-            
-            # Format user preferences if available
-            preferences_text = ""
-            if user_preferences:
-                preferences_text = "\nUser Preferences:\n" + "\n".join(
-                    f"- {pref}: {value}" for pref, value in user_preferences.items()
-                    if value != "not_set"
+            enhanced_prompt = self._build_prompt(prompt, chat_history, message_type, user_preferences)
+            route = route_for(route_name or message_type)
+            started_at = time.perf_counter()
+            try:
+                llm_breaker.check()
+                response = self._coalesce(
+                    enhanced_prompt,
+                    message_type,
+                    route,
+                    lambda: self._call_model(enhanced_prompt, message_type, route, priority)
                 )
+            except CircuitOpenError:
+                if priority != Priority.INTERACTIVE:
+                    raise
+                return self._degraded_response(prompt, message_type, user_preferences)
+            if cache_key is not None and self._is_cacheable(response):
+                response_cache.set(
+                    cache_key,
+                    message_type,
+                    response,
+                    (time.perf_counter() - started_at) * 1000,
+                    prompt,
+                    user_preferences
+                )
+            return response
+        except Exception as e:
+            logger.error(ERROR_MESSAGES["GENERAL_ERROR"], error=str(e))
+            raise
+    
+    async def generate_response_async(
+        self,
+        prompt: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        message_type: str = "Others",
+        user_preferences: Optional[Dict[str, str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        route_name: Optional[str] = None
+    ) -> str:
+        """Generate a response without blocking the event loop, retrying with jitter within an overall deadline."""
+        self._check_prompt(prompt)
+        
+        try:
+            if not self._is_safe(prompt, message_type):
+                return PromptSafety.get_safe_response('prohibited_content')
             
-            # Format the context into the prompt with safety guidelines
-            enhanced_prompt = f"""
-            {context['persona']}
-            
-            Task: {context['task']}
-            Context: {context['context']}
-            
-            References to consider:
-            {chr(10).join(f"- {ref}" for ref in context['references'])}
-            
-            {preferences_text}
+            cache_key = response_cache.key_for(prompt, chat_history, message_type, user_preferences)
+            if cache_key is not None:
+                cached = await response_cache.get_async(cache_key, message_type, prompt, user_preferences)
+                if cached is not None:
+                    return cached
             
-            Chat History:
-            {self._format_chat_history(chat_history) if chat_history else 'No previous conversation.'}
+            enhanced_prompt = self._build_prompt(prompt, chat_history, message_type, user_preferences)
+            route = route_for(route_name or message_type)
+            started_at = time.perf_counter()
+            try:
+                llm_breaker.check()
+                # Capped by what is left of the request's deadline
+                timeout = budget(settings.LLM_DEADLINE_SECONDS)
+                response = await asyncio.wait_for(
+                    self._coalesce_async(
+                        enhanced_prompt,
+                        message_type,
+                        route,
+                        # The shared call gets its own deadline, so it cannot outlive every caller's
+                        lambda: asyncio.wait_for(
+                            self._generate_with_retry(enhanced_prompt, message_type, route, priority),
+                            settings.LLM_DEADLINE_SECONDS
+                        )
+                    ),
+                    timeout
+                )
+            except CircuitOpenError:
+                if priority != Priority.INTERACTIVE:
+                    raise
+                return await self._degraded_response_async(prompt, message_type, user_preferences)
+            if cache_key is not None and self._is_cacheable(response):
+                await response_cache.set_async(
+                    cache_key,
+                    message_type,
+                    response,
+                    (time.perf_counter() - started_at) * 1000,
+                    prompt,
+                    user_preferences
+                )
+            return response
+        except Exception as e:
+            logger.error(ERROR_MESSAGES["GENERAL_ERROR"], error=str(e) or type(e).__name__)
+            raise
+    
+    async def stream_response_async(
+        self,
+        prompt: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        message_type: str = "Others",
+        user_preferences: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Yield response text as the model produces it.
+        
+        The accumulated text is validated before each chunk is released; a trailing
+        partial word is held back so a prohibited term split across chunks is caught
+        whole. Raises UnsafeResponseError if validation fails mid-stream.
+        """
+        self._check_prompt(prompt)
+        if not self._is_safe(prompt, message_type):
+            yield PromptSafety.get_safe_response('prohibited_content')
+            return
+        
+        cache_key = response_cache.key_for(prompt, chat_history, message_type, user_preferences)
+        if cache_key is not None:
+            cached = await response_cache.get_async(cache_key, message_type, prompt, user_preferences)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            llm_breaker.check()
+        except CircuitOpenError:
+            yield await self._degraded_response_async(prompt, message_type, user_preferences)
+            return
+        
+        enhanced_prompt = self._build_prompt(prompt, chat_history, message_type, user_preferences)
+        route = route_for(message_type)
+        started_at = time.perf_counter()
+        self._in_flight += 1
+        metrics.set_gauge("llm_requests_in_flight", self._in_flight)
+        try:
+            # The slot is held until the stream is consumed
+            async with llm_scheduler.slot_async(
+                Priority.INTERACTIVE,
+                self._charge(enhanced_prompt, route),
+                budget(settings.LLM_DEADLINE_SECONDS)
+            ):
+                # Retries and the deadline cover opening the stream; once text is released it cannot be retried
+                try:
+                    timeout = budget(settings.LLM_DEADLINE_SECONDS)
+                    opened_at = time.perf_counter()
+                    response = await asyncio.wait_for(
+                        self._open_stream(enhanced_prompt, message_type, route),
+                        timeout
+                    )
+                except CircuitOpenError:
+                    # The breaker opened while this stream was retrying
+                    yield await self._degraded_response_async(prompt, message_type, user_preferences)
+                    return
+                released = ""
+                pending = ""
+                async for chunk in response:
+                    pending += chunk
+                    boundary = _release_boundary(pending)
+                    if boundary == 0:
+                        continue
+                    self._check_streamed_text(released + pending[:boundary], message_type)
+                    if not released:
+                        metrics.observe("llm_ttfb_ms", (time.perf_counter() - started_at) * 1000)
+                    yield pending[:boundary]
+                    released, pending = released + pending[:boundary], pending[boundary:]
+                self._record_usage(route, enhanced_prompt, message_type, released + pending, opened_at)
             
-            User Message: {sanitized_prompt}
+            if not (released + pending).strip():
+                logger.error(ERROR_MESSAGES["EMPTY_RESPONSE"])
+                raise ValueError(ERROR_MESSAGES["EMPTY_RESPONSE"])
+            self._check_streamed_text(released + pending, message_type)
+            if pending:
+                yield pending
+            if cache_key is not None:
+                await response_cache.set_async(
+                    cache_key,
+                    message_type,
+                    (released + pending).strip(),
+                    (time.perf_counter() - started_at) * 1000,
+                    prompt,
+                    user_preferences
+                )
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("llm_requests_in_flight", self._in_flight)
+            metrics.observe("llm_latency_ms", (time.perf_counter() - started_at) * 1000)
+    
+    async def _open_stream(self, prompt: str, message_type: str, route: LLMRoute) -> AsyncIterator[str]:
+        async for attempt in self._retrying():
+            with attempt:
+                try:
+                    async with llm_breaker.guard_async():
+                        return await self.provider.stream_async(prompt, self._system_instruction(message_type), route)
+                except Exception as e:
+                    # Retried within the stream's slot, so quota errors are reported here
+                    llm_scheduler.record_failure(e)
+                    raise
+    
+    def _call_model(self, prompt: str, message_type: str, route: LLMRoute, priority: Priority) -> str:
+        with llm_scheduler.slot(
+            priority,
+            self._charge(prompt, route),
+            budget(settings.LLM_SCHEDULER_MAX_WAIT_SECONDS)
+        ):
+            # Inside the slot, so time spent queueing does not count as a slow call
+            with llm_breaker.guard():
+                started_at = time.perf_counter()
+                response = self.provider.generate(prompt, self._system_instruction(message_type), route)
+                self._record_usage(route, prompt, message_type, response, started_at)
+        return self._finalize_response(response, message_type)
+    
+    def _degraded_response(
+        self,
+        prompt: str,
+        message_type: str,
+        user_preferences: Optional[Dict[str, str]]
+    ) -> str:
+        """Answer while the model is unavailable: a cached response, a deterministic handler or a try-later message.
+        
+        The history bypass is skipped here; a possibly less specific cached answer beats none.
+        """
+        cache_key = response_cache.key_for(prompt, None, message_type, user_preferences)
+        cached = None
+        if cache_key is not None:
+            cached = response_cache.get(cache_key, message_type, prompt, user_preferences)
+        return self._finish_degraded(cached, prompt, message_type)
+    
+    async def _degraded_response_async(
+        self,
+        prompt: str,
+        message_type: str,
+        user_preferences: Optional[Dict[str, str]]
+    ) -> str:
+        cache_key = response_cache.key_for(prompt, None, message_type, user_preferences)
+        cached = None
+        if cache_key is not None:
+            cached = await response_cache.get_async(cache_key, message_type, prompt, user_preferences)
+        return self._finish_degraded(cached, prompt, message_type)
+    
+    def _finish_degraded(self, cached: Optional[str], prompt: str, message_type: str) -> str:
+        if cached is not None:
+            response, source = cached, "cache"
+        else:
+            response, source = degraded_response(prompt, message_type)
+        metrics.increment("llm_degraded_responses_total", intent=message_type, source=source)
+        logger.warning("LLM circuit open, serving a degraded response", intent=message_type, source=source)
+        return response
+    
+    def _charge(self, prompt: str, route: LLMRoute) -> int:
+        """Tokens-per-minute charge for a call: the prompt estimate plus the expected output, capped by the route."""
+        expected_output = settings.LLM_EXPECTED_OUTPUT_TOKENS
+        max_output_tokens = route.generation_config.get("max_output_tokens")
+        if max_output_tokens:
+            expected_output = min(expected_output, max_output_tokens)
+        return estimate_tokens(prompt) + expected_output
+    
+    def _record_usage(
+        self,
+        route: LLMRoute,
+        prompt: str,
+        message_type: str,
+        response: str,
+        started_at: float
+    ) -> None:
+        system_instruction = self._system_instruction(message_type) or ""
+        record_route_usage(route, system_instruction + prompt, response, (time.perf_counter() - started_at) * 1000)
+    
+    def _is_cacheable(self, response: str) -> bool:
+        # The canned refusal replaces unsafe output; keep it out of the cache so the next request tries again
+        return response != PromptSafety.get_safe_response('prohibited_content')
+    
+    def _flight_key(self, prompt: str, message_type: str, route: LLMRoute) -> str:
+        """Hash of everything that determines the upstream call: route, intent (its system instruction) and contents."""
+        generation_config = json.dumps(route.generation_config, sort_keys=True)
+        return hashlib.sha256(
+            f"{self.provider.name}:{route.model}\0{generation_config}\0{message_type}\0{prompt}".encode("utf-8")
+        ).hexdigest()
+    
+    def _coalesce(self, prompt: str, message_type: str, route: LLMRoute, call: Callable[[], str]) -> str:
+        if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+            return call()
+        return self._single_flight.do(self._flight_key(prompt, message_type, route), call)
+    
+    async def _coalesce_async(
+        self,
+        prompt: str,
+        message_type: str,
+        route: LLMRoute,
+        call: Callable[[], Awaitable[str]]
+    ) -> str:
+        if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+            return await call()
+        return await self._single_flight.do_async(self._flight_key(prompt, message_type, route), call)
+    
+    def _check_streamed_text(self, text: str, message_type: str) -> None:
+        validation_results = PromptSafety.validate_prompt(text, message_type)
+        if not validation_results['is_safe']:
+            logger.warning(f"Streamed response validation failed: {validation_results['violations']}")
+            metrics.increment("llm_stream_safety_stops_total")
+            raise UnsafeResponseError(PromptSafety.get_safe_response('prohibited_content'))
+    
+    def _retrying(self) -> AsyncRetrying:
+        """Async retry policy: jittered exponential backoff with non-blocking sleeps."""
+        return AsyncRetrying(
+            stop=_stop(settings.LLM_MAX_ATTEMPTS),
+            wait=wait_random_exponential(multiplier=1, max=settings.LLM_RETRY_MAX_WAIT_SECONDS),
+            before_sleep=lambda state: metrics.increment("llm_retries_total"),
+            retry=retry_if_not_exception_type(CircuitOpenError),
+            reraise=True
+        )
+    
+    async def _generate_with_retry(
+        self,
+        prompt: str,
+        message_type: str,
+        route: LLMRoute,
+        priority: Priority
+    ) -> str:
+        started_at = time.perf_counter()
+        self._in_flight += 1
+        metrics.set_gauge("llm_requests_in_flight", self._in_flight)
+        try:
+            async for attempt in self._retrying():
+                with attempt:
+                    response = await self._hedged(
+                        lambda: self._attempt(prompt, message_type, route, priority),
+                        self._hedge_delay(message_type, priority),
+                        message_type
+                    )
+                    return self._finalize_response(response, message_type)
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("llm_requests_in_flight", self._in_flight)
+            metrics.observe("llm_latency_ms", (time.perf_counter() - started_at) * 1000)
+    
+    async def _attempt(self, prompt: str, message_type: str, route: LLMRoute, priority: Priority) -> str:
+        """One model call under a scheduler slot and the circuit breaker; its latency feeds the hedging delay."""
+        async with llm_scheduler.slot_async(priority, self._charge(prompt, route)):
+            async with llm_breaker.guard_async():
+                started_at = time.perf_counter()
+                response = await self.provider.generate_async(prompt, self._system_instruction(message_type), route)
+                metrics.observe(
+                    "llm_attempt_latency_ms",
+                    (time.perf_counter() - started_at) * 1000,
+                    intent=message_type
+                )
+                self._record_usage(route, prompt, message_type, response, started_at)
+                return response
+    
+    def _hedge_delay(self, message_type: str, priority: Priority) -> Optional[float]:
+        """Seconds after which an interactive attempt is duplicated, or None when it should not be."""
+        if not settings.LLM_HEDGING_ENABLED or priority != Priority.INTERACTIVE:
+            return None
+        if metrics.count("llm_attempt_latency_ms", intent=message_type) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return metrics.percentile(
+            "llm_attempt_latency_ms",
+            settings.LLM_HEDGE_PERCENTILE,
+            intent=message_type
+        ) / 1000
+    
+    async def _hedged(
+        self,
+        call: Callable[[], Awaitable[str]],
+        delay: Optional[float],
+        message_type: str
+    ) -> str:
+        """Run ``call``; if it is still outstanding after ``delay`` seconds, run it again and take the first success.
+        
+        The loser is cancelled. The call fails only when both copies fail.
+        """
+        if delay is None:
+            return await call()
+        tasks = [asyncio.ensure_future(call())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                metrics.increment("llm_hedged_requests_total", intent=message_type)
+                tasks.append(asyncio.ensure_future(call()))
             
-            {PromptSafety.add_safety_context("")}
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            metrics.increment("llm_hedge_wins_total", intent=message_type)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _check_prompt(self, prompt: str) -> None:
+        if not prompt or not isinstance(prompt, str):
+            logger.error(ERROR_MESSAGES["INVALID_PROMPT"])
+            raise ValueError(ERROR_MESSAGES["INVALID_PROMPT"])
+    
+    def _is_safe(self, text: str, message_type: str) -> bool:
+        validation_results = PromptSafety.validate_prompt(text, message_type)
+        if not validation_results['is_safe']:
+            logger.warning(f"Prompt validation failed: {validation_results['violations']}")
+        return validation_results['is_safe']
+    
+    def _system_instruction(self, message_type: str) -> Optional[str]:
+        """This intent's static prompt when the provider takes system instructions; otherwise it is in the contents."""
+        return self.intent_prompts.system_instruction_for(message_type)
+    
+    def _build_prompt(
+        self,
+        prompt: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        message_type: str,
+        user_preferences: Optional[Dict[str, str]]
+    ) -> str:
+        """Render the per-request contents: preferences, history and the sanitized user message.
+        
+        The intent's persona, references and safety guidelines are precompiled by
+        IntentPrompts and sent as the system instruction, or prepended when the provider
+        does not take one.
+        """
+        sanitized_prompt = PromptSafety.sanitize_prompt(prompt)
+        dynamic_prompt = render_dynamic_prompt(
+            sanitized_prompt,
+            self._format_chat_history(chat_history) if chat_history else None,
+            user_preferences
+        )
+        contents = self.intent_prompts.contents_for(message_type, dynamic_prompt)
+        metrics.observe("llm_prompt_tokens_estimate", estimate_tokens(contents), intent=message_type)
+        return contents
+    
+    def _finalize_response(self, response: str, message_type: str) -> str:
+        """Reject empty model output and replace unsafe output with the canned safe response."""
+        if not response:
+            logger.error(ERROR_MESSAGES["EMPTY_RESPONSE"])
+            raise ValueError(ERROR_MESSAGES["EMPTY_RESPONSE"])
             
-            Please provide a helpful response considering the above context, references, and user preferences.
-            """
+        # Validate the response
+        response_validation = PromptSafety.validate_prompt(response, message_type)
+        if not response_validation['is_safe']:
+            logger.warning(f"Response validation failed: {response_validation['violations']}")
+            return PromptSafety.get_safe_response('prohibited_content')
             
-            response = self.model.generate_content(enhanced_prompt)
-            if not response or not response.text:
-                logger.error(ERROR_MESSAGES["EMPTY_RESPONSE"])
-                raise ValueError(ERROR_MESSAGES["EMPTY_RESPONSE"])
-                
-            # Validate the response
-            response_validation = PromptSafety.validate_prompt(response.text, message_type)
-            if not response_validation['is_safe']:
-                logger.warning(f"Response validation failed: {response_validation['violations']}")
-                return PromptSafety.get_safe_response('prohibited_content')
-                
-            return response.text.strip()
-        except Exception as e:
-            logger.error(ERROR_MESSAGES["GENERAL_ERROR"], error=str(e))
-            raise
+        return response.strip()
     
     def _format_chat_history(self, chat_history: List[Dict[str, str]]) -> str:
         """Format chat history into a readable string."""
@@ -117,50 +577,152 @@ class AIService:
     
     def categorize_message(self, message: str) -> str:
         """Categorize user message into predefined types."""
+        if settings.CLASSIFIER_BATCHING_ENABLED:
+            return classification_batcher.classify_message(message)
         return message_classifier.classify_message(message)
     
-    def extract_ingredients(self, chat_history: List[Dict[str, str]]) -> List[str]:
-        """Extract ingredients from chat history."""
+    async def categorize_message_async(self, message: str) -> str:
+        """Categorize a message without blocking the event loop, within what is left of the request's deadline."""
+        timeout = budget(None)
+        if settings.CLASSIFIER_BATCHING_ENABLED:
+            try:
+                future = classification_batcher.submit(message)
+                # Shielded so a timeout only stops this wait; cancelling the future would reach the batcher
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except queue.Full:
+                metrics.increment("classifier_batch_rejected_total")
+                logger.warning("Classification queue full, classifying in a worker thread")
+        return await asyncio.wait_for(asyncio.to_thread(message_classifier.classify_message, message), timeout)
+    
+    def extract_ingredients(self, chat_history: List[Dict[str, str]], strict: bool = False) -> List[str]:
+        """Extract ingredients from chat history.
+        
+        A failed model call (error, open circuit, spent deadline) leaves only the lexicon
+        matches; with ``strict`` it raises IngredientExtractionError carrying them instead.
+        """
         if not chat_history or not isinstance(chat_history, list):
             logger.error(ERROR_MESSAGES["INVALID_CHAT_HISTORY"])
             return []
             
+        ingredients, llm_prompt = self._plan_extraction(chat_history)
+        if llm_prompt is None:
+            return ingredients
         try:
-            conversation_text = "\n".join([
-                f"{msg['role'].capitalize()}: {msg['message']}"
-                for msg in chat_history
-                if isinstance(msg, dict) and 'role' in msg and 'message' in msg
-            ])
-            prompt = INGREDIENT_EXTRACTION_PROMPT + conversation_text
-
-            response = self.generate_response(prompt)
-            # Clean up response by removing extra characters
-            cleaned_response = response.strip().lstrip("```").rstrip("```").strip()
+            response = self.generate_response(llm_prompt, priority=Priority.BACKGROUND, route_name=EXTRACTION_ROUTE)
+            return sorted(set(ingredients) | set(self._parse_ingredients(response)))
+        except Exception as e:
+            logger.error(ERROR_MESSAGES["GENERAL_ERROR"], error=str(e))
+            if strict:
+                raise IngredientExtractionError(ingredients) from e
+            return ingredients
+    
+    async def extract_ingredients_async(self, chat_history: List[Dict[str, str]], strict: bool = False) -> List[str]:
+        """Async variant of extract_ingredients."""
+        if not chat_history or not isinstance(chat_history, list):
+            logger.error(ERROR_MESSAGES["INVALID_CHAT_HISTORY"])
+            return []
             
+        ingredients, llm_prompt = self._plan_extraction(chat_history)
+        if llm_prompt is None:
+            return ingredients
+        try:
+            response = await self.generate_response_async(
+                llm_prompt,
+                priority=Priority.BACKGROUND,
+                route_name=EXTRACTION_ROUTE
+            )
+            return sorted(set(ingredients) | set(self._parse_ingredients(response)))
+        except Exception as e:
+            logger.error(ERROR_MESSAGES["GENERAL_ERROR"], error=str(e) or type(e).__name__)
+            if strict:
+                raise IngredientExtractionError(ingredients) from e
+            return ingredients
+    
+    def summarize_history(self, summary: Optional[str], chat_history: List[Dict[str, str]]) -> str:
+        """Fold older exchanges into the user's rolling conversation summary."""
+        response = self.generate_response(
+            self._summary_prompt(summary, chat_history),
+            priority=Priority.BACKGROUND,
+            route_name=SUMMARIZATION_ROUTE
+        )
+        return self._finalize_summary(summary, response)
+    
+    async def summarize_history_async(self, summary: Optional[str], chat_history: List[Dict[str, str]]) -> str:
+        """Async variant of summarize_history."""
+        response = await self.generate_response_async(
+            self._summary_prompt(summary, chat_history),
+            priority=Priority.BACKGROUND,
+            route_name=SUMMARIZATION_ROUTE
+        )
+        return self._finalize_summary(summary, response)
+    
+    def _summary_prompt(self, summary: Optional[str], chat_history: List[Dict[str, str]]) -> str:
+        return CHAT_SUMMARY_PROMPT.format(
+            # Roughly three quarters of a word per token
+            max_words=settings.CHAT_SUMMARY_MAX_TOKENS * 3 // 4,
+            summary=summary or "No summary yet.",
+            conversation=self._format_chat_history(chat_history)
+        )
+    
+    def _finalize_summary(self, summary: Optional[str], response: str) -> str:
+        if response == PromptSafety.get_safe_response('prohibited_content'):
+            # The exchanges were refused; keep the previous summary rather than storing the refusal
+            return summary or ""
+        return truncate_to_tokens(response.strip(), settings.CHAT_SUMMARY_MAX_TOKENS)
+    
+    def _plan_extraction(self, chat_history: List[Dict[str, str]]) -> Tuple[List[str], Optional[str]]:
+        """Match the lexicon locally; return those ingredients and the LLM prompt still needed, if any.
+        
+        With the local extractor only item-like phrases the lexicon does not know are
+        sent to the model, and only when INGREDIENT_LLM_FALLBACK is enabled.
+        """
+        conversation_text = "\n".join([
+            f"{msg['role'].capitalize()}: {msg['message']}"
+            for msg in chat_history
+            if isinstance(msg, dict) and 'role' in msg and 'message' in msg
+        ])
+        if settings.INGREDIENT_EXTRACTOR == "llm":
+            metrics.increment("ingredient_extractions_total", method="llm")
+            return [], INGREDIENT_EXTRACTION_PROMPT + conversation_text
+        
+        ingredients, unknown_terms = ingredient_extractor.extract_with_unknowns(conversation_text)
+        if unknown_terms and settings.INGREDIENT_LLM_FALLBACK:
+            metrics.increment("ingredient_extractions_total", method="llm_fallback")
+            return ingredients, INGREDIENT_EXTRACTION_PROMPT + "\n".join(unknown_terms)
+        metrics.increment("ingredient_extractions_total", method="local")
+        return ingredients, None
+    
+    def _parse_ingredients(self, response: str) -> List[str]:
+        """Parse the model's list of ingredients into sorted, de-duplicated canonical names."""
+        # The list may be wrapped in a code fence or surrounded by prose
+        match = re.search(r"\[.*\]", response, re.DOTALL)
+        if match is None:
+            logger.error(ERROR_MESSAGES["INVALID_INGREDIENTS"], ingredients=response)
+            return []
+        
+        try:
+            # Try to parse as JSON first
+            ingredients = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            # Python-style lists (single quotes) are parsed as literals, never evaluated
             try:
-                # Try to parse as JSON first
-                ingredients = json.loads(cleaned_response)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try eval as fallback
-                ingredients = eval(cleaned_response)
-                
-            # Validate and clean ingredients
-            if not isinstance(ingredients, list):
-                logger.error(ERROR_MESSAGES["INVALID_INGREDIENTS"], ingredients=ingredients)
-                return []
-                
-            # Clean and validate each ingredient
-            cleaned_ingredients = []
-            for ingredient in ingredients:
-                if isinstance(ingredient, str) and ingredient.strip():
-                    cleaned_ingredients.append(ingredient.strip().lower())
-                    
-            # Remove duplicates and sort alphabetically
-            return sorted(list(set(cleaned_ingredients)))
+                ingredients = ast.literal_eval(match.group(0))
+            except (ValueError, SyntaxError):
+                ingredients = None
             
-        except Exception as e:
-            logger.error(ERROR_MESSAGES["GENERAL_ERROR"], error=str(e))
+        # Validate and clean ingredients
+        if not isinstance(ingredients, list):
+            logger.error(ERROR_MESSAGES["INVALID_INGREDIENTS"], ingredients=ingredients)
             return []
+            
+        # Clean and validate each ingredient
+        cleaned_ingredients = []
+        for ingredient in ingredients:
+            if isinstance(ingredient, str) and ingredient.strip():
+                cleaned_ingredients.append(ingredient_extractor.canonicalize(ingredient))
+                
+        # Remove duplicates and sort alphabetically
+        return sorted(list(set(cleaned_ingredients)))
 
-# Create a singleton instance
-ai_service = AIService() 
\ No newline at end of file
+# Create a lazily initialized singleton instance
+ai_service: LazyService[AIService] = LazyService("ai_service", AIService)
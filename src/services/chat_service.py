@@ -1,97 +1,461 @@
-from typing import List, Dict, Optional
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime, timezone
-from pymongo.errors import PyMongoError
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
+from src.core.config import settings
+from src.core.constants import CHAT_COLLECTION, CHAT_SUMMARY_COLLECTION, INGREDIENT_WATERMARK_COLLECTION
 from src.core.database import db
+from src.core.deadline import deadline_scope
+from src.core.lazy import LazyService
 from src.core.logging import get_logger
-from src.services.ai_service import ai_service
+from src.services.ai_service import IngredientExtractionError, UnsafeResponseError, ai_service
+from src.services.intent_prompts import estimate_tokens
+from src.services.job_queue import job_queue
 from src.services.shopping_list_service import shopping_list_service
 
 logger = get_logger(__name__)
 
 class ChatService:
     def __init__(self):
-        self.collection = db.get_db()['chat_history']
+        self.collection = db.get_db()[CHAT_COLLECTION]
+        # Per user, the timestamp of the newest exchange already mined for ingredients
+        self.watermarks = db.get_db()[INGREDIENT_WATERMARK_COLLECTION]
+        # Per user, a rolling summary of the exchanges older than the history window
+        self.summaries = db.get_db()[CHAT_SUMMARY_COLLECTION]
     
-    def store_message(self, user_id: str, user_message: str, bot_response: str) -> bool:
-        """Store a chat message in the database."""
+    def store_message(
+        self,
+        user_id: str,
+        user_message: str,
+        bot_response: str,
+        message_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> bool:
+        """Store a chat message in the database.
+        
+        With a ``message_id`` the insert is idempotent, so a retried background job
+        does not store the exchange twice. ``timestamp`` is when the response was
+        produced; it defaults to now.
+        """
+        document = {
+            'user_id': user_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'timestamp': timestamp or datetime.now(timezone.utc)
+        }
+        if message_id is not None:
+            document['_id'] = message_id
         try:
-            self.collection.insert_one({
-                'user_id': user_id,
-                'user_message': user_message,
-                'bot_response': bot_response,
-                'timestamp': datetime.now(timezone.utc)
-            })
+            self.collection.insert_one(document)
+            return True
+        except DuplicateKeyError:
             return True
         except Exception as e:
             logger.error("Error storing chat message", user_id=user_id, error=str(e))
             return False
     
-    def get_chat_history(self, user_id: str, limit: int = 10) -> List[Dict[str, str]]:
-        """Retrieve chat history for a user."""
+    def get_chat_history(self, user_id: str) -> List[Dict[str, str]]:
+        """Retrieve the most recent exchanges that fit the history token budget, oldest first.
+        
+        When older exchanges have been summarized the summary comes first, as a
+        ``summary`` message; its reserved share of the budget bounds it.
+        """
         try:
-            chat_history = list(self.collection.find(
-                {'user_id': user_id}
-            ).sort('timestamp', 1).limit(limit))  # Sort by timestamp ascending
-            
-            messages = []
-            for entry in chat_history:
-                messages.append({
-                    'role': 'user',
-                    'message': entry['user_message']
-                })
-                messages.append({
-                    'role': 'assistant',
-                    'message': entry['bot_response']
-                })
-            
+            window, _ = self._history_window(user_id)
+            messages = self._to_messages(window)
+            if settings.CHAT_SUMMARY_ENABLED:
+                summary = self.summaries.find_one({'user_id': user_id})
+                if summary and summary.get('summary'):
+                    messages.insert(0, {'role': 'summary', 'message': summary['summary']})
             return messages
         except Exception as e:
             logger.error("Error retrieving chat history", user_id=user_id, error=str(e))
             return []
     
-    def process_message(self, user_id: str, user_message: str, user_preferences: Dict[str, str]) -> Dict[str, any]:
-        """Process a user message and return bot response with updated shopping list."""
+    def _history_window(self, user_id: str) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+        """Return the exchanges inside the token budget (oldest first) and the timestamp of the newest one left out.
+        
+        The timestamp is None while every exchange still fits.
+        """
+        budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+        if settings.CHAT_SUMMARY_ENABLED:
+            budget -= settings.CHAT_SUMMARY_MAX_TOKENS
+        
+        # Newest first, so the window keeps the latest exchanges; one extra shows whether any fell out.
+        # _id breaks ties between exchanges stored within the same millisecond
+        recent = self.collection.find({'user_id': user_id}).sort([('timestamp', -1), ('_id', -1)]).limit(
+            settings.CHAT_HISTORY_MAX_TURNS + 1
+        )
+        window = []
+        used = 0
+        for entry in recent:
+            used += self._exchange_tokens(entry)
+            if used > budget or len(window) == settings.CHAT_HISTORY_MAX_TURNS:
+                return window[::-1], entry['timestamp']
+            window.append(entry)
+        return window[::-1], None
+    
+    @staticmethod
+    def _exchange_tokens(entry: Dict[str, Any]) -> int:
+        return estimate_tokens(f"User: {entry['user_message']}\nAssistant: {entry['bot_response']}")
+    
+    def _to_messages(self, entries: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        messages = []
+        for entry in entries:
+            messages.append({
+                'role': 'user',
+                'message': entry['user_message']
+            })
+            messages.append({
+                'role': 'assistant',
+                'message': entry['bot_response']
+            })
+        return messages
+    
+    def get_unextracted_turns(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return stored exchanges newer than the user's extraction watermark, oldest first."""
+        watermark = self.watermarks.find_one({'user_id': user_id})
+        query = {'user_id': user_id}
+        if watermark:
+            query['timestamp'] = {'$gt': watermark['extracted_through']}
+        # Newest first so a long backlog is capped to its most recent turns
+        turns = list(self.collection.find(query).sort('timestamp', -1).limit(
+            limit or settings.INGREDIENT_EXTRACTION_MAX_TURNS
+        ))
+        return turns[::-1]
+    
+    def advance_watermark(self, user_id: str, extracted_through: datetime) -> None:
+        """Record that exchanges up to ``extracted_through`` have been mined; never moves backwards."""
+        self.watermarks.update_one(
+            {'user_id': user_id},
+            {
+                '$max': {'extracted_through': extracted_through},
+                '$set': {'updated_at': datetime.now(timezone.utc)}
+            },
+            upsert=True
+        )
+    
+    def extract_new_ingredients(self, user_id: str) -> List[str]:
+        """Extract ingredients from exchanges stored since the last extraction and merge them into the shopping list.
+        
+        The watermark only moves once the model step has succeeded (or was not needed).
+        When it fails the lexicon matches are still added, the turns stay unextracted and
+        IngredientExtractionError is raised so a background job can retry.
+        """
         try:
-            # Categorize message
-            message_type = ai_service.categorize_message(user_message)
-            logger.info("Message categorized", user_id=user_id, message_type=message_type)
-            
-            # Get chat history
-            chat_history = self.get_chat_history(user_id)
-            
-            # Generate response with user preferences
-            bot_response = ai_service.generate_response(
-                user_message, 
-                chat_history,
-                message_type,
-                user_preferences=user_preferences
-            )
-            
-            # Store the message
-            self.store_message(user_id, user_message, bot_response)
+            turns = self.get_unextracted_turns(user_id)
+            if not turns:
+                return []
             
-            # Extract and update ingredients
-            ingredients = ai_service.extract_ingredients(chat_history)
+            try:
+                ingredients = ai_service.extract_ingredients(self._to_messages(turns), strict=True)
+            except IngredientExtractionError as e:
+                if e.ingredients:
+                    shopping_list_service.add_items(user_id, e.ingredients)
+                raise
             if ingredients:
                 shopping_list_service.add_items(user_id, ingredients)
+            self.advance_watermark(user_id, turns[-1]['timestamp'])
+            return ingredients
+        except PyMongoError as e:
+            logger.error("Error extracting ingredients", user_id=user_id, error=str(e))
+            return []
+    
+    async def extract_new_ingredients_async(self, user_id: str) -> List[str]:
+        """Async variant of extract_new_ingredients."""
+        try:
+            turns = await asyncio.to_thread(self.get_unextracted_turns, user_id)
+            if not turns:
+                return []
             
-            # Get updated shopping list
-            shopping_list = shopping_list_service.get_shopping_list(user_id)
-            
+            try:
+                ingredients = await ai_service.extract_ingredients_async(self._to_messages(turns), strict=True)
+            except IngredientExtractionError as e:
+                if e.ingredients:
+                    await asyncio.to_thread(shopping_list_service.add_items, user_id, e.ingredients)
+                raise
+            if ingredients:
+                await asyncio.to_thread(shopping_list_service.add_items, user_id, ingredients)
+            await asyncio.to_thread(self.advance_watermark, user_id, turns[-1]['timestamp'])
+            return ingredients
+        except PyMongoError as e:
+            logger.error("Error extracting ingredients", user_id=user_id, error=str(e))
+            return []
+    
+    def get_unsummarized_turns(self, user_id: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Return the current summary and the exchanges that left the history window but are not in it yet, oldest first."""
+        _, folded_through = self._history_window(user_id)
+        if folded_through is None:
+            return None, []
+        summary = self.summaries.find_one({'user_id': user_id}) or {}
+        timestamps = {'$lte': folded_through}
+        if summary.get('summarized_through'):
+            timestamps['$gt'] = summary['summarized_through']
+        turns = list(self.collection.find({'user_id': user_id, 'timestamp': timestamps}).sort('timestamp', 1).limit(
+            settings.CHAT_SUMMARY_BATCH_TURNS
+        ))
+        return summary.get('summary'), turns
+    
+    def save_summary(self, user_id: str, summary: str, summarized_through: datetime) -> None:
+        self.summaries.update_one(
+            {'user_id': user_id},
+            {'$set': {
+                'summary': summary,
+                'summarized_through': summarized_through,
+                'updated_at': datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+    
+    def update_summary(self, user_id: str) -> None:
+        """Fold exchanges that fell out of the history window into the user's rolling summary.
+        
+        Best effort: on failure the summary is left as it was and the same exchanges are
+        folded on a later turn.
+        """
+        if not settings.CHAT_SUMMARY_ENABLED:
+            return
+        try:
+            summary, turns = self.get_unsummarized_turns(user_id)
+            if not turns:
+                return
+            summary = ai_service.summarize_history(summary, self._to_messages(turns))
+            self.save_summary(user_id, summary, turns[-1]['timestamp'])
+        except Exception as e:
+            logger.error("Error updating chat summary", user_id=user_id, error=str(e))
+    
+    async def update_summary_async(self, user_id: str) -> None:
+        """Async variant of update_summary."""
+        if not settings.CHAT_SUMMARY_ENABLED:
+            return
+        try:
+            summary, turns = await asyncio.to_thread(self.get_unsummarized_turns, user_id)
+            if not turns:
+                return
+            summary = await ai_service.summarize_history_async(summary, self._to_messages(turns))
+            await asyncio.to_thread(self.save_summary, user_id, summary, turns[-1]['timestamp'])
+        except Exception as e:
+            logger.error("Error updating chat summary", user_id=user_id, error=str(e) or type(e).__name__)
+    
+    def process_message(
+        self,
+        user_id: str,
+        user_message: str,
+        user_preferences: Dict[str, str],
+        message_type: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, any]:
+        """Process a user message and return bot response with updated shopping list.
+        
+        ``message_type`` may be supplied when the message was already classified
+        (e.g. by the inference pool). ``deadline`` (see src.core.deadline) bounds the
+        whole turn: classification, generation, extraction and the summary update each
+        get only the time remaining.
+        """
+        with deadline_scope(deadline):
+            try:
+                # Categorize message
+                if message_type is None:
+                    message_type = ai_service.categorize_message(user_message)
+                logger.info("Message categorized", user_id=user_id, message_type=message_type)
+                
+                # Get chat history
+                chat_history = self.get_chat_history(user_id)
+                
+                # Generate response with user preferences
+                bot_response = ai_service.generate_response(
+                    user_message, 
+                    chat_history,
+                    message_type,
+                    user_preferences=user_preferences
+                )
+                
+                # Store the message
+                self.store_message(user_id, user_message, bot_response)
+                
+                # Extract ingredients from the exchanges not mined yet, including this one
+                try:
+                    self.extract_new_ingredients(user_id)
+                except IngredientExtractionError:
+                    # The turns stay unextracted and are mined again with the next message
+                    pass
+                
+                # Fold exchanges that no longer fit the history window into the summary
+                self.update_summary(user_id)
+                
+                # Get updated shopping list
+                shopping_list = shopping_list_service.get_shopping_list(user_id)
+                
+                return {
+                    'bot_response': bot_response,
+                    'shopping_list': shopping_list,
+                    'preferences': user_preferences
+                }
+                
+            except Exception as e:
+                logger.error("Error processing message", user_id=user_id, error=str(e))
+                return {
+                    'bot_response': "I apologize, but I encountered an error processing your message. Please try again.",
+                    'shopping_list': [],
+                    'preferences': {}
+                }
+    
+    async def process_message_async(
+        self,
+        user_id: str,
+        user_message: str,
+        user_preferences: Dict[str, str],
+        message_type: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, any]:
+        """Async variant of process_message: LLM calls are awaited, MongoDB calls run in worker threads."""
+        with deadline_scope(deadline):
+            try:
+                if message_type is None:
+                    message_type = await ai_service.categorize_message_async(user_message)
+                logger.info("Message categorized", user_id=user_id, message_type=message_type)
+                
+                chat_history = await asyncio.to_thread(self.get_chat_history, user_id)
+                
+                bot_response = await ai_service.generate_response_async(
+                    user_message,
+                    chat_history,
+                    message_type,
+                    user_preferences=user_preferences
+                )
+                
+                return await self._complete_turn(user_id, user_message, bot_response, user_preferences)
+                
+            except Exception as e:
+                logger.error("Error processing message", user_id=user_id, error=str(e) or type(e).__name__)
+                return {
+                    'bot_response': "I apologize, but I encountered an error processing your message. Please try again.",
+                    'shopping_list': [],
+                    'preferences': {}
+                }
+    
+    async def stream_message_async(
+        self,
+        user_id: str,
+        user_message: str,
+        user_preferences: Dict[str, str],
+        message_type: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``chunk`` events while the response is generated, then a ``done`` event with the updated shopping list.
+        
+        A ``replace`` event carries the safe response when streamed output fails validation;
+        an ``error`` event ends the stream if processing fails. With background jobs enabled
+        a ``shopping_list`` event follows once the list has been updated.
+        """
+        with deadline_scope(deadline):
+            try:
+                if message_type is None:
+                    message_type = await ai_service.categorize_message_async(user_message)
+                logger.info("Message categorized", user_id=user_id, message_type=message_type)
+                
+                chat_history = await asyncio.to_thread(self.get_chat_history, user_id)
+                
+                parts = []
+                try:
+                    async for text in ai_service.stream_response_async(
+                        user_message,
+                        chat_history,
+                        message_type,
+                        user_preferences=user_preferences
+                    ):
+                        parts.append(text)
+                        yield {'event': 'chunk', 'data': {'text': text}}
+                    bot_response = "".join(parts).strip()
+                except UnsafeResponseError as e:
+                    bot_response = e.safe_response
+                    yield {'event': 'replace', 'data': {'text': bot_response}}
+                
+                result = await self._complete_turn(user_id, user_message, bot_response, user_preferences)
+                job_id = result.pop('job_id', None)
+                yield {'event': 'done', 'data': result}
+                
+                if job_id is not None:
+                    # Push the list once the background update has run
+                    updated = await job_queue.wait(job_id, settings.SHOPPING_LIST_PUSH_TIMEOUT_SECONDS)
+                    shopping_list = await asyncio.to_thread(shopping_list_service.get_shopping_list, user_id)
+                    yield {'event': 'shopping_list', 'data': {'shopping_list': shopping_list, 'updated': updated}}
+                
+            except Exception as e:
+                logger.error("Error streaming message", user_id=user_id, error=str(e) or type(e).__name__)
+                yield {
+                    'event': 'error',
+                    'data': {'detail': "I apologize, but I encountered an error processing your message. Please try again."}
+                }
+    
+    async def _complete_turn(
+        self,
+        user_id: str,
+        user_message: str,
+        bot_response: str,
+        user_preferences: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Store the exchange, update the shopping list and return the response payload.
+        
+        With background jobs enabled the work is queued instead; the returned list is the
+        one before this turn and ``job_id`` identifies the pending update. A user's turns
+        are completed one at a time in order and stored with the time of the response,
+        so a turn is never stored behind the extraction watermark.
+        """
+        if settings.BACKGROUND_JOBS_ENABLED:
+            job_id = await job_queue.enqueue('complete_turn', {
+                'user_id': user_id,
+                'user_message': user_message,
+                'bot_response': bot_response,
+                'message_id': uuid.uuid4().hex,
+                'timestamp': datetime.now(timezone.utc)
+            }, key=user_id)
+            shopping_list = await asyncio.to_thread(shopping_list_service.get_shopping_list, user_id)
             return {
                 'bot_response': bot_response,
                 'shopping_list': shopping_list,
-                'preferences': user_preferences
-            }
-            
-        except Exception as e:
-            logger.error("Error processing message", user_id=user_id, error=str(e))
-            return {
-                'bot_response': "I apologize, but I encountered an error processing your message. Please try again.",
-                'shopping_list': [],
-                'preferences': {}
+                'preferences': user_preferences,
+                'job_id': job_id
             }
+        
+        await asyncio.to_thread(self.store_message, user_id, user_message, bot_response)
+        try:
+            await self.extract_new_ingredients_async(user_id)
+        except IngredientExtractionError:
+            # The turns stay unextracted and are mined again with the next message
+            pass
+        await self.update_summary_async(user_id)
+        
+        shopping_list = await asyncio.to_thread(shopping_list_service.get_shopping_list, user_id)
+        
+        return {
+            'bot_response': bot_response,
+            'shopping_list': shopping_list,
+            'preferences': user_preferences
+        }
+
+# Create a lazily initialized singleton instance
+chat_service: LazyService[ChatService] = LazyService("chat_service", ChatService)
+
+async def _complete_turn_job(payload: Dict[str, Any]) -> None:
+    """Background job: store the exchange, merge newly mentioned ingredients into the shopping list and update the summary.
+    
+    A failed store or extraction raises, so the job queue retries the turn with backoff.
+    """
+    service = await asyncio.to_thread(chat_service.get)
+    stored = await asyncio.to_thread(
+        service.store_message,
+        payload['user_id'],
+        payload['user_message'],
+        payload['bot_response'],
+        payload['message_id'],
+        payload.get('timestamp')
+    )
+    if not stored:
+        raise RuntimeError("Failed to store chat message")
+    await service.extract_new_ingredients_async(payload['user_id'])
+    await service.update_summary_async(payload['user_id'])
 
-# Create a singleton instance
-chat_service = ChatService() 
\ No newline at end of file
+job_queue.register('complete_turn', _complete_turn_job)
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+from src.services.message_classifier import MessageClassifier, message_classifier
+
+logger = get_logger(__name__)
+
+@dataclass
+class _PendingMessage:
+    message: str
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+class ClassificationBatcher:
+    """Collects concurrent classification requests and runs them as one padded batch."""
+
+    def __init__(
+        self,
+        classifier: MessageClassifier,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 1024
+    ):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[_PendingMessage]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background batching thread if it is not running yet."""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(
+                target=self._run,
+                name="classification-batcher",
+                daemon=True
+            )
+            self._worker.start()
+            logger.info(
+                "Classification batcher started",
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait * 1000
+            )
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stop the batching thread; queued messages are still processed before it exits."""
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def submit(self, message: str) -> Future:
+        """Queue a message and return a future resolving to its category."""
+        self.start()
+        pending = _PendingMessage(message)
+        self._queue.put_nowait(pending)
+        metrics.set_gauge("classifier_batch_queue_depth", self._queue.qsize())
+        return pending.future
+
+    def classify_message(self, message: str, timeout: Optional[float] = None) -> str:
+        """Classify a message through the shared batch; falls back to direct classification when full."""
+        try:
+            future = self.submit(message)
+        except queue.Full:
+            metrics.increment("classifier_batch_rejected_total")
+            logger.warning("Classification queue full, classifying inline")
+            return self.classifier.classify_message(message)
+        return future.result(timeout)
+
+    def _run(self) -> None:
+        while not (self._stopped.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._process(batch)
+            except Exception as e:
+                # One bad batch must not stop the thread every later caller waits on
+                logger.error(f"Error processing classification batch: {str(e)}", batch_size=len(batch))
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+    def _process(self, batch: List[_PendingMessage]) -> None:
+        # Callers that gave up (e.g. a timed-out async waiter) cancelled their future; the
+        # rest are marked running so they can no longer be cancelled while the batch runs
+        batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started_at = time.perf_counter()
+        metrics.set_gauge("classifier_batch_queue_depth", self._queue.qsize())
+        metrics.observe("classifier_batch_size", len(batch))
+        for pending in batch:
+            metrics.observe("classifier_batch_wait_ms", (started_at - pending.enqueued_at) * 1000)
+
+        try:
+            categories = self.classifier.classify_batch([pending.message for pending in batch])
+        except Exception as e:
+            logger.error(f"Error classifying batch: {str(e)}", batch_size=len(batch))
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        metrics.observe("classifier_batch_latency_ms", (time.perf_counter() - started_at) * 1000)
+        for pending, category in zip(batch, categories):
+            pending.future.set_result(category)
+
+# Create a singleton instance
+classification_batcher = ClassificationBatcher(
+    message_classifier,
+    max_batch_size=settings.CLASSIFIER_BATCH_MAX_SIZE,
+    max_wait_ms=settings.CLASSIFIER_BATCH_MAX_WAIT_MS,
+    max_queue_size=settings.CLASSIFIER_BATCH_QUEUE_SIZE
+)
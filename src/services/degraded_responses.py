@@ -0,0 +1,23 @@
+from typing import List, Tuple
+
+from src.core.constants import DEGRADED_RESPONSES
+from src.services.ingredient_extractor import ingredient_extractor
+
+def _join_items(items: List[str]) -> str:
+    if len(items) == 1:
+        return items[0]
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+def degraded_response(message: str, message_type: str) -> Tuple[str, str]:
+    """Answer without the model; return the text and whether a deterministic ``handler`` or the ``fallback`` produced it.
+
+    Item additions are confirmed from the local lexicon, which is also what the
+    shopping list update uses while the model is unavailable.
+    """
+    if message_type == "Item Addition type":
+        items = ingredient_extractor.extract(message)
+        if items:
+            return DEGRADED_RESPONSES["ITEM_ADDITION"].format(_join_items(items)), "handler"
+    if message_type == "Update Cart type":
+        return DEGRADED_RESPONSES["UPDATE_CART"], "handler"
+    return DEGRADED_RESPONSES["TRY_LATER"], "fallback"
@@ -0,0 +1,90 @@
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.core.constants import CATEGORIES, CATEGORY_EXAMPLES
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+def load_labelled_examples(path: str) -> Dict[str, List[str]]:
+    """Load ``{"message": ..., "category": ...}`` lines from a JSONL file, grouped by category."""
+    examples = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("category") not in CATEGORIES or not record.get("message"):
+                logger.warning(f"Skipping invalid labelled example on line {line_number} of {path}")
+                continue
+            examples[record["category"]].append(record["message"])
+    return dict(examples)
+
+def merge_examples(*sources: Optional[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    """Combine several ``category -> messages`` mappings."""
+    merged = defaultdict(list)
+    for source in sources:
+        for category, messages in (source or {}).items():
+            merged[category].extend(messages)
+    return dict(merged)
+
+class EmbeddingClassifier:
+    """Nearest-centroid classifier over sentence embeddings of labelled example messages."""
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        examples: Optional[Dict[str, List[str]]] = None,
+        temperature: float = 0.05
+    ):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The embedding classifier requires sentence-transformers "
+                "(pip install sentence-transformers)"
+            ) from e
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.temperature = temperature
+        self.categories = list(CATEGORIES)
+        self.centroids = self.build_centroids(CATEGORY_EXAMPLES if examples is None else examples)
+        logger.info(
+            "Embedding classifier initialized",
+            model=model_name,
+            dimensions=self.centroids.shape[1]
+        )
+
+    def embed(self, messages: List[str]) -> np.ndarray:
+        """Return L2-normalized embeddings, one row per message."""
+        return self.model.encode(
+            messages,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32)
+
+    def build_centroids(self, examples: Dict[str, List[str]]) -> np.ndarray:
+        """Average and re-normalize the example embeddings of each category into a (categories x dims) matrix."""
+        missing = [category for category in self.categories if not examples.get(category)]
+        if missing:
+            raise ValueError(f"No labelled examples for categories: {missing}")
+
+        centroids = np.stack([
+            self.embed(examples[category]).mean(axis=0)
+            for category in self.categories
+        ])
+        return centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    def score_batch(self, messages: List[str]) -> List[Dict[str, float]]:
+        """Score every category for each message with one cosine-similarity matrix product."""
+        similarities = self.embed(messages) @ self.centroids.T
+        # Temperature-scaled softmax turns similarities into scores comparable with the thresholds
+        logits = similarities / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return [dict(zip(self.categories, row.tolist())) for row in probabilities]
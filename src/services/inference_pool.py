@@ -0,0 +1,162 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional
+
+from src.core.config import settings
+from src.core.deadline import budget
+from src.core.lazy import LazyService
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+from src.services.message_classifier import (
+    ClassificationResult,
+    MessageClassifier,
+    build_classification_cache,
+    build_rule_classifier,
+    classify_fast,
+    record_classification
+)
+
+logger = get_logger(__name__)
+
+class InferencePoolFull(Exception):
+    """Raised when more classifications are pending than the pool accepts."""
+
+# Per-process classifier, created by the pool initializer in each worker
+_worker_classifier: Optional[MessageClassifier] = None
+
+def _init_worker(classifier_type: str, bart_mode: str, cascade: List[str], torch_threads: int) -> None:
+    global _worker_classifier
+    if torch_threads > 0:
+        # Avoid oversubscribing cores when several workers run side by side
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    # Cache and rules run in the API process; workers only do model inference
+    _worker_classifier = MessageClassifier(
+        classifier_type,
+        bart_mode=bart_mode,
+        cascade=[tier for tier in cascade if tier != "rules"],
+        cascade_margins=settings.CLASSIFIER_CASCADE_MARGINS,
+        default_cascade_margin=settings.CLASSIFIER_CASCADE_MARGIN
+    )
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+def _classify_in_worker(message: str) -> ClassificationResult:
+    return _worker_classifier.classify_with_details(message)
+
+class InferencePool:
+    """Pool of worker processes, each holding one classifier model, behind an async API."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_pending: int = 64,
+        timeout_seconds: float = 5.0,
+        torch_threads: int = 1
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self.torch_threads = torch_threads
+        self.cache = build_classification_cache()
+        self.rules = build_rule_classifier()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> "InferencePool":
+        """Spawn the workers and wait until each one has loaded its model."""
+        started_at = time.perf_counter()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                settings.CLASSIFIER_TYPE,
+                settings.BART_CLASSIFICATION_MODE,
+                settings.CLASSIFIER_CASCADE,
+                self.torch_threads
+            )
+        )
+        pids = {future.result() for future in [self._executor.submit(_worker_ready) for _ in range(self.workers)]}
+        logger.info(
+            "Inference pool started",
+            workers=len(pids),
+            seconds=round(time.perf_counter() - started_at, 3)
+        )
+        return self
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def classify(self, message: str) -> str:
+        """Classify a message without blocking the event loop."""
+        return (await self.classify_with_details(message))["category"]
+
+    async def classify_with_details(self, message: str) -> ClassificationResult:
+        """Resolve cheap tiers in-process and send the rest to a worker, bounded by the pending limit and timeout."""
+        started_at = time.perf_counter()
+        result = classify_fast(message, self.cache, self.rules)
+        if result is not None:
+            record_classification(result, started_at)
+            return result
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.increment("inference_pool_rejected_total")
+                raise InferencePoolFull(f"{self._pending} classifications already pending")
+            self._pending += 1
+            metrics.set_gauge("inference_pool_pending", self._pending)
+
+        future = None
+        try:
+            # Capped by the request deadline; raises DeadlineExceededError (a timeout) once it has passed
+            timeout = budget(self.timeout_seconds)
+            future = self._executor.submit(_classify_in_worker, message)
+            # Released when the worker is done, not when the caller gives up: a timed-out
+            # classification keeps running and still counts against max_pending
+            future.add_done_callback(self._release)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            if self.cache is not None:
+                self.cache.set(message, result["category"])
+        except asyncio.TimeoutError:
+            metrics.increment("inference_pool_timeouts_total")
+            logger.error("Classification timed out in inference pool", timeout=self.timeout_seconds)
+            result = ClassificationResult(category="Others", confidence=0.0, tier="error")
+        except Exception as e:
+            logger.error(f"Error classifying message in inference pool: {str(e)}")
+            result = ClassificationResult(category="Others", confidence=0.0, tier="error")
+        if future is None:
+            # Submitting failed, so no callback will release the slot
+            self._release()
+
+        metrics.observe("inference_pool_latency_ms", (time.perf_counter() - started_at) * 1000)
+        record_classification(result, started_at)
+        return result
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        with self._lock:
+            self._pending -= 1
+            metrics.set_gauge("inference_pool_pending", self._pending)
+
+# Create a lazily initialized singleton instance (warmed up only when enabled)
+inference_pool: LazyService[InferencePool] = LazyService(
+    "inference_pool",
+    lambda: InferencePool(
+        workers=settings.INFERENCE_POOL_WORKERS,
+        max_pending=settings.INFERENCE_POOL_MAX_PENDING,
+        timeout_seconds=settings.INFERENCE_POOL_TIMEOUT_SECONDS,
+        torch_threads=settings.INFERENCE_WORKER_TORCH_THREADS
+    ).start(),
+    warm_up=settings.INFERENCE_POOL_ENABLED
+)
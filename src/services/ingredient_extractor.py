@@ -0,0 +1,158 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from src.core.cache import normalize_message
+from src.core.config import settings
+from src.core.ingredient_lexicon import INGREDIENT_LEXICON
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Trie key marking the end of a term; its value is the canonical name
+_TERM_END = ""
+
+_UNITS = (
+    r"cups?|tbsps?|tablespoons?|tsps?|teaspoons?|g|grams?|kg|kilos?|kilograms?|lbs?|pounds?|oz|ounces?|"
+    r"ml|l|liters?|litres?|cans?|tins?|jars?|bottles?|packs?|packets?|bunch(?:es)?|cloves?|pinch(?:es)?|"
+    r"slices?|pieces?|dozen|bags?|boxes?|handfuls?|sticks?|heads?"
+)
+_QUANTITY = (
+    rf"(?:(?:\d+(?:[./]\d+)?|an?|one|two|three|four|five|six|half)\s*(?:{_UNITS})\s+(?:of\s+)?|\d+(?:[./]\d+)?\s+)"
+)
+# "2 cups of flour", "a pinch of saffron", "3 eggs"
+_QUANTITY_PATTERN = re.compile(rf"\b{_QUANTITY}([a-z][a-z\s-]*)")
+_LEADING_QUANTITY = re.compile(rf"^\s*{_QUANTITY}")
+# "add milk, eggs and saffron to my shopping list"
+_ADD_PATTERN = re.compile(
+    r"\b(?:add|buy|get|pick up|need)\s+(.+?)(?=\s+(?:to|on|onto|in|into)\s+(?:my|the)\b|[.!?\n]|$)"
+)
+_LIST_SEPARATOR = re.compile(r",|\band\b|&|\bor\b")
+_PHRASE_STOP = re.compile(r"\b(?:and|or|to|for|in|into|with|on|from|at|until|then|per)\b|[,;:.!?()]")
+_FILLER_WORDS = {
+    "a", "an", "the", "some", "more", "few", "of", "fresh", "large", "small", "medium",
+    "chopped", "diced", "sliced", "minced", "ground", "extra", "my", "your", "me", "us"
+}
+# Nouns a bare number counts that are not groceries: "2 dollars", "3 people", "20 mins", "4 portions"
+_MEASURE_NOUNS = {
+    "dollars", "dollar", "bucks", "buck", "euros", "euro", "cents", "cent", "pence", "quid", "rupees", "rupee",
+    "people", "person", "persons", "guests", "guest", "adults", "adult", "kids", "kid", "children", "child",
+    "seconds", "second", "secs", "sec", "minutes", "minute", "mins", "min", "hours", "hour", "hrs", "hr",
+    "days", "day", "nights", "night", "weeks", "week", "months", "month", "years", "year",
+    "servings", "serving", "portions", "portion", "meals", "meal", "times", "degrees"
+}
+_NON_ITEMS = {
+    "it", "them", "that", "this", "these", "those", "everything", "anything", "something",
+    "stuff", "things", "thing", "list", "items", "item", "recipe", "help", "idea", "ideas"
+} | _MEASURE_NOUNS
+
+def singularize(word: str) -> str:
+    """Reduce an English plural to a stem shared with its singular (good enough for matching, not for display)."""
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("ves"):
+        return word[:-3] + "f"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+def _tokens(text: str) -> List[str]:
+    return [singularize(word) for word in normalize_message(text).split()]
+
+class IngredientExtractor:
+    """Lexicon-backed ingredient matcher: a word trie over canonical names and synonyms, longest match wins."""
+
+    def __init__(
+        self,
+        lexicon: Optional[Dict[str, List[str]]] = None,
+        extra_synonyms: Optional[Dict[str, List[str]]] = None
+    ):
+        lexicon = INGREDIENT_LEXICON if lexicon is None else lexicon
+        self._trie: Dict[str, dict] = {}
+        terms = 0
+        for source in (lexicon, extra_synonyms or {}):
+            for canonical, synonyms in source.items():
+                for term in [canonical, *synonyms]:
+                    self._add_term(term, canonical.lower())
+                    terms += 1
+        logger.info("Ingredient extractor initialized", terms=terms)
+
+    def _add_term(self, term: str, canonical: str) -> None:
+        node = self._trie
+        for token in _tokens(term):
+            node = node.setdefault(token, {})
+        node[_TERM_END] = canonical
+
+    def _match_at(self, tokens: List[str], start: int) -> Tuple[Optional[str], int]:
+        """Return the canonical name of the longest term starting at ``start`` and its length in tokens."""
+        node = self._trie
+        canonical, length = None, 0
+        for index in range(start, len(tokens)):
+            node = node.get(tokens[index])
+            if node is None:
+                break
+            if _TERM_END in node:
+                canonical, length = node[_TERM_END], index - start + 1
+        return canonical, length
+
+    def extract(self, text: str) -> List[str]:
+        """Return the sorted canonical names of every lexicon ingredient mentioned in ``text``."""
+        tokens = _tokens(text)
+        found = set()
+        index = 0
+        while index < len(tokens):
+            canonical, length = self._match_at(tokens, index)
+            if canonical is None:
+                index += 1
+            else:
+                found.add(canonical)
+                index += length
+        return sorted(found)
+
+    def canonicalize(self, name: str) -> str:
+        """Map a whole ingredient name to its canonical form, leaving unknown names unchanged."""
+        tokens = _tokens(name)
+        canonical, length = self._match_at(tokens, 0) if tokens else (None, 0)
+        if canonical is not None and length == len(tokens):
+            return canonical
+        return name.strip().lower()
+
+    def unknown_terms(self, text: str) -> List[str]:
+        """Return item-like phrases (after quantities or in "add ... to my list") that match no lexicon entry."""
+        lowered = text.lower()
+        candidates = [match.group(1) for match in _QUANTITY_PATTERN.finditer(lowered)]
+        for match in _ADD_PATTERN.finditer(lowered):
+            candidates.extend(_LIST_SEPARATOR.split(match.group(1)))
+
+        unknown = []
+        for candidate in candidates:
+            phrase = self._clean_phrase(candidate)
+            if phrase and not self.extract(phrase):
+                # Report at most three words; that is enough for the fallback to recognise the item
+                phrase = " ".join(phrase.split()[:3])
+                if phrase not in unknown:
+                    unknown.append(phrase)
+        return unknown
+
+    def extract_with_unknowns(self, text: str) -> Tuple[List[str], List[str]]:
+        return self.extract(text), self.unknown_terms(text)
+
+    @staticmethod
+    def _clean_phrase(candidate: str) -> str:
+        # Keep the words before the first connective, minus quantities and filler
+        phrase = _PHRASE_STOP.split(_LEADING_QUANTITY.sub("", candidate), maxsplit=1)[0]
+        words = [
+            word for word in normalize_message(phrase).split()
+            if word not in _FILLER_WORDS and not word.isdigit()
+        ]
+        if not words or any(word in _NON_ITEMS for word in words):
+            return ""
+        return " ".join(words)
+
+# Create a singleton instance
+ingredient_extractor = IngredientExtractor(extra_synonyms=settings.INGREDIENT_EXTRA_SYNONYMS)
@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional
+
+from src.core.logging import get_logger
+from src.core.message_contexts import MESSAGE_CONTEXTS
+from src.core.prompt_safety import PromptSafety
+
+logger = get_logger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for reporting without an API call."""
+    return (len(text) + 3) // 4
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` at a word boundary so its estimated size stays within ``max_tokens``."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    return (cut.rsplit(None, 1)[0] if " " in cut else cut).rstrip()
+
+def render_static_prompt(message_type: str) -> str:
+    """Render the per-intent part of the prompt: persona, task, context, references and safety guidelines."""
+    context = MESSAGE_CONTEXTS.get(message_type, MESSAGE_CONTEXTS["Others"])
+    references = "\n".join(f"- {ref}" for ref in context['references'])
+    return (
+        f"{context['persona']}\n\n"
+        f"Task: {context['task']}\n"
+        f"Context: {context['context']}\n\n"
+        f"References to consider:\n{references}\n"
+        f"{PromptSafety.add_safety_context('').rstrip()}\n\n"
+        "Please provide a helpful response considering the above context, references, and user preferences."
+    )
+
+def render_dynamic_prompt(
+    sanitized_prompt: str,
+    chat_history_text: Optional[str],
+    user_preferences: Optional[Dict[str, str]]
+) -> str:
+    """Render the per-request part of the prompt: preferences, history and the user message."""
+    sections: List[str] = []
+    if user_preferences:
+        preferences = [f"- {pref}: {value}" for pref, value in user_preferences.items() if value != "not_set"]
+        if preferences:
+            sections.append("User Preferences:\n" + "\n".join(preferences))
+    sections.append(f"Chat History:\n{chat_history_text or 'No previous conversation.'}")
+    sections.append(f"User Message: {sanitized_prompt}")
+    return "\n\n".join(sections)
+
+class IntentPrompts:
+    """Each message type's static prompt, rendered once.
+
+    When the LLM provider takes a system instruction the static prompt is sent as
+    that (see system_instruction_for) and only the dynamic part as contents;
+    otherwise the precompiled static prompt is sent as a prefix.
+    """
+
+    def __init__(self, system_instruction_supported: bool):
+        self.system_instruction_supported = system_instruction_supported
+        self.static_prompts = {message_type: render_static_prompt(message_type) for message_type in MESSAGE_CONTEXTS}
+        logger.info(
+            "Intent prompts compiled",
+            intents=len(self.static_prompts),
+            system_instruction=system_instruction_supported,
+            static_tokens={message_type: estimate_tokens(prompt) for message_type, prompt in self.static_prompts.items()}
+        )
+
+    def static_prompt_for(self, message_type: str) -> str:
+        return self.static_prompts.get(message_type, self.static_prompts["Others"])
+
+    def system_instruction_for(self, message_type: str) -> Optional[str]:
+        if not self.system_instruction_supported:
+            return None
+        return self.static_prompt_for(message_type)
+
+    def contents_for(self, message_type: str, dynamic_prompt: str) -> str:
+        """Return what is sent per request for this intent."""
+        if self.system_instruction_supported:
+            return dynamic_prompt
+        return f"{self.static_prompt_for(message_type)}\n\n{dynamic_prompt}"
@@ -0,0 +1,292 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from pymongo import ASCENDING
+
+from src.core.config import settings
+from src.core.constants import JOB_QUEUE_COLLECTION
+from src.core.database import db
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# How long a finished job's outcome stays available to wait()
+_WAITER_RETENTION_SECONDS = 60
+
+class JobQueue:
+    """Asyncio worker pool for work that can finish after the response has been sent.
+
+    Failed jobs are retried with exponential backoff until they succeed or run out of
+    attempts; delivery is at-least-once, so handlers must be idempotent. With ``durable``
+    enabled every job is also a MongoDB document: a worker claims it with a lease and
+    deletes it only after the handler succeeds, and a poller re-queues jobs whose lease
+    expired or that another (crashed or restarted) process never ran.
+
+    Jobs enqueued with the same ``key`` run one at a time in enqueue order, a job's
+    retries included, so later jobs for a key never overtake a failing earlier one.
+    The order holds within a process.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 1.0,
+        durable: bool = False,
+        lease_seconds: float = 60.0,
+        poll_seconds: float = 5.0
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.durable = durable
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._start_task: Optional[asyncio.Task] = None
+        self._collection = None
+        # Ids currently in the local queue, so the poller does not queue them twice
+        self._queued: Set[str] = set()
+        self._waiters: Dict[str, asyncio.Future] = {}
+        # Per key with a job queued, running or waiting to retry: the jobs behind it, in order
+        self._key_backlog: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    def register(self, job_type: str, handler: JobHandler) -> None:
+        self._handlers[job_type] = handler
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the workers (and the durable poller); safe to call more than once."""
+        if self._start_task is None:
+            self._start_task = asyncio.create_task(self._start())
+        await asyncio.shield(self._start_task)
+
+    async def _start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._key_backlog = {}
+        if self.durable:
+            self._collection = await asyncio.to_thread(self._open_collection)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.durable:
+            self._tasks.append(asyncio.create_task(self._poll()))
+        logger.info("Job queue started", workers=self.workers, durable=self.durable)
+
+    def _open_collection(self):
+        collection = db.get_db()[JOB_QUEUE_COLLECTION]
+        collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        return collection
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued jobs up to ``timeout`` seconds to finish, then cancel the workers."""
+        if self._start_task is None:
+            return
+        await asyncio.shield(self._start_task)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            # Durable jobs stay in MongoDB and are picked up after the restart
+            logger.warning("Job queue stopped with jobs pending", pending=self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._start_task = None
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], key: Optional[str] = None) -> str:
+        """Queue a job and return its id; jobs sharing ``key`` run in the order they were enqueued."""
+        if job_type not in self._handlers:
+            raise ValueError(f"No handler registered for job type {job_type}")
+        await self.start()
+
+        job = {'_id': uuid.uuid4().hex, 'type': job_type, 'payload': payload, 'attempts': 0, 'key': key}
+        if self.durable:
+            now = datetime.now(timezone.utc)
+            await asyncio.to_thread(
+                self._collection.insert_one,
+                {**job, 'status': 'pending', 'available_at': now, 'created_at': now}
+            )
+        self._waiters[job['_id']] = asyncio.get_running_loop().create_future()
+        self._put(job)
+        return job['_id']
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        """Wait for a job queued by this process; True once it succeeded, False on failure, timeout or unknown id."""
+        future = self._waiters.get(job_id)
+        if future is None:
+            return False
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _put(self, job: Dict[str, Any]) -> None:
+        self._queued.add(job['_id'])
+        key = job.get('key')
+        if key is not None:
+            if key in self._key_backlog:
+                # Dispatched once the jobs ahead of it with the same key are done
+                self._key_backlog[key].append(job)
+                return
+            self._key_backlog[key] = deque()
+        self._dispatch(job)
+
+    def _dispatch(self, job: Dict[str, Any]) -> None:
+        self._queue.put_nowait(job)
+        metrics.set_gauge("job_queue_depth", self._queue.qsize())
+
+    def _requeue(self, job: Dict[str, Any]) -> None:
+        # Dispatched directly: a retried job keeps its place ahead of later jobs with the same key
+        self._queued.add(job['_id'])
+        self._dispatch(job)
+
+    def _release_key(self, job: Dict[str, Any]) -> None:
+        """Dispatch the next job with this job's key, if any."""
+        key = job.get('key')
+        if key is None:
+            return
+        backlog = self._key_backlog.get(key)
+        if backlog:
+            self._dispatch(backlog.popleft())
+        else:
+            self._key_backlog.pop(key, None)
+
+    def _finish(self, job_id: str, succeeded: bool) -> None:
+        future = self._waiters.get(job_id)
+        if future is not None and not future.done():
+            future.set_result(succeeded)
+            asyncio.get_running_loop().call_later(_WAITER_RETENTION_SECONDS, self._waiters.pop, job_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            metrics.set_gauge("job_queue_depth", self._queue.qsize())
+            settled = True
+            try:
+                settled = await self._run(job)
+            except Exception as e:
+                # Bookkeeping failed (e.g. MongoDB unavailable); a durable job is recovered once its lease expires
+                logger.error("Error running job", job_id=job['_id'], type=job['type'], error=str(e))
+            finally:
+                self._queued.discard(job['_id'])
+                if settled:
+                    self._release_key(job)
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]) -> bool:
+        """Run a job; False when it failed and a retry is scheduled."""
+        job_type = job['type']
+        if self.durable and not await asyncio.to_thread(self._claim, job['_id']):
+            # Already done, or being run by another worker or process
+            return True
+
+        started_at = time.perf_counter()
+        try:
+            await self._handlers[job_type](job['payload'])
+        except Exception as e:
+            return await self._handle_failure(job, e)
+
+        metrics.increment("jobs_processed_total", type=job_type)
+        metrics.observe("job_latency_ms", (time.perf_counter() - started_at) * 1000, type=job_type)
+        if self.durable:
+            await asyncio.to_thread(self._collection.delete_one, {'_id': job['_id']})
+        self._finish(job['_id'], True)
+        return True
+
+    async def _handle_failure(self, job: Dict[str, Any], error: Exception) -> bool:
+        """Schedule a retry or record the final failure; True when the job will not run again."""
+        attempts = job['attempts'] + 1
+        if attempts >= self.max_attempts:
+            metrics.increment("jobs_failed_total", type=job['type'])
+            logger.error("Job failed", job_id=job['_id'], type=job['type'], attempts=attempts, error=str(error))
+            if self.durable:
+                await asyncio.to_thread(
+                    self._collection.update_one,
+                    {'_id': job['_id']},
+                    {'$set': {'status': 'failed', 'attempts': attempts, 'error': str(error)}}
+                )
+            self._finish(job['_id'], False)
+            return True
+
+        delay = self.retry_base_seconds * 2 ** (attempts - 1)
+        metrics.increment("jobs_retried_total", type=job['type'])
+        logger.warning("Job failed, retrying", job_id=job['_id'], type=job['type'], attempts=attempts, delay=delay, error=str(error))
+        if self.durable:
+            await asyncio.to_thread(
+                self._collection.update_one,
+                {'_id': job['_id']},
+                {'$set': {
+                    'status': 'pending',
+                    'attempts': attempts,
+                    'available_at': datetime.now(timezone.utc) + timedelta(seconds=delay),
+                    'error': str(error)
+                }}
+            )
+        asyncio.get_running_loop().call_later(delay, self._requeue, {**job, 'attempts': attempts})
+        return False
+
+    def _claim(self, job_id: str) -> bool:
+        now = datetime.now(timezone.utc)
+        return self._collection.find_one_and_update(
+            {
+                '_id': job_id,
+                '$or': [
+                    {'status': 'pending'},
+                    {'status': 'processing', 'lease_expires_at': {'$lt': now}}
+                ]
+            },
+            {'$set': {'status': 'processing', 'lease_expires_at': now + timedelta(seconds=self.lease_seconds)}}
+        ) is not None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                jobs = await asyncio.to_thread(self._find_recoverable)
+            except Exception as e:
+                logger.error("Error polling job queue", error=str(e))
+                continue
+            for job in jobs:
+                if job['_id'] not in self._queued:
+                    self._put({
+                        '_id': job['_id'],
+                        'type': job['type'],
+                        'payload': job['payload'],
+                        'attempts': job['attempts'],
+                        'key': job.get('key')
+                    })
+
+    def _find_recoverable(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Pending jobs nobody picked up within a poll interval, and jobs whose lease expired."""
+        now = datetime.now(timezone.utc)
+        metrics.set_gauge("job_queue_durable_pending", self._collection.count_documents({'status': 'pending'}))
+        return list(self._collection.find({
+            '$or': [
+                {'status': 'pending', 'available_at': {'$lte': now - timedelta(seconds=self.poll_seconds)}},
+                {'status': 'processing', 'lease_expires_at': {'$lt': now}}
+            ]
+        }).sort('created_at', ASCENDING).limit(limit))
+
+# Create a singleton instance
+job_queue = JobQueue(
+    workers=settings.JOB_QUEUE_WORKERS,
+    max_attempts=settings.JOB_QUEUE_MAX_ATTEMPTS,
+    retry_base_seconds=settings.JOB_QUEUE_RETRY_BASE_SECONDS,
+    durable=settings.JOB_QUEUE_DURABLE,
+    lease_seconds=settings.JOB_QUEUE_LEASE_SECONDS,
+    poll_seconds=settings.JOB_QUEUE_POLL_SECONDS
+)
@@ -0,0 +1,301 @@
+import asyncio
+import inspect
+from abc import ABC, abstractmethod
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+
+from src.core.config import settings
+from src.core.constants import ERROR_MESSAGES
+from src.core.lazy import LazyService
+from src.core.logging import get_logger
+from src.services.intent_prompts import estimate_tokens, truncate_to_tokens
+from src.services.llm_routing import LLMRoute
+
+logger = get_logger(__name__)
+
+# google-generativeai gained ``system_instruction`` after 0.3.x; older SDKs get the static part as a prefix
+SYSTEM_INSTRUCTION_SUPPORTED = "system_instruction" in inspect.signature(genai.GenerativeModel.__init__).parameters
+
+class LLMProvider(ABC):
+    """Text-generation backend behind AIService and the Gemini classifier.
+
+    ``supports_system_instruction`` says whether ``system_instruction`` is sent
+    separately; when it is not, callers prepend the static prompt to the contents.
+    ``route`` picks the model and generation config; without one the provider's
+    default model is used.
+    """
+
+    name = "base"
+    model_name = ""
+    supports_system_instruction = False
+
+    @abstractmethod
+    def generate(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def generate_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stream_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> AsyncIterator[str]:
+        """Open a streamed generation and return an iterator over its text chunks."""
+        raise NotImplementedError
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+def _response_text(response: Any) -> str:
+    """Text of a Gemini response or chunk; empty when the candidate was blocked (the SDK raises on ``.text``)."""
+    try:
+        return response.text or ""
+    except ValueError:
+        return ""
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google-generativeai; one model object per model and system instruction, built on first use."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        if not api_key:
+            raise ValueError(ERROR_MESSAGES["API_KEY_MISSING"])
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.supports_system_instruction = SYSTEM_INSTRUCTION_SUPPORTED
+        self._models: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, system_instruction: Optional[str], route: Optional[LLMRoute] = None) -> Any:
+        key = (route.model if route is not None else self.model_name, system_instruction)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    if system_instruction is not None and self.supports_system_instruction:
+                        model = genai.GenerativeModel(key[0], system_instruction=system_instruction)
+                    else:
+                        model = genai.GenerativeModel(key[0])
+                    self._models[key] = model
+        return model
+
+    @staticmethod
+    def _generation_config(route: Optional[LLMRoute]) -> Optional[Dict[str, Any]]:
+        return dict(route.generation_config) if route is not None and route.generation_config else None
+
+    def generate(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        model = self._model(system_instruction, route)
+        return _response_text(model.generate_content(prompt, generation_config=self._generation_config(route)))
+
+    async def generate_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        model = self._model(system_instruction, route)
+        return _response_text(
+            await model.generate_content_async(prompt, generation_config=self._generation_config(route))
+        )
+
+    async def stream_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> AsyncIterator[str]:
+        model = self._model(system_instruction, route)
+        response = await model.generate_content_async(
+            prompt,
+            generation_config=self._generation_config(route),
+            stream=True
+        )
+        return self._chunks(response)
+
+    @staticmethod
+    async def _chunks(response: Any) -> AsyncIterator[str]:
+        async for chunk in response:
+            yield _response_text(chunk)
+
+    def count_tokens(self, text: str) -> int:
+        return self._model(None).count_tokens(text).total_tokens
+
+# Tried in order after LLM_STUB_RESPONSES; the first pattern found in the prompt picks the answer
+DEFAULT_STUB_RESPONSES: List[Tuple[str, str]] = [
+    (r"categorizes user messages", "Others"),
+    (r"extract all ingredient names", "[]"),
+    (r"running summary of a conversation", "The user has been planning meals and building a shopping list."),
+    (
+        r"User Message: (?P<message>[^\n]*)",
+        "Here is a suggestion for \"{message}\": pick fresh seasonal produce, compare unit prices "
+        "and add what you need to your shopping list. Check labels for allergens and consult a "
+        "professional for specific dietary advice."
+    ),
+    (r".", "I can help with recipes, item information and your shopping list.")
+]
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+class StubProvider(LLMProvider):
+    """Offline backend for load tests and CI: canned or templated answers after a simulated delay.
+
+    Answers are deterministic: the first pattern found in the prompt picks a template,
+    whose ``{name}`` placeholders are filled from the pattern's named groups (``{prompt}``
+    is the whole prompt). Time to the first token is drawn from a fixed, uniform or
+    log-normal distribution around ``latency_ms``; the answer then arrives at
+    ``tokens_per_second``, cut at the route's ``max_output_tokens``. ``error_rate``
+    makes that share of calls fail.
+    """
+
+    name = "stub"
+    model_name = "stub"
+    supports_system_instruction = True
+
+    def __init__(
+        self,
+        responses: Optional[Dict[str, str]] = None,
+        latency_ms: float = 800.0,
+        latency_distribution: str = "lognormal",
+        latency_spread: float = 0.5,
+        tokens_per_second: float = 60.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = 0
+    ):
+        if latency_distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        self.responses = [
+            (re.compile(pattern, re.DOTALL), template)
+            for pattern, template in list((responses or {}).items()) + DEFAULT_STUB_RESPONSES
+        ]
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def answer(self, prompt: str, route: Optional[LLMRoute] = None) -> str:
+        for pattern, template in self.responses:
+            match = pattern.search(prompt)
+            if match is not None:
+                values = {"prompt": prompt, **{name: value or "" for name, value in match.groupdict().items()}}
+                text = _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+                if route is not None and route.generation_config.get("max_output_tokens"):
+                    text = truncate_to_tokens(text, route.generation_config["max_output_tokens"])
+                return text
+        return ""
+
+    def generate(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        text = self.answer(prompt, route)
+        first_token, failed = self._draw()
+        time.sleep(first_token + self._transfer_seconds(text))
+        self._raise_if(failed)
+        return text
+
+    async def generate_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> str:
+        text = self.answer(prompt, route)
+        first_token, failed = self._draw()
+        await asyncio.sleep(first_token + self._transfer_seconds(text))
+        self._raise_if(failed)
+        return text
+
+    async def stream_async(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        route: Optional[LLMRoute] = None
+    ) -> AsyncIterator[str]:
+        text = self.answer(prompt, route)
+        first_token, failed = self._draw()
+        await asyncio.sleep(first_token)
+        self._raise_if(failed)
+        return self._chunks(text)
+
+    async def _chunks(self, text: str) -> AsyncIterator[str]:
+        # A few words per chunk, roughly like the real stream
+        words = re.findall(r"\S+\s*", text)
+        for start in range(0, len(words), 4):
+            chunk = "".join(words[start:start + 4])
+            await asyncio.sleep(self._transfer_seconds(chunk))
+            yield chunk
+
+    def _draw(self) -> Tuple[float, bool]:
+        """Time to the first token in seconds, and whether this call fails."""
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                spread = self.latency_ms * self.latency_spread
+                latency_ms = self._random.uniform(self.latency_ms - spread, self.latency_ms + spread)
+            elif self.latency_distribution == "lognormal":
+                latency_ms = self.latency_ms * math.exp(self._random.gauss(0.0, self.latency_spread))
+            else:
+                latency_ms = self.latency_ms
+            failed = self._random.random() < self.error_rate
+        return max(0.0, latency_ms) / 1000, failed
+
+    def _transfer_seconds(self, text: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return estimate_tokens(text) / self.tokens_per_second
+
+    @staticmethod
+    def _raise_if(failed: bool) -> None:
+        if failed:
+            raise ConnectionError("Simulated LLM provider failure")
+
+def build_llm_provider() -> LLMProvider:
+    """Create the provider selected by LLM_PROVIDER."""
+    if settings.LLM_PROVIDER == "gemini":
+        return GeminiProvider(settings.GEMINI_API_KEY, settings.GEMINI_MODEL_NAME)
+    if settings.LLM_PROVIDER == "stub":
+        logger.warning("Using the stub LLM provider; answers are canned")
+        return StubProvider(
+            responses=settings.LLM_STUB_RESPONSES,
+            latency_ms=settings.LLM_STUB_LATENCY_MS,
+            latency_distribution=settings.LLM_STUB_LATENCY_DISTRIBUTION,
+            latency_spread=settings.LLM_STUB_LATENCY_SPREAD,
+            tokens_per_second=settings.LLM_STUB_TOKENS_PER_SECOND,
+            error_rate=settings.LLM_STUB_ERROR_RATE,
+            seed=settings.LLM_STUB_SEED
+        )
+    raise ValueError(f"Unknown LLM provider: {settings.LLM_PROVIDER}")
+
+# Create a lazily initialized singleton instance, shared by AIService and the classifier
+llm_provider: LazyService[LLMProvider] = LazyService("llm_provider", build_llm_provider)
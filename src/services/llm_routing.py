@@ -0,0 +1,44 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.services.intent_prompts import estimate_tokens
+
+# Internal tasks with their own routes, next to the MESSAGE_CONTEXTS intents
+CLASSIFICATION_ROUTE = "classification"
+EXTRACTION_ROUTE = "extraction"
+SUMMARIZATION_ROUTE = "summarization"
+
+# Generation parameters a route may set besides "model"
+GENERATION_CONFIG_KEYS = ("max_output_tokens", "temperature", "top_p", "top_k", "stop_sequences")
+
+@dataclass(frozen=True)
+class LLMRoute:
+    """Model and generation config one intent or internal task is sent to."""
+    name: str
+    model: str
+    generation_config: Dict[str, Any] = field(default_factory=dict)
+
+def route_for(name: str) -> LLMRoute:
+    """Resolve ``name`` against LLM_ROUTES; unrouted names use GEMINI_MODEL_NAME with the model's defaults."""
+    config = settings.LLM_ROUTES.get(name) or {}
+    unknown = set(config) - set(GENERATION_CONFIG_KEYS) - {"model"}
+    if unknown:
+        raise ValueError(f"Unknown LLM route settings for {name}: {sorted(unknown)}")
+    return LLMRoute(
+        name=name,
+        model=config.get("model") or settings.GEMINI_MODEL_NAME,
+        generation_config={key: config[key] for key in GENERATION_CONFIG_KEYS if key in config}
+    )
+
+def record_route_usage(route: LLMRoute, prompt: str, response: str, latency_ms: float) -> None:
+    """Latency and estimated token usage of one call, labelled by route and model.
+
+    ``prompt`` is everything sent, system instruction included. The SDK in use does
+    not report usage, so tokens are the same estimates the scheduler charges.
+    """
+    labels = {"route": route.name, "model": route.model}
+    metrics.observe("llm_route_latency_ms", latency_ms, **labels)
+    metrics.increment("llm_route_prompt_tokens_total", estimate_tokens(prompt), **labels)
+    metrics.increment("llm_route_output_tokens_total", estimate_tokens(response), **labels)
@@ -0,0 +1,251 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+class Priority(IntEnum):
+    """Scheduling classes; a lower value is served first."""
+    INTERACTIVE = 0
+    CLASSIFICATION = 1
+    BACKGROUND = 2
+
+class SchedulerOverloadedError(Exception):
+    """Raised when the LLM queue is full or a call waited longer than allowed for a slot."""
+
+def is_quota_error(error: BaseException) -> bool:
+    return isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests))
+
+class TokenBucket:
+    """Refills continuously at ``per_minute``; holds at most one minute's worth. A limit of 0 disables it."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (requests above the capacity only need a full bucket)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(self._clock())
+        needed = min(amount, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        # May go negative for oversized requests; later requests then wait off the debt
+        if self.capacity > 0:
+            self.tokens -= amount
+
+    def drain(self) -> None:
+        if self.capacity > 0:
+            self._refill(self._clock())
+            self.tokens = min(self.tokens, 0.0)
+
+class _Waiter:
+    def __init__(self, priority: Priority, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+        self.cancelled = False
+        self._loop = loop
+        self._future = loop.create_future() if loop is not None else None
+        self._event = threading.Event() if loop is None else None
+
+    def grant(self) -> None:
+        self.granted = True
+        if self._future is not None:
+            self._loop.call_soon_threadsafe(self._resolve)
+        else:
+            self._event.set()
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+class LLMScheduler:
+    """Process-wide admission control for LLM calls, shared by threads and the event loop.
+
+    A call gets a slot once fewer than ``max_concurrency`` calls are running and the
+    requests-per-minute and tokens-per-minute buckets allow it. Waiting calls are served
+    by priority, then arrival order. A provider quota error drains the request bucket,
+    so every caller backs off until it refills instead of retrying on its own timer.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_queue: int = 1000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._requests = TokenBucket(requests_per_minute, clock)
+        self._tokens = TokenBucket(tokens_per_minute, clock)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        # Waiters still queued; cancelled entries stay in the heap until they reach its top
+        self._waiting = 0
+        self._sequence = itertools.count()
+        self._active = 0
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due = 0.0
+
+    @contextmanager
+    def slot(self, priority: Priority, tokens: int = 0, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold a slot for a blocking call; raises SchedulerOverloadedError after ``timeout`` seconds of waiting."""
+        if not settings.LLM_SCHEDULER_ENABLED:
+            yield
+            return
+        waiter = self._enqueue(_Waiter(priority, tokens))
+        if not waiter._event.wait(timeout):
+            with self._lock:
+                if not waiter.granted:
+                    self._abandon(waiter)
+                    metrics.increment("llm_scheduler_rejected_total", priority=priority.name.lower())
+                    raise SchedulerOverloadedError("Timed out waiting for an LLM slot")
+        self._record_wait(waiter)
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(
+        self,
+        priority: Priority,
+        tokens: int = 0,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Hold a slot for an awaited call; a caller cancelled (e.g. by its deadline) or timed out gives up its place."""
+        if not settings.LLM_SCHEDULER_ENABLED:
+            yield
+            return
+        waiter = self._enqueue(_Waiter(priority, tokens, asyncio.get_running_loop()))
+        try:
+            await asyncio.wait_for(waiter._future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._abandon(waiter)
+            if granted:
+                self.release()
+            raise
+        self._record_wait(waiter)
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        finally:
+            self.release()
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count a provider quota rejection and pause admissions until the request bucket refills."""
+        if not is_quota_error(error):
+            return
+        metrics.increment("llm_quota_rejections_total")
+        logger.warning("LLM quota exceeded, throttling", error=str(error))
+        with self._lock:
+            self._requests.drain()
+
+    def release(self) -> None:
+        with self._lock:
+            self._active -= 1
+            self._dispatch()
+
+    def depth(self) -> int:
+        return self._waiting
+
+    def _enqueue(self, waiter: _Waiter) -> _Waiter:
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                metrics.increment("llm_scheduler_rejected_total", priority=waiter.priority.name.lower())
+                raise SchedulerOverloadedError("LLM queue is full")
+            heapq.heappush(self._queue, (waiter.priority, next(self._sequence), waiter))
+            self._waiting += 1
+            self._dispatch()
+        return waiter
+
+    def _dispatch(self) -> None:
+        """Grant slots to waiters in priority order while concurrency and the buckets allow; caller holds the lock."""
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self._active >= self.max_concurrency:
+                break
+            wait = max(self._requests.wait_time(1), self._tokens.wait_time(waiter.tokens))
+            if wait > 0:
+                self._wake_in(wait)
+                break
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(waiter.tokens)
+            self._active += 1
+            self._waiting -= 1
+            waiter.grant()
+        metrics.set_gauge("llm_queue_depth", self._waiting)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        # Caller holds the lock; the heap entry is skipped when dispatch reaches it
+        waiter.cancelled = True
+        self._waiting -= 1
+        metrics.set_gauge("llm_queue_depth", self._waiting)
+
+    def _wake_in(self, wait: float) -> None:
+        due = self._clock() + wait
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(wait, self._on_timer)
+        self._timer.daemon = True
+        self._timer_due = due
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _record_wait(self, waiter: _Waiter) -> None:
+        metrics.observe(
+            "llm_queue_wait_ms",
+            (time.perf_counter() - waiter.enqueued_at) * 1000,
+            priority=waiter.priority.name.lower()
+        )
+
+# Create a singleton instance
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_queue=settings.LLM_SCHEDULER_MAX_QUEUE
+)
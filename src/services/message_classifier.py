@@ -1,91 +1,348 @@
-from typing import Dict, List, Tuple, Literal
-from transformers import pipeline
-import google.generativeai as genai
+from typing import Dict, List, Optional, Tuple, Literal, TypedDict
+import time
 from src.core.logging import get_logger
 from src.core.config import settings
+from src.core.circuit_breaker import llm_breaker
+from src.core.deadline import budget
+from src.core.cache import TTLCache, normalize_message
+from src.core.lazy import LazyService
+from src.core.metrics import metrics
 from src.core.constants import (
     CATEGORIES,
+    CATEGORY_CONFIDENCE_THRESHOLDS,
     CATEGORY_EXAMPLES,
+    CATEGORY_HYPOTHESIS_TEMPLATES,
     ERROR_MESSAGES
 )
+from src.services.nli import NLI_MODEL_NAME, category_scores, entailment_ids, hypothesis_pairs
+from src.services.rule_classifier import RuleClassifier
+from src.services.embedding_classifier import (
+    EmbeddingClassifier,
+    load_labelled_examples,
+    merge_examples
+)
+from src.services.onnx_classifier import OnnxNLIClassifier
+from src.services.intent_prompts import estimate_tokens
+from src.services.llm_providers import llm_provider
+from src.services.llm_routing import CLASSIFICATION_ROUTE, record_route_usage, route_for
+from src.services.llm_scheduler import Priority, llm_scheduler
 
 logger = get_logger(__name__)
 
+# Gemini answers a classification with just the category name
+_CLASSIFICATION_OUTPUT_TOKENS = 8
+
+class ClassificationResult(TypedDict):
+    category: str
+    confidence: float
+    tier: str  # Which stage decided: invalid, cache, rules, bart, bart_onnx, gemini, embedding or error
+
+class ClassificationCache(TTLCache):
+    """LRU/TTL cache of categories keyed on the normalized message text."""
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: Optional[float] = 3600, **kwargs):
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds, name="classification", **kwargs)
+    
+    def get(self, message: str, default: Optional[str] = None) -> Optional[str]:
+        return super().get(normalize_message(message), default)
+    
+    def set(self, message: str, category: str, ttl_seconds: Optional[float] = None) -> None:
+        super().set(normalize_message(message), category, ttl_seconds)
+    
+    def preload(self, examples: Dict[str, List[str]]) -> None:
+        """Seed the cache with labelled example messages; preloaded entries never expire."""
+        for category, messages in examples.items():
+            for message in messages:
+                super().set(normalize_message(message), category, ttl_seconds=0)
+        logger.info("Classification cache preloaded", entries=len(self))
+
+def record_classification(result: ClassificationResult, started_at: float) -> None:
+    """Count which tier decided a message and how long it took."""
+    metrics.increment("classifier_decisions_total", tier=result["tier"])
+    metrics.observe(
+        "classifier_latency_ms",
+        (time.perf_counter() - started_at) * 1000,
+        tier=result["tier"]
+    )
+
+def classify_fast(
+    message: str,
+    cache: Optional[ClassificationCache],
+    rules: Optional[RuleClassifier]
+) -> Optional[ClassificationResult]:
+    """Run the model-free tiers (input validation, cache, rules); None means a model is needed."""
+    if not message or not isinstance(message, str):
+        logger.error(ERROR_MESSAGES["INVALID_MESSAGE"])
+        return ClassificationResult(category="Others", confidence=0.0, tier="invalid")
+    
+    if cache is not None:
+        cached = cache.get(message)
+        if cached is not None:
+            return ClassificationResult(category=cached, confidence=1.0, tier="cache")
+    
+    if rules is not None:
+        matched = rules.classify(message)
+        if matched is not None:
+            category, confidence = matched
+            # Same bar as a cascade tier: weaker rule matches (keywords) are left to the model
+            margin = settings.CLASSIFIER_CASCADE_MARGINS.get("rules", settings.CLASSIFIER_CASCADE_MARGIN)
+            if confidence >= CATEGORY_CONFIDENCE_THRESHOLDS[category] + margin:
+                logger.info(f"Message classified as '{category}' by rules with confidence {confidence:.2f}")
+                return ClassificationResult(category=category, confidence=confidence, tier="rules")
+    
+    return None
+
 class MessageClassifier:
-    def __init__(self, classifier_type: Literal["bart", "gemini"] = "bart"):
+    def __init__(
+        self,
+        classifier_type: Literal["bart", "bart_onnx", "gemini", "embedding"] = "bart",
+        bart_mode: Literal["single_pass", "per_category"] = "single_pass",
+        cache: Optional[ClassificationCache] = None,
+        rules: Optional[RuleClassifier] = None,
+        cascade: Optional[List[str]] = None,
+        cascade_margins: Optional[Dict[str, float]] = None,
+        default_cascade_margin: float = 0.1
+    ):
         self.classifier_type = classifier_type
-        self.confidence_thresholds = {
-            "Recipe type": 0.7,
-            "Item Addition type": 0.7,
-            "Item Information type": 0.6,
-            "Update Cart type": 0.7,
-            "Others": 0.3
-        }
+        self.bart_mode = bart_mode
+        self.cache = cache
+        self.rules = rules
+        self.confidence_thresholds = dict(CATEGORY_CONFIDENCE_THRESHOLDS)
+        
+        # Ordered tiers, cheapest first; a tier only runs when the previous one was not confident enough
+        self.cascade = list(cascade) if cascade else None
+        self.cascade_margins = cascade_margins or {}
+        self.default_cascade_margin = default_cascade_margin
+        if self.cascade and "rules" in self.cascade and self.rules is None:
+            self.rules = RuleClassifier()
         
         try:
-            if classifier_type == "bart":
-                # Initialize the zero-shot classifier
-                self.classifier = pipeline(
-                    "zero-shot-classification",
-                    model="facebook/bart-large-mnli",
-                    device=-1  # CPU
-                )
-            else:  # gemini
-                if not settings.GEMINI_API_KEY:
-                    raise ValueError(ERROR_MESSAGES["API_KEY_MISSING"])
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
+            backends = [tier for tier in self.cascade if tier != "rules"] if self.cascade else [classifier_type]
+            for backend in backends:
+                self._init_backend(backend)
             
-            logger.info(f"Message classifier initialized successfully with {classifier_type}")
+            logger.info(
+                f"Message classifier initialized successfully with {' -> '.join(self.cascade or [classifier_type])}"
+            )
         except Exception as e:
             logger.error(f"Failed to initialize message classifier: {str(e)}")
             raise
     
+    def _init_backend(self, backend: str) -> None:
+        """Load the model behind a classifier type."""
+        if backend == "bart":
+            # Imported here so the application can start without loading torch
+            from transformers import pipeline
+            
+            # Initialize the zero-shot classifier
+            self.classifier = pipeline(
+                "zero-shot-classification",
+                model=NLI_MODEL_NAME,
+                device=-1  # CPU
+            )
+            self._entailment_id, self._contradiction_id = entailment_ids(
+                self.classifier.model.config.label2id
+            )
+        elif backend == "bart_onnx":
+            self.onnx_classifier = OnnxNLIClassifier(
+                settings.ONNX_MODEL_DIR,
+                intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                inter_op_threads=settings.ONNX_INTER_OP_THREADS
+            )
+        elif backend == "embedding":
+            extra_examples = None
+            if settings.CLASSIFIER_EXTRA_EXAMPLES_PATH:
+                extra_examples = load_labelled_examples(settings.CLASSIFIER_EXTRA_EXAMPLES_PATH)
+            self.embedding_classifier = EmbeddingClassifier(
+                model_name=settings.EMBEDDING_MODEL_NAME,
+                examples=merge_examples(CATEGORY_EXAMPLES, extra_examples),
+                temperature=settings.EMBEDDING_TEMPERATURE
+            )
+        elif backend == "gemini":
+            # The configured LLM provider (Gemini, or the stub when offline)
+            self.provider = llm_provider.get()
+        else:
+            raise ValueError(f"Unknown classifier type: {backend}")
+    
     def classify_message(self, message: str) -> str:
         """Classify a message into one of the predefined categories."""
-        if not message or not isinstance(message, str):
-            logger.error(ERROR_MESSAGES["INVALID_MESSAGE"])
-            return "Others"
+        return self.classify_with_details(message)["category"]
+    
+    def classify_with_details(self, message: str) -> ClassificationResult:
+        """Classify a message and report its confidence and the tier that decided it."""
+        started_at = time.perf_counter()
+        result = self._classify_fast(message)
+        if result is None:
+            result = self._classify_with_tiers([message])[0]
+        
+        self._record(result, started_at)
+        return result
+    
+    def classify_batch(self, messages: List[str]) -> List[str]:
+        """Classify several messages at once; BART scores them all in one padded forward pass."""
+        return [result["category"] for result in self.classify_batch_with_details(messages)]
+    
+    def classify_batch_with_details(self, messages: List[str]) -> List[ClassificationResult]:
+        """Batch variant of classify_with_details; only messages the fast tiers miss reach the model."""
+        started_at = time.perf_counter()
+        results = [self._classify_fast(message) for message in messages]
+        
+        pending = [index for index, result in enumerate(results) if result is None]
+        if pending:
+            model_results = self._classify_with_tiers([messages[index] for index in pending])
+            for index, result in zip(pending, model_results):
+                results[index] = result
+        
+        for result in results:
+            self._record(result, started_at)
+        return results
+    
+    def _classify_with_tiers(self, messages: List[str]) -> List[ClassificationResult]:
+        """Run messages through the model tiers, escalating those a tier is not confident about.
+        
+        Without a cascade the configured classifier is the only (and therefore last) tier.
+        The last tier's decision is always accepted, subject to the usual thresholds.
+        """
+        tiers = self.cascade or [self.classifier_type]
+        results: List[Optional[ClassificationResult]] = [None] * len(messages)
+        pending = list(range(len(messages)))
+        
+        for position, tier in enumerate(tiers):
+            if not pending:
+                break
+            is_last = position == len(tiers) - 1
             
-        try:
-            if self.classifier_type == "bart":
-                return self._classify_with_bart(message)
-            else:
-                return self._classify_with_gemini(message)
+            started_at = time.perf_counter()
+            try:
+                scores = self._tier_scores(tier, [messages[index] for index in pending])
+            except Exception as e:
+                logger.error(f"Error classifying message with {tier}: {str(e)}")
+                metrics.increment("classifier_tier_errors_total", tier=tier)
+                continue
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            metrics.increment("classifier_tier_runs_total", len(pending), tier=tier)
+            metrics.observe("classifier_tier_latency_ms", elapsed_ms / len(pending), tier=tier)
             
-        except Exception as e:
-            logger.error(f"Error classifying message: {str(e)}")
-            return "Others"
-    
-    def _classify_with_bart(self, message: str) -> str:
-        """Classify message using BART model."""
-        category_templates = {
-            "Recipe type": "This message is asking for cooking instructions or a recipe for {}",
-            "Item Addition type": "This message is requesting to add items to a shopping list, mentioning {}",
-            "Item Information type": "This message is asking for information about a product or item {}",
-            "Update Cart type": "This message is requesting to modify, remove, or delete items from a shopping list, mentioning {}",
-            "Others": "This is a general conversation message about {}"
-        }
+            escalated = []
+            for index, message_scores in zip(pending, scores):
+                if message_scores and (is_last or self._is_confident(tier, message_scores)):
+                    category, confidence = self._select_category(message_scores)
+                    results[index] = self._model_result(messages[index], category, confidence, tier)
+                else:
+                    escalated.append(index)
+            metrics.increment("classifier_tier_accepted_total", len(pending) - len(escalated), tier=tier)
+            pending = escalated
+        
+        for index in pending:
+            results[index] = ClassificationResult(category="Others", confidence=0.0, tier="error")
+        return results
+    
+    def _is_confident(self, tier: str, scores: Dict[str, float]) -> bool:
+        """A tier settles a message when its top score clears the category threshold plus the tier's margin."""
+        category, confidence = max(scores.items(), key=lambda x: x[1])
+        margin = self.cascade_margins.get(tier, self.default_cascade_margin)
+        return confidence >= self.confidence_thresholds[category] + margin
+    
+    def _tier_scores(self, tier: str, messages: List[str]) -> List[Dict[str, float]]:
+        """Category scores from one tier; an empty dict means the tier abstained."""
+        if tier == "rules":
+            scores = []
+            for message in messages:
+                matched = self.rules.classify(message)
+                scores.append(dict([matched]) if matched is not None else {})
+            return scores
+        if tier == "gemini":
+            return [dict([self._classify_with_gemini(message)]) for message in messages]
+        return self._score_messages(messages, tier)
+    
+    def cascade_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-tier runs, acceptances, hit rate and per-message latency percentiles."""
+        stats = {}
+        for tier in self.cascade or [self.classifier_type]:
+            runs = metrics.get_counter("classifier_tier_runs_total", tier=tier)
+            accepted = metrics.get_counter("classifier_tier_accepted_total", tier=tier)
+            stats[tier] = {
+                "runs": runs,
+                "accepted": accepted,
+                "hit_rate": accepted / runs if runs else 0.0,
+                "errors": metrics.get_counter("classifier_tier_errors_total", tier=tier),
+                "p50_latency_ms": metrics.percentile("classifier_tier_latency_ms", 50, tier=tier),
+                "p95_latency_ms": metrics.percentile("classifier_tier_latency_ms", 95, tier=tier)
+            }
+        return stats
+    
+    def _classify_fast(self, message: str) -> Optional[ClassificationResult]:
+        """Resolve a message without model inference when possible (invalid input, cache, rules)."""
+        # A cascade that lists "rules" runs them as its own tier
+        rules = None if self.cascade and "rules" in self.cascade else self.rules
+        return classify_fast(message, self.cache, rules)
+    
+    def _model_result(self, message: str, category: str, confidence: float, tier: str) -> ClassificationResult:
+        """Wrap a tier's decision and remember model decisions in the cache."""
+        if self.cache is not None and tier != "rules":
+            self.cache.set(message, category)
+        return ClassificationResult(category=category, confidence=confidence, tier=tier)
+    
+    def _record(self, result: ClassificationResult, started_at: float) -> None:
+        """Count which tier decided and how long it took."""
+        record_classification(result, started_at)
+    
+    def score_message(self, message: str) -> Dict[str, float]:
+        """Return the score of every category for a message (local model classifiers only)."""
+        return self._score_messages([message])[0]
+    
+    def _score_messages(self, messages: List[str], backend: Optional[str] = None) -> List[Dict[str, float]]:
+        """Score every category for a batch of messages with a local model (the configured one by default)."""
+        backend = backend or self.classifier_type
+        if backend == "embedding":
+            return self.embedding_classifier.score_batch(messages)
+        if backend == "bart_onnx":
+            return self.onnx_classifier.score_batch(messages)
+        if self.bart_mode == "per_category":
+            return [self._score_with_bart_per_category(message) for message in messages]
+        return self._score_with_bart(messages)
+    
+    def _score_with_bart(self, messages: List[str]) -> List[Dict[str, float]]:
+        """Score all category hypotheses for a batch of messages in one forward pass."""
+        import torch
         
-        results = []
-        for category, template in category_templates.items():
+        premises, hypotheses = hypothesis_pairs(messages)
+        inputs = self.classifier.tokenizer(
+            premises,
+            hypotheses,
+            padding=True,
+            truncation="only_first",
+            return_tensors="pt"
+        )
+        with torch.no_grad():
+            logits = self.classifier.model(**inputs).logits.cpu().numpy()
+        
+        return category_scores(logits, len(messages), self._entailment_id, self._contradiction_id)
+    
+    def _score_with_bart_per_category(self, message: str) -> Dict[str, float]:
+        """Score each category with its own pipeline call (one forward pass per category)."""
+        scores = {}
+        for category, template in CATEGORY_HYPOTHESIS_TEMPLATES.items():
             result = self.classifier(
                 message,
                 [category],
                 hypothesis_template=template
             )
-            results.append((category, result['scores'][0]))
-        
-        category, confidence = max(results, key=lambda x: x[1])
+            scores[category] = result['scores'][0]
+        return scores
+    
+    def _select_category(self, scores: Dict[str, float]) -> Tuple[str, float]:
+        """Pick the best-scoring category, falling back to Others below its threshold."""
+        category, confidence = max(scores.items(), key=lambda x: x[1])
         
         if confidence < self.confidence_thresholds[category]:
             logger.info(f"Confidence {confidence:.2f} below threshold for '{category}', defaulting to Others")
-            return "Others"
+            return "Others", confidence
         
         logger.info(f"Message classified as '{category}' with confidence {confidence:.2f}")
-        return category
+        return category, confidence
     
-    def _classify_with_gemini(self, message: str) -> str:
+    def _classify_with_gemini(self, message: str) -> Tuple[str, float]:
         """Classify message using Gemini model."""
         prompt = f"""
         You are an AI assistant that categorizes user messages into one of the following types:
@@ -102,24 +359,68 @@ class MessageClassifier:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            category = response.text.strip()
+            # An open breaker fails fast, so the message is reported as "Others" instead of queueing
+            llm_breaker.check()
+            route = route_for(CLASSIFICATION_ROUTE)
+            with llm_scheduler.slot(
+                Priority.CLASSIFICATION,
+                estimate_tokens(prompt) + _CLASSIFICATION_OUTPUT_TOKENS,
+                budget(settings.LLM_SCHEDULER_MAX_WAIT_SECONDS)
+            ):
+                with llm_breaker.guard():
+                    started_at = time.perf_counter()
+                    response = self.provider.generate(prompt, route=route)
+                    record_route_usage(route, prompt, response, (time.perf_counter() - started_at) * 1000)
+            category = response.strip()
             
             # Validate the category
             if category not in self.confidence_thresholds:
                 logger.warning(f"Invalid category returned by Gemini: {category}")
-                return "Others"
+                return "Others", 0.0
                 
             logger.info(f"Message classified as '{category}' using Gemini")
-            return category
+            return category, 1.0
             
         except Exception as e:
+            # Re-raise so the failure is reported as "Others" without being cached
             logger.error(f"Error in Gemini classification: {str(e)}")
-            return "Others"
+            raise
     
     def get_category_examples(self, category: str) -> List[str]:
         """Get example messages for a given category."""
         return CATEGORY_EXAMPLES.get(category, [])
 
-# Create a singleton instance with default classifier type
-message_classifier = MessageClassifier(settings.CLASSIFIER_TYPE if hasattr(settings, 'CLASSIFIER_TYPE') else "bart") 
\ No newline at end of file
+def build_classification_cache() -> Optional[ClassificationCache]:
+    """Create the shared classification cache from settings (disabled when size is 0)."""
+    if settings.CLASSIFIER_CACHE_SIZE <= 0:
+        return None
+    cache = ClassificationCache(
+        max_size=settings.CLASSIFIER_CACHE_SIZE,
+        ttl_seconds=settings.CLASSIFIER_CACHE_TTL_SECONDS
+    )
+    if settings.CLASSIFIER_CACHE_PRELOAD:
+        cache.preload(CATEGORY_EXAMPLES)
+    return cache
+
+def build_rule_classifier() -> Optional[RuleClassifier]:
+    """Create the rule fast path from settings, including any configured extra patterns."""
+    if not settings.CLASSIFIER_RULES_ENABLED:
+        return None
+    return RuleClassifier(extra_patterns=settings.CLASSIFIER_EXTRA_RULES)
+
+# Create a lazily initialized singleton instance with default classifier type
+# (not warmed up when classification runs in the inference pool's worker processes)
+message_classifier: LazyService[MessageClassifier] = LazyService(
+    "message_classifier",
+    lambda: MessageClassifier(
+        settings.CLASSIFIER_TYPE if hasattr(settings, 'CLASSIFIER_TYPE') else "bart",
+        bart_mode=settings.BART_CLASSIFICATION_MODE,
+        cache=build_classification_cache(),
+        rules=build_rule_classifier(),
+        cascade=settings.CLASSIFIER_CASCADE,
+        cascade_margins=settings.CLASSIFIER_CASCADE_MARGINS,
+        default_cascade_margin=settings.CLASSIFIER_CASCADE_MARGIN
+    ),
+    warm_up=not settings.INFERENCE_POOL_ENABLED
+)
+
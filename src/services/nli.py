@@ -0,0 +1,39 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.core.constants import CATEGORY_HYPOTHESIS_TEMPLATES
+
+NLI_MODEL_NAME = "facebook/bart-large-mnli"
+
+def hypothesis_pairs(messages: List[str]) -> Tuple[List[str], List[str]]:
+    """Build (premise, hypothesis) lists with one pair per message and category, message-major."""
+    premises = [message for message in messages for _ in CATEGORY_HYPOTHESIS_TEMPLATES]
+    hypotheses = [
+        template.format(category)
+        for _ in messages
+        for category, template in CATEGORY_HYPOTHESIS_TEMPLATES.items()
+    ]
+    return premises, hypotheses
+
+def entailment_ids(label2id: Dict[str, int]) -> Tuple[int, int]:
+    """Return the (entailment, contradiction) logit indices, mirroring the zero-shot pipeline."""
+    entailment_id = next(
+        (index for label, index in label2id.items() if label.lower().startswith("entail")),
+        -1
+    )
+    contradiction_id = -1 if entailment_id == 0 else 0
+    return entailment_id, contradiction_id
+
+def entailment_probabilities(logits: np.ndarray, entailment_id: int, contradiction_id: int) -> np.ndarray:
+    """Softmax over the contradiction/entailment logits, as the pipeline does for a single label."""
+    pair_logits = logits[..., [contradiction_id, entailment_id]]
+    pair_logits = pair_logits - pair_logits.max(axis=-1, keepdims=True)
+    exp_logits = np.exp(pair_logits)
+    return exp_logits[..., 1] / exp_logits.sum(axis=-1)
+
+def category_scores(logits: np.ndarray, num_messages: int, entailment_id: int, contradiction_id: int) -> List[Dict[str, float]]:
+    """Turn message-major pair logits into one ``category -> score`` dict per message."""
+    scores = entailment_probabilities(logits, entailment_id, contradiction_id)
+    scores = scores.reshape(num_messages, len(CATEGORY_HYPOTHESIS_TEMPLATES))
+    return [dict(zip(CATEGORY_HYPOTHESIS_TEMPLATES, row.tolist())) for row in scores]
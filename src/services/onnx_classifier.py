@@ -0,0 +1,171 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.core.constants import CATEGORY_EXAMPLES
+from src.core.logging import get_logger
+from src.services.nli import NLI_MODEL_NAME, category_scores, entailment_ids, hypothesis_pairs
+
+logger = get_logger(__name__)
+
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model.int8.onnx"
+LABELS_FILE = "labels.json"
+
+def export_quantized_model(
+    output_dir: str,
+    model_name: str = NLI_MODEL_NAME,
+    force: bool = False,
+    opset: int = 14
+) -> str:
+    """Export the NLI model to ONNX and quantize its weights to int8; returns the int8 model path.
+
+    Artifacts (fp32 and int8 graphs, tokenizer files, label mapping) are cached in
+    ``output_dir`` and reused unless ``force`` is set.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    int8_path = os.path.join(output_dir, INT8_MODEL_FILE)
+    if os.path.exists(int8_path) and not force:
+        logger.info("Quantized ONNX model already exported", path=int8_path)
+        return int8_path
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    premises, hypotheses = hypothesis_pairs(["How do I make pasta?"])
+    sample = tokenizer(premises, hypotheses, padding=True, return_tensors="pt")
+    fp32_path = os.path.join(output_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=opset
+        )
+    logger.info("Exported ONNX model", path=fp32_path)
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, LABELS_FILE), "w", encoding="utf-8") as f:
+        json.dump(model.config.label2id, f)
+
+    logger.info("Quantized ONNX model to int8", path=int8_path)
+    return int8_path
+
+class OnnxNLIClassifier:
+    """Zero-shot NLI scoring on an int8-quantized ONNX Runtime session."""
+
+    def __init__(
+        self,
+        model_dir: str,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0
+    ):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX classifier requires onnxruntime (pip install onnxruntime)"
+            ) from e
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(model_dir, INT8_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"No quantized model at {model_path}; run scripts/export_onnx_classifier.py first"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 lets ONNX Runtime pick based on the available cores
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        with open(os.path.join(model_dir, LABELS_FILE), encoding="utf-8") as f:
+            self._entailment_id, self._contradiction_id = entailment_ids(json.load(f))
+        logger.info(
+            "ONNX classifier initialized",
+            path=model_path,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads
+        )
+
+    def score_batch(self, messages: List[str]) -> List[Dict[str, float]]:
+        """Score all category hypotheses for a batch of messages in one session run."""
+        premises, hypotheses = hypothesis_pairs(messages)
+        inputs = self.tokenizer(
+            premises,
+            hypotheses,
+            padding=True,
+            truncation="only_first",
+            return_tensors="np"
+        )
+        logits = self.session.run(
+            ["logits"],
+            {
+                "input_ids": inputs["input_ids"].astype(np.int64),
+                "attention_mask": inputs["attention_mask"].astype(np.int64)
+            }
+        )[0]
+        return category_scores(logits, len(messages), self._entailment_id, self._contradiction_id)
+
+def verify_parity(
+    onnx_classifier: OnnxNLIClassifier,
+    thresholds: Dict[str, float],
+    examples: Optional[Dict[str, List[str]]] = None,
+    model_name: str = NLI_MODEL_NAME
+) -> Dict[str, float]:
+    """Compare ONNX scores and decisions with the PyTorch model over labelled examples."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    examples = CATEGORY_EXAMPLES if examples is None else examples
+    messages = [message for category_messages in examples.values() for message in category_messages]
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    entailment_id, contradiction_id = entailment_ids(model.config.label2id)
+
+    premises, hypotheses = hypothesis_pairs(messages)
+    inputs = tokenizer(premises, hypotheses, padding=True, truncation="only_first", return_tensors="pt")
+    with torch.no_grad():
+        logits = model(**inputs).logits.cpu().numpy()
+    reference = category_scores(logits, len(messages), entailment_id, contradiction_id)
+    quantized = onnx_classifier.score_batch(messages)
+
+    def decide(scores: Dict[str, float]) -> str:
+        category = max(scores, key=scores.get)
+        return category if scores[category] >= thresholds[category] else "Others"
+
+    agreements = sum(decide(a) == decide(b) for a, b in zip(reference, quantized))
+    max_difference = max(
+        abs(a[category] - b[category])
+        for a, b in zip(reference, quantized)
+        for category in a
+    )
+    return {
+        "messages": len(messages),
+        "decision_agreement": agreements / len(messages),
+        "max_score_difference": max_difference
+    }
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from src.core.cache import TTLCache, normalize_message
+from src.core.config import settings
+from src.core.constants import RESPONSE_CACHE_COLLECTION
+from src.core.database import db
+from src.core.logging import get_logger
+from src.core.metrics import metrics
+from src.core.prompt_safety import PromptSafety
+from src.services.llm_routing import route_for
+from src.services.semantic_cache import SemanticIndex, load_encoder
+
+logger = get_logger(__name__)
+
+# Words that usually point back at earlier turns ("how long do I bake it?"); such messages need the history
+_REFERS_BACK = re.compile(
+    r"\b(?:it|its|that|those|these|this|them|they|same|instead|also|again|else|another|previous|above)\b"
+)
+
+class ResponseCache:
+    """Opt-in cache of model responses for messages whose answer does not depend on the conversation.
+
+    Keys combine the model, intent, normalized message and the preferences that are
+    actually set. Entries live in an in-process LRU and, with ``shared`` enabled, in a
+    MongoDB collection whose TTL index lets every API process reuse them. Only intents
+    listed in RESPONSE_CACHE_TTL_SECONDS are cached; when the user has chat history the
+    cache is bypassed unless the intent is history-independent and the message does
+    not refer back to earlier turns.
+
+    With SEMANTIC_CACHE_ENABLED an exact miss falls through to a semantic tier: the
+    sanitized message is embedded locally and matched against recent cached messages
+    with the same intent and preferences, so paraphrases reuse an answer.
+    """
+
+    def __init__(self, max_size: int = 5000, shared: bool = False):
+        self.shared = shared
+        self._memory = TTLCache(max_size=max_size, name="response")
+        self._collection = None
+        self._collection_lock = threading.Lock()
+        self._encoder = None
+        self._semantic_index: Optional[SemanticIndex] = None
+        self._semantic_failed = False
+        self._semantic_lock = threading.Lock()
+        # Embeddings computed on a miss, reused when the fresh answer is stored
+        self._vectors = TTLCache(max_size=1024, ttl_seconds=300, name="semantic_vectors")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+
+    def key_for(
+        self,
+        message: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        message_type: str,
+        user_preferences: Optional[Dict[str, str]]
+    ) -> Optional[str]:
+        """Return the cache key for this request, or None when it must not be cached."""
+        if not settings.RESPONSE_CACHE_ENABLED or message_type not in settings.RESPONSE_CACHE_TTL_SECONDS:
+            return None
+        normalized = normalize_message(message)
+        if chat_history and (
+            message_type not in settings.RESPONSE_CACHE_HISTORY_INDEPENDENT or _REFERS_BACK.search(normalized)
+        ):
+            metrics.increment("response_cache_bypassed_total", intent=message_type)
+            return None
+
+        material = json.dumps([normalized, self._partition_material(message_type, user_preferences)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _partition_material(message_type: str, user_preferences: Optional[Dict[str, str]]) -> List[Any]:
+        """Everything besides the message that an answer depends on: route, intent and set preferences."""
+        preferences = sorted(
+            (pref, value) for pref, value in (user_preferences or {}).items() if value != "not_set"
+        )
+        route = route_for(message_type)
+        return [settings.LLM_PROVIDER, route.model, route.generation_config, message_type, preferences]
+
+    def get(
+        self,
+        key: str,
+        message_type: str,
+        message: Optional[str] = None,
+        user_preferences: Optional[Dict[str, str]] = None
+    ) -> Optional[str]:
+        """Return the cached response from memory, the shared tier, then the semantic tier, recording the saved upstream latency.
+        
+        The semantic tier is only consulted when ``message`` is given.
+        """
+        entry, tier = self._memory.get(key), "memory"
+        if entry is None and self.shared:
+            entry, tier = self._get_shared(key), "shared"
+        if entry is None and message is not None and settings.SEMANTIC_CACHE_ENABLED:
+            entry, tier = self._get_semantic(key, message, message_type, user_preferences), "semantic"
+        return self._record(entry, tier, message_type)
+
+    async def get_async(
+        self,
+        key: str,
+        message_type: str,
+        message: Optional[str] = None,
+        user_preferences: Optional[Dict[str, str]] = None
+    ) -> Optional[str]:
+        """Async variant of get; the shared tier and the embedding run in worker threads."""
+        entry, tier = self._memory.get(key), "memory"
+        if entry is None and self.shared:
+            entry, tier = await asyncio.to_thread(self._get_shared, key), "shared"
+        if entry is None and message is not None and settings.SEMANTIC_CACHE_ENABLED:
+            entry = await asyncio.to_thread(self._get_semantic, key, message, message_type, user_preferences)
+            tier = "semantic"
+        return self._record(entry, tier, message_type)
+
+    def set(
+        self,
+        key: str,
+        message_type: str,
+        response: str,
+        latency_ms: float,
+        message: Optional[str] = None,
+        user_preferences: Optional[Dict[str, str]] = None
+    ) -> None:
+        ttl = settings.RESPONSE_CACHE_TTL_SECONDS[message_type]
+        self._memory.set(key, (response, latency_ms), ttl_seconds=ttl)
+        if self.shared:
+            self._set_shared(key, message_type, response, latency_ms, ttl)
+        if message is not None and settings.SEMANTIC_CACHE_ENABLED:
+            self._set_semantic(key, message, message_type, user_preferences, (response, latency_ms), ttl)
+
+    async def set_async(
+        self,
+        key: str,
+        message_type: str,
+        response: str,
+        latency_ms: float,
+        message: Optional[str] = None,
+        user_preferences: Optional[Dict[str, str]] = None
+    ) -> None:
+        ttl = settings.RESPONSE_CACHE_TTL_SECONDS[message_type]
+        self._memory.set(key, (response, latency_ms), ttl_seconds=ttl)
+        if self.shared:
+            await asyncio.to_thread(self._set_shared, key, message_type, response, latency_ms, ttl)
+        if message is not None and settings.SEMANTIC_CACHE_ENABLED:
+            await asyncio.to_thread(
+                self._set_semantic, key, message, message_type, user_preferences, (response, latency_ms), ttl
+            )
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "lookups": self.lookups,
+                "hit_ratio": self.hits / self.lookups if self.lookups else 0.0,
+                "memory": self._memory.stats()
+            }
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._vectors.clear()
+        if self._semantic_index is not None:
+            self._semantic_index.clear()
+        with self._lock:
+            self.hits = self.lookups = 0
+
+    def _record(self, entry: Optional[Tuple[str, float]], tier: str, message_type: str) -> Optional[str]:
+        with self._lock:
+            self.lookups += 1
+            if entry is not None:
+                self.hits += 1
+            hit_ratio = self.hits / self.lookups
+        metrics.set_gauge("response_cache_hit_ratio", hit_ratio)
+        if entry is None:
+            metrics.increment("response_cache_lookups_total", intent=message_type, result="miss")
+            return None
+        response, latency_ms = entry
+        metrics.increment("response_cache_lookups_total", intent=message_type, result=f"{tier}_hit")
+        # What this request would have spent waiting on the model
+        metrics.increment("response_cache_saved_latency_ms_total", latency_ms, intent=message_type)
+        return response
+
+    def _semantic(self) -> Optional[SemanticIndex]:
+        """Load the encoder and allocate the index on first use; None if sentence-transformers is unavailable."""
+        if self._semantic_index is None and not self._semantic_failed:
+            with self._semantic_lock:
+                if self._semantic_index is None and not self._semantic_failed:
+                    try:
+                        self._encoder = load_encoder(settings.EMBEDDING_MODEL_NAME)
+                        dimensions = self._encoder(["warm up"]).shape[1]
+                        self._semantic_index = SemanticIndex(
+                            dimensions,
+                            settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                            settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_PARTITION
+                        )
+                        logger.info("Semantic response cache initialized", dimensions=dimensions)
+                    except Exception as e:
+                        self._semantic_failed = True
+                        logger.error("Semantic response cache disabled", error=str(e))
+        return self._semantic_index
+
+    def _embed(self, key: str, message: str):
+        vector = self._vectors.get(key)
+        if vector is None:
+            vector = self._encoder([PromptSafety.sanitize_prompt(message)])[0]
+            self._vectors.set(key, vector)
+        return vector
+
+    def _partition_id(self, message_type: str, user_preferences: Optional[Dict[str, str]]) -> int:
+        material = json.dumps(self._partition_material(message_type, user_preferences))
+        return int.from_bytes(hashlib.blake2b(material.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+    def _get_semantic(
+        self,
+        key: str,
+        message: str,
+        message_type: str,
+        user_preferences: Optional[Dict[str, str]]
+    ) -> Optional[Tuple[str, float]]:
+        index = self._semantic()
+        if index is None:
+            return None
+        vector = self._embed(key, message)
+        started_at = time.perf_counter()
+        match = index.search(vector, self._partition_id(message_type, user_preferences), settings.SEMANTIC_CACHE_THRESHOLD)
+        metrics.observe("semantic_cache_lookup_ms", (time.perf_counter() - started_at) * 1000)
+        if match is None:
+            return None
+        entry, similarity = match
+        metrics.observe("semantic_cache_similarity", similarity, intent=message_type)
+        return entry
+
+    def _set_semantic(
+        self,
+        key: str,
+        message: str,
+        message_type: str,
+        user_preferences: Optional[Dict[str, str]],
+        entry: Tuple[str, float],
+        ttl: float
+    ) -> None:
+        index = self._semantic()
+        if index is None:
+            return
+        index.add(self._embed(key, message), self._partition_id(message_type, user_preferences), entry, ttl)
+        self._vectors.delete(key)
+
+    def _shared_collection(self):
+        if self._collection is None:
+            with self._collection_lock:
+                if self._collection is None:
+                    collection = db.get_db()[RESPONSE_CACHE_COLLECTION]
+                    # MongoDB removes each document once its own expires_at has passed
+                    collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+                    self._collection = collection
+        return self._collection
+
+    def _get_shared(self, key: str) -> Optional[Tuple[str, float]]:
+        try:
+            # The TTL monitor runs about once a minute, so expiry is also checked here
+            document = self._shared_collection().find_one(
+                {'_id': key, 'expires_at': {'$gt': datetime.now(timezone.utc)}}
+            )
+        except Exception as e:
+            logger.warning("Error reading shared response cache", error=str(e))
+            return None
+        if document is None:
+            return None
+        entry = (document['response'], document.get('latency_ms', 0.0))
+        remaining = (document['expires_at'].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+        if remaining > 0:
+            self._memory.set(key, entry, ttl_seconds=remaining)
+        return entry
+
+    def _set_shared(self, key: str, message_type: str, response: str, latency_ms: float, ttl: float) -> None:
+        now = datetime.now(timezone.utc)
+        try:
+            self._shared_collection().replace_one(
+                {'_id': key},
+                {
+                    'message_type': message_type,
+                    'response': response,
+                    'latency_ms': latency_ms,
+                    'created_at': now,
+                    'expires_at': now + timedelta(seconds=ttl)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning("Error writing shared response cache", error=str(e))
+
+# Create a singleton instance
+response_cache = ResponseCache(max_size=settings.RESPONSE_CACHE_SIZE, shared=settings.RESPONSE_CACHE_SHARED)
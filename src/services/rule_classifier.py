@@ -0,0 +1,99 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from src.core.cache import normalize_message
+from src.core.constants import CATEGORY_EXAMPLES, CATEGORY_RULE_PATTERNS
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# A leading "add"/"remove" only points at the cart when the message also names the list or cart
+_LIST_CONTEXT = re.compile(
+    r"\b(?:to|on|in|into|onto|from|off|of) (?:my |the |our )?(?:shopping |grocery )?(?:list|cart|basket)\b"
+)
+
+class RuleClassifier:
+    """Compiled pattern/keyword pre-classifier that resolves unambiguous messages without a model."""
+
+    # Confidence reported for each kind of rule, strongest first. Keyword matches stay
+    # below the category threshold plus the cascade margin, so the model confirms them
+    EXACT_CONFIDENCE = 1.0
+    PATTERN_CONFIDENCE = 0.95
+    KEYWORD_CONFIDENCE = 0.75
+
+    def __init__(
+        self,
+        examples: Optional[Dict[str, List[str]]] = None,
+        patterns: Optional[Dict[str, List[str]]] = None,
+        extra_patterns: Optional[Dict[str, List[str]]] = None
+    ):
+        examples = CATEGORY_EXAMPLES if examples is None else examples
+        patterns = CATEGORY_RULE_PATTERNS if patterns is None else patterns
+
+        # Exact (normalized) labelled examples
+        self.exact_matches = {
+            normalize_message(message): category
+            for category, messages in examples.items()
+            for message in messages
+        }
+
+        # One alternation per category so each tier costs a single regex search
+        merged_patterns = defaultdict(list)
+        for source in (patterns, extra_patterns or {}):
+            for category, category_patterns in source.items():
+                merged_patterns[category].extend(category_patterns)
+        self.patterns = {
+            category: re.compile("|".join(f"(?:{pattern})" for pattern in category_patterns))
+            for category, category_patterns in merged_patterns.items()
+            if category_patterns
+        }
+
+        self.leading_keywords = self.derive_leading_keywords(examples)
+        logger.info(
+            "Rule classifier initialized",
+            exact_matches=len(self.exact_matches),
+            pattern_categories=len(self.patterns),
+            leading_keywords=len(self.leading_keywords)
+        )
+
+    @staticmethod
+    def derive_leading_keywords(examples: Dict[str, List[str]], min_count: int = 2) -> Dict[str, str]:
+        """Map first words that open several examples of exactly one category to that category."""
+        first_words = defaultdict(Counter)
+        for category, messages in examples.items():
+            for message in messages:
+                words = normalize_message(message).split()
+                if words:
+                    first_words[words[0]][category] += 1
+
+        return {
+            word: next(iter(counts))
+            for word, counts in first_words.items()
+            if len(counts) == 1 and sum(counts.values()) >= min_count
+        }
+
+    def classify(self, message: str) -> Optional[Tuple[str, float]]:
+        """Return ``(category, confidence)`` for an unambiguous message, or None to defer to the model."""
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+
+        category = self.exact_matches.get(normalized)
+        if category is not None:
+            return category, self.EXACT_CONFIDENCE
+
+        matches = [
+            category for category, pattern in self.patterns.items()
+            if pattern.search(normalized)
+        ]
+        if len(matches) == 1:
+            return matches[0], self.PATTERN_CONFIDENCE
+        if matches:
+            logger.debug("Ambiguous rule match", categories=matches)
+            return None
+
+        category = self.leading_keywords.get(normalized.split()[0])
+        if category is not None and _LIST_CONTEXT.search(normalized):
+            return category, self.KEYWORD_CONFIDENCE
+        return None
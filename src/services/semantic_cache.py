@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+def load_encoder(model_name: str) -> Encoder:
+    """Return a function embedding messages into L2-normalized float32 rows with a local sentence-transformers model."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError(
+            "The semantic cache requires sentence-transformers "
+            "(pip install sentence-transformers)"
+        ) from e
+
+    model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(messages: List[str]) -> np.ndarray:
+        return model.encode(
+            messages,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32)
+
+    return encode
+
+class _Partition:
+    """Ring buffer of embeddings; grows by doubling until it holds ``max_entries`` rows."""
+
+    def __init__(self, dimensions: int, max_entries: int):
+        self.max_entries = max_entries
+        capacity = min(64, max_entries)
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.values: List[Any] = [None] * capacity
+        self.next = 0
+        self.count = 0
+
+    def add(self, vector: np.ndarray, value: Any, expires_at: float) -> bool:
+        """Store a row, overwriting the oldest once full; return whether the row count grew."""
+        if self.count == len(self.vectors) < self.max_entries:
+            capacity = min(2 * len(self.vectors), self.max_entries)
+            vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+            vectors[:self.count] = self.vectors
+            expiries = np.zeros(capacity, dtype=np.float64)
+            expiries[:self.count] = self.expires_at
+            self.vectors, self.expires_at = vectors, expiries
+            self.values.extend([None] * (capacity - len(self.values)))
+        slot = self.next
+        self.vectors[slot] = vector
+        self.expires_at[slot] = expires_at
+        self.values[slot] = value
+        self.next = (slot + 1) % self.max_entries
+        grew = self.count < self.max_entries
+        self.count = min(self.count + 1, self.max_entries)
+        return grew
+
+class SemanticIndex:
+    """Bounded vector index of cached answers, searched by cosine similarity within a partition.
+
+    Each partition (e.g. intent and preference profile) keeps its embeddings in one
+    contiguous matrix, so a lookup is a single matrix-vector product over at most
+    ``max_entries_per_partition`` rows; a full partition overwrites its oldest entry.
+    Beyond ``max_entries`` in total, the least recently used partitions are dropped.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        max_entries: int = 50000,
+        max_entries_per_partition: int = 2000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.max_entries_per_partition = min(max_entries_per_partition, max_entries)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._partitions: "OrderedDict[Hashable, _Partition]" = OrderedDict()
+        self._count = 0
+
+    def add(self, vector: np.ndarray, partition: Hashable, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is None:
+                entries = self._partitions[partition] = _Partition(self.dimensions, self.max_entries_per_partition)
+            self._partitions.move_to_end(partition)
+            if entries.add(vector, value, self._clock() + ttl_seconds):
+                self._count += 1
+            while self._count > self.max_entries:
+                _, evicted = self._partitions.popitem(last=False)
+                self._count -= evicted.count
+
+    def search(self, vector: np.ndarray, partition: Hashable, threshold: float) -> Optional[Tuple[Any, float]]:
+        """Return the most similar live value in ``partition`` and its similarity, if it reaches ``threshold``."""
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is None:
+                return None
+            self._partitions.move_to_end(partition)
+            count = entries.count
+            similarities = entries.vectors[:count] @ vector
+            similarities[entries.expires_at[:count] <= self._clock()] = -1.0
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < threshold:
+                return None
+            return entries.values[best], similarity
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+            self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
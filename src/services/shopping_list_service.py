@@ -4,6 +4,7 @@ from pymongo.errors import PyMongoError
 from pydantic import BaseModel, Field
 
 from src.core.database import db
+from src.core.lazy import LazyService
 from src.core.logging import get_logger
 from src.core.constants import (
     SHOPPING_LIST_COLLECTION,
@@ -131,5 +132,8 @@ class ShoppingListService:
             logger.error(ERROR_MESSAGES["GENERAL_ERROR"], user_id=user_id, error=str(e))
             return []
 
-# Create a singleton instance
-shopping_list_service = ShoppingListService() 
\ No newline at end of file
+# Create a lazily initialized singleton instance
+shopping_list_service: LazyService[ShoppingListService] = LazyService(
+    "shopping_list_service",
+    ShoppingListService
+)
@@ -6,6 +6,7 @@ from src.core.logging import get_logger
 from src.core.config import settings
 from src.core.constants import USER_PREFERENCES_COLLECTION
 from src.core.database import db
+from src.core.lazy import LazyService
 
 logger = get_logger(__name__)
 
@@ -79,5 +80,5 @@ class UserPreferences:
             logger.error(f"Error clearing preferences for user {user_id}: {str(e)}")
             return False
 
-# Create a singleton instance
-user_preferences = UserPreferences() 
\ No newline at end of file
+# Create a lazily initialized singleton instance
+user_preferences: LazyService[UserPreferences] = LazyService("user_preferences", UserPreferences)
@@ -45,6 +45,14 @@ class TestHealthCheck:
         response = client.get("/health")
         assert response.status_code == 200
         assert response.json() == {"status": "healthy"}
+    
+    def test_readiness_reports_components(self):
+        """Test readiness endpoint lists the warm-up state of every component."""
+        response = client.get("/ready")
+        assert response.status_code in (200, 503)
+        data = response.json()
+        assert data["status"] in ("ready", "starting", "degraded")
+        assert {"database", "message_classifier", "chat_service"} <= set(data["components"])
 
 class TestChatAPI:
     def test_chat_success(self, test_chat_request, test_user_preferences):
@@ -84,6 +92,25 @@ class TestChatAPI:
         )
         assert response.status_code == 400
 
+    def test_chat_stream(self, test_chat_request, monkeypatch):
+        """Test streaming chat responses as server-sent events."""
+        async def mock_stream(*args, **kwargs):
+            yield {"event": "chunk", "data": {"text": "Here's "}}
+            yield {"event": "chunk", "data": {"text": "a recipe"}}
+            yield {"event": "done", "data": {"bot_response": "Here's a recipe", "shopping_list": [], "preferences": {}}}
+
+        monkeypatch.setattr("src.services.chat_service.chat_service.stream_message_async", mock_stream)
+
+        response = client.post(
+            f"{settings.API_V1_STR}/chat/stream",
+            json=test_chat_request
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+        assert [lines[0] for lines in events] == ["event: chunk", "event: chunk", "event: done"]
+        assert json.loads(events[-1][1][len("data: "):])["bot_response"] == "Here's a recipe"
+
 class TestUserPreferencesAPI:
     def test_get_preferences_success(self, test_user_preferences):
         """Test successful retrieval of user preferences."""
@@ -163,7 +190,7 @@ class TestErrorHandling:
         def mock_ai_error(*args, **kwargs):
             raise Exception("AI service error")
         
-        monkeypatch.setattr("src.services.chat_service.chat_service.process_message", mock_ai_error)
+        monkeypatch.setattr("src.services.chat_service.chat_service.process_message_async", mock_ai_error)
         
         response = client.post(
             f"{settings.API_V1_STR}/chat",
@@ -1,9 +1,20 @@
+import asyncio
+import time
 import pytest
+from concurrent.futures import Future
 from unittest.mock import Mock, patch
-from src.services.ai_service import AIService
+from src.core.circuit_breaker import CircuitOpenError, llm_breaker
+from src.core.config import settings
+from src.core.constants import DEGRADED_RESPONSES
+from src.core.deadline import DeadlineExceededError, deadline_after, deadline_scope
+from src.core.metrics import metrics
+from src.core.prompt_safety import PromptSafety
+from src.services.ai_service import AIService, IngredientExtractionError, UnsafeResponseError
+from src.services.llm_scheduler import Priority
 
 @pytest.fixture
 def ai_service():
+    llm_breaker.reset()
     return AIService()
 
 def test_categorize_message(ai_service):
@@ -21,8 +32,25 @@ def test_categorize_message(ai_service):
         mock_generate.return_value = "Invalid Category"
         assert ai_service.categorize_message("Some message") == "Others"
 
-def test_extract_ingredients(ai_service):
+def test_categorize_message_async_timeout_leaves_the_batch_alone(ai_service, monkeypatch):
+    """A caller timing out stops waiting without cancelling the future the batcher resolves."""
+    monkeypatch.setattr(settings, "CLASSIFIER_BATCHING_ENABLED", True)
+    future = Future()
+    
+    async def run():
+        with deadline_scope(deadline_after(0.05)):
+            with pytest.raises(asyncio.TimeoutError):
+                await ai_service.categorize_message_async("Something unusual")
+    
+    with patch("src.services.ai_service.classification_batcher") as batcher:
+        batcher.submit.return_value = future
+        asyncio.run(run())
+    assert not future.cancelled()
+    assert future.set_running_or_notify_cancel()
+
+def test_extract_ingredients(ai_service, monkeypatch):
     """Test ingredient extraction from chat history."""
+    monkeypatch.setattr(settings, "INGREDIENT_EXTRACTOR", "llm")
     chat_history = [
         {"role": "user", "message": "I want to make pasta with tomatoes"},
         {"role": "assistant", "message": "You'll need pasta, tomatoes, and garlic"}
@@ -38,14 +66,346 @@ def test_extract_ingredients(ai_service):
         ingredients = ai_service.extract_ingredients(chat_history)
         assert ingredients == []
 
+def test_extract_ingredients_locally(ai_service):
+    """Known ingredients are matched without a model call; only unknown items reach the fallback."""
+    chat_history = [
+        {"role": "user", "message": "Add two cans of chickpeas and some scallions to my list"},
+        {"role": "assistant", "message": "Added. You could also use 2 tbsp of tahini."}
+    ]
+    
+    with patch.object(ai_service, 'generate_response') as mock_generate:
+        mock_generate.return_value = "```json\n['Tahini']\n```"
+        ingredients = ai_service.extract_ingredients(chat_history)
+        assert ingredients == ["chickpeas", "scallions", "tahini"]
+        prompt = mock_generate.call_args[0][0]
+        assert prompt.endswith("tahini")
+        assert "chickpeas" not in prompt
+        
+        # A failing fallback keeps the locally matched ingredients
+        mock_generate.side_effect = Exception("API Error")
+        assert ai_service.extract_ingredients(chat_history) == ["chickpeas", "scallions"]
+        
+        mock_generate.reset_mock()
+        mock_generate.side_effect = None
+        assert ai_service.extract_ingredients([{"role": "user", "message": "Add milk and eggs"}]) == ["eggs", "milk"]
+        mock_generate.assert_not_called()
+        
+        # Counted money, people or time is not an unknown item worth a model call
+        budget_history = [{"role": "user", "message": "Pasta for 3 people with milk, I have 2 dollars"}]
+        assert ai_service.extract_ingredients(budget_history) == ["milk", "pasta"]
+        mock_generate.assert_not_called()
+        
+        # A strict extraction reports the failure, with the local matches
+        mock_generate.side_effect = CircuitOpenError("Circuit llm is open")
+        with pytest.raises(IngredientExtractionError) as error:
+            ai_service.extract_ingredients(chat_history, strict=True)
+        assert error.value.ingredients == ["chickpeas", "scallions"]
+
+def test_parse_ingredients_never_evaluates(ai_service):
+    """Malformed model output is rejected instead of being evaluated."""
+    assert ai_service._parse_ingredients("['Tomato', 'basil']") == ["basil", "tomatoes"]
+    assert ai_service._parse_ingredients("[__import__('os').getcwd()]") == []
+
 def test_generate_response(ai_service):
     """Test response generation."""
-    with patch.object(ai_service.model, 'generate_content') as mock_generate:
-        mock_generate.return_value = Mock(text="Test response")
+    with patch.object(ai_service.provider, 'generate') as mock_generate:
+        mock_generate.return_value = "Test response"
         response = ai_service.generate_response("Test prompt")
         assert response == "Test response"
         
         # Test error handling
         mock_generate.side_effect = Exception("API Error")
         with pytest.raises(Exception):
-            ai_service.generate_response("Test prompt") 
\ No newline at end of file
+            ai_service.generate_response("Test prompt") 
+
+
+def test_generate_response_async_retries_without_blocking(ai_service, monkeypatch):
+    """Async generation retries transient errors and shares prompt building with the sync path."""
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_WAIT_SECONDS", 0)
+    calls = []
+    
+    async def flaky(prompt, system_instruction=None, route=None):
+        calls.append(prompt)
+        if len(calls) == 1:
+            raise Exception("API Error")
+        return " Test response "
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=flaky):
+        response = asyncio.run(ai_service.generate_response_async("Test prompt", message_type="Recipe type"))
+    
+    assert response == "Test response"
+    assert len(calls) == 2
+    assert calls[0] == ai_service._build_prompt("Test prompt", None, "Recipe type", None)
+
+def test_generate_response_async_deadline(ai_service, monkeypatch):
+    """The overall deadline bounds the call even while an attempt is still pending."""
+    monkeypatch.setattr(settings, "LLM_DEADLINE_SECONDS", 0.05)
+    
+    async def slow(prompt, system_instruction=None, route=None):
+        await asyncio.sleep(1)
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=slow):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(ai_service.generate_response_async("Test prompt"))
+
+def test_generate_response_async_concurrency(ai_service):
+    """Many generations can be in flight on one event loop at once."""
+    in_flight = []
+    
+    async def generate(prompt, system_instruction=None, route=None):
+        in_flight.append(ai_service._in_flight)
+        await asyncio.sleep(0.05)
+        return "ok"
+    
+    async def run_all():
+        return await asyncio.gather(*[ai_service.generate_response_async(f"Prompt {i}") for i in range(200)])
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=generate):
+        responses = asyncio.run(run_all())
+    
+    assert responses == ["ok"] * 200
+    assert max(in_flight) == 200
+    assert ai_service._in_flight == 0
+
+class _Stream:
+    """Async-iterable stand-in for a streamed provider response."""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+    
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+async def _collect(stream):
+    return [text async for text in stream]
+
+def test_stream_response_async_holds_partial_words(ai_service):
+    """Chunks are released on word boundaries so the concatenation matches the model output."""
+    async def open_stream(prompt, system_instruction=None, route=None):
+        return _Stream(["You'll need pas", "ta, tomat", "oes and garlic."])
+    
+    with patch.object(ai_service.provider, 'stream_async', side_effect=open_stream):
+        chunks = asyncio.run(_collect(ai_service.stream_response_async("How do I make pasta?", message_type="Recipe type")))
+    
+    assert "".join(chunks) == "You'll need pasta, tomatoes and garlic."
+    assert chunks[0] == "You'll need "
+
+def test_stream_response_async_stops_on_unsafe_text(ai_service):
+    """A prohibited term split across chunks stops the stream before it is released."""
+    async def open_stream(prompt, system_instruction=None, route=None):
+        return _Stream(["Ask your doc", "tor about that ", "recipe."])
+    
+    released = []
+    
+    async def consume():
+        async for text in ai_service.stream_response_async("Is this recipe healthy?"):
+            released.append(text)
+    
+    with patch.object(ai_service.provider, 'stream_async', side_effect=open_stream):
+        with pytest.raises(UnsafeResponseError) as error:
+            asyncio.run(consume())
+    
+    assert "doctor" not in "".join(released)
+    assert error.value.safe_response == PromptSafety.get_safe_response('prohibited_content')
+
+def test_summarize_history(ai_service, monkeypatch):
+    """Test the summary is capped to its token budget and a refusal keeps the previous summary."""
+    monkeypatch.setattr(settings, "CHAT_SUMMARY_MAX_TOKENS", 10)
+    chat_history = [
+        {"role": "user", "message": "I want to make pasta"},
+        {"role": "assistant", "message": "Try a tomato sauce"}
+    ]
+    
+    with patch.object(ai_service, 'generate_response', return_value="word " * 50) as mock_generate:
+        summary = ai_service.summarize_history("Likes Italian food.", chat_history)
+        prompt = mock_generate.call_args[0][0]
+    assert "Likes Italian food." in prompt and "User: I want to make pasta" in prompt
+    assert len(summary) <= 40
+    
+    refusal = PromptSafety.get_safe_response('prohibited_content')
+    with patch.object(ai_service, 'generate_response', return_value=refusal):
+        assert ai_service.summarize_history("Likes Italian food.", chat_history) == "Likes Italian food."
+
+def test_identical_async_prompts_share_one_call(ai_service):
+    """Concurrent identical prompts are coalesced into one upstream call; different prompts are not."""
+    prompts = []
+    
+    async def generate(prompt, system_instruction=None, route=None):
+        prompts.append(prompt)
+        await asyncio.sleep(0.05)
+        return "ok"
+    
+    async def run_all():
+        return await asyncio.gather(
+            *[ai_service.generate_response_async("What's the price of tomatoes?", message_type="Item Information type") for _ in range(20)],
+            ai_service.generate_response_async("What's the price of onions?", message_type="Item Information type")
+        )
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=generate):
+        responses = asyncio.run(run_all())
+    
+    assert responses == ["ok"] * 21
+    assert len(prompts) == 2
+
+def test_single_flight_can_be_disabled(ai_service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_SINGLE_FLIGHT_ENABLED", False)
+    calls = []
+    
+    async def generate(prompt, system_instruction=None, route=None):
+        calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return "ok"
+    
+    async def run_all():
+        return await asyncio.gather(*[ai_service.generate_response_async("Same prompt") for _ in range(5)])
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=generate):
+        asyncio.run(run_all())
+    
+    assert len(calls) == 5
+
+def test_response_cache_skips_the_model(ai_service, monkeypatch):
+    """A cached history-independent answer is served without calling the model."""
+    from src.services.response_cache import response_cache
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_TTL_SECONDS", {"Item Information type": 60})
+    response_cache.clear()
+    calls = []
+    
+    async def generate(prompt, system_instruction=None, route=None):
+        calls.append(prompt)
+        return "About $2 per pound."
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=generate):
+        for _ in range(3):
+            response = asyncio.run(ai_service.generate_response_async(
+                "What's the price of tomatoes?",
+                message_type="Item Information type"
+            ))
+            assert response == "About $2 per pound."
+    
+    assert len(calls) == 1
+    response_cache.clear()
+
+def test_open_breaker_serves_degraded_responses(ai_service, monkeypatch):
+    """Failing calls open the breaker; interactive requests then get fast degraded answers without a model call."""
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_WAIT_SECONDS", 0)
+    monkeypatch.setattr(llm_breaker, "min_calls", 3)
+    calls = []
+    
+    async def failing(prompt, system_instruction=None, route=None):
+        calls.append(prompt)
+        raise Exception("API Error")
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=failing):
+        with pytest.raises(Exception, match="API Error"):
+            asyncio.run(ai_service.generate_response_async("Tell me a joke"))
+        assert len(calls) == 3
+        
+        response = asyncio.run(ai_service.generate_response_async("Tell me a joke"))
+        assert response == DEGRADED_RESPONSES["TRY_LATER"]
+        
+        response = asyncio.run(ai_service.generate_response_async(
+            "Add milk and eggs to my list",
+            message_type="Item Addition type"
+        ))
+        assert response == "I'll add eggs and milk to your shopping list."
+        chunks = asyncio.run(_collect(ai_service.stream_response_async("Remove the milk", message_type="Update Cart type")))
+        assert chunks == [DEGRADED_RESPONSES["UPDATE_CART"]]
+        # Background work is not answered with a placeholder
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(ai_service.generate_response_async("Summarize", priority=Priority.BACKGROUND))
+    
+    assert len(calls) == 3
+    llm_breaker.reset()
+
+def test_open_breaker_serves_cached_answers(ai_service, monkeypatch):
+    """While open, a cached answer is reused even when the user has chat history."""
+    from src.services.response_cache import response_cache
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_TTL_SECONDS", {"Recipe type": 60})
+    response_cache.clear()
+    
+    with patch.object(ai_service.provider, 'generate', return_value="Mix flour, milk and eggs."):
+        ai_service.generate_response("How do I make pancakes?", message_type="Recipe type")
+    
+    monkeypatch.setattr(llm_breaker, "check", Mock(side_effect=CircuitOpenError("Circuit llm is open")))
+    history = [{"role": "user", "message": "Hi"}, {"role": "assistant", "message": "Hello!"}]
+    with patch.object(ai_service.provider, 'generate') as mock_generate:
+        response = ai_service.generate_response("How do I make pancakes?", history, "Recipe type")
+        assert response == "Mix flour, milk and eggs."
+        mock_generate.assert_not_called()
+    response_cache.clear()
+
+def test_generation_respects_the_request_deadline(ai_service):
+    """A generation gets only what is left of the request's deadline, and none once it has passed."""
+    async def slow(prompt, system_instruction=None, route=None):
+        await asyncio.sleep(1)
+    
+    async def run():
+        with deadline_scope(deadline_after(0.05)):
+            started_at = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                await ai_service.generate_response_async("Test prompt")
+            assert time.perf_counter() - started_at < 0.5
+            with pytest.raises(DeadlineExceededError):
+                await ai_service.generate_response_async("Test prompt")
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=slow) as mock_generate:
+        asyncio.run(run())
+    assert mock_generate.call_count == 1
+
+def test_slow_generation_is_hedged(ai_service, monkeypatch):
+    """An attempt outstanding past the observed percentile is duplicated and the first answer wins."""
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(ai_service, "_hedge_delay", lambda message_type, priority: 0.02)
+    calls = []
+    
+    async def generate(prompt, system_instruction=None, route=None):
+        calls.append(prompt)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+            return "Slow answer"
+        return "Fast answer"
+    
+    with patch.object(ai_service.provider, 'generate_async', side_effect=generate):
+        started_at = time.perf_counter()
+        response = asyncio.run(ai_service.generate_response_async("Tell me a joke"))
+    
+    assert response == "Fast answer"
+    assert len(calls) == 2
+    assert time.perf_counter() - started_at < 0.5
+
+def test_hedge_delay_follows_observed_latency(ai_service, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SAMPLES", 10)
+    intent = "Hedge test type"
+    for latency_ms in range(100, 1100, 100):
+        assert ai_service._hedge_delay(intent, Priority.INTERACTIVE) is None
+        metrics.observe("llm_attempt_latency_ms", latency_ms, intent=intent)
+    
+    assert ai_service._hedge_delay(intent, Priority.INTERACTIVE) == pytest.approx(0.955)
+    assert ai_service._hedge_delay(intent, Priority.BACKGROUND) is None
+
+
+def test_calls_follow_their_route(ai_service, monkeypatch):
+    """Each intent and internal task is sent to its routed model, and usage is reported per route."""
+    monkeypatch.setattr(settings, "LLM_ROUTES", {
+        "Others": {"model": "flash-test", "max_output_tokens": 64},
+        "summarization": {"model": "summary-test", "temperature": 0.2}
+    })
+    with patch.object(ai_service.provider, 'generate', return_value="Sure thing.") as mock_generate:
+        ai_service.generate_response("Thanks!")
+        route = mock_generate.call_args[0][2]
+        assert (route.name, route.model, route.generation_config) == ("Others", "flash-test", {"max_output_tokens": 64})
+        
+        ai_service.summarize_history(None, [{"role": "user", "message": "I like pasta"}])
+        assert mock_generate.call_args[0][2].model == "summary-test"
+        
+        ai_service.generate_response("How do I make pancakes?", message_type="Recipe type")
+        assert mock_generate.call_args[0][2].model == settings.GEMINI_MODEL_NAME
+    
+    assert metrics.count("llm_route_latency_ms", route="Others", model="flash-test") >= 1
+    assert metrics.count("llm_route_latency_ms", route="summarization", model="summary-test") >= 1
+    assert ai_service._charge("x" * 400, route) == 100 + 64
@@ -0,0 +1,50 @@
+import importlib.util
+from pathlib import Path
+from src.core.constants import CATEGORIES, CATEGORY_EXAMPLES
+from src.core.cache import normalize_message
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "benchmark_classifiers.py"
+_spec = importlib.util.spec_from_file_location("benchmark_classifiers", _SCRIPT)
+benchmark = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(benchmark)
+
+def test_held_out_examples_are_not_used_to_build_tiers():
+    training, held_out = benchmark.split_examples(CATEGORY_EXAMPLES)
+    training_messages = {message for messages in training.values() for message in messages}
+    
+    assert held_out
+    assert not training_messages & {message for message, _ in held_out}
+    assert {category for _, category in held_out} == set(CATEGORIES)
+    assert all(training[category] for category in CATEGORIES)
+    
+    classifier = benchmark.build_classifier(
+        "cascade", ["rules", "gemini"], training, online=False, stub_latency_ms=0
+    )
+    assert not set(classifier.rules.exact_matches) & {normalize_message(message) for message, _ in held_out}
+
+def test_stub_decisions_are_not_scored():
+    training, held_out = benchmark.split_examples(CATEGORY_EXAMPLES)
+    report = benchmark.run_benchmark(
+        "gemini",
+        training_examples=training,
+        corpus=held_out,
+        batch_sizes=[4],
+        cascade=None,
+        online=False,
+        stub_latency_ms=0
+    )
+    
+    assert report["decided_by_tier"] == {"gemini": len(held_out)}
+    assert report["scored_messages"] == 0
+    assert report["accuracy"] is None
+
+def test_score_counts_only_scored_tiers():
+    outcomes = [
+        ("Recipe type", "Recipe type", "rules"),
+        ("Others", "Recipe type", "rules"),
+        ("Update Cart type", "Others", "gemini")
+    ]
+    report = benchmark.score(outcomes, ("gemini",))
+    assert report["scored_messages"] == 2
+    assert report["accuracy"] == 0.5
+    assert report["confusion_matrix"]["Others"]["Recipe type"] == 1
@@ -1,16 +1,37 @@
+import asyncio
+import time
 import pytest
-from datetime import datetime, timezone
-from unittest.mock import Mock, patch
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
+from src.core.config import settings
+from src.core.deadline import deadline_after, remaining
+import src.services.chat_service as chat_service_module
 from src.services.chat_service import ChatService
-from src.services.ai_service import AIService
+from src.services.ai_service import AIService, IngredientExtractionError
+from src.services.job_queue import job_queue
 from src.services.shopping_list_service import ShoppingListService
 
 @pytest.fixture
 def chat_service(test_db):
     service = ChatService()
     service.collection = test_db['chat_history']
+    service.watermarks = test_db['ingredient_watermarks']
+    service.summaries = test_db['chat_summaries']
     return service
 
+def _store_exchanges(chat_service, user_id, count, reply="Sure."):
+    """Insert ``count`` exchanges with increasing timestamps; message i is "Question i"."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    chat_service.collection.insert_many([
+        {
+            'user_id': user_id,
+            'user_message': f"Question {index}",
+            'bot_response': reply,
+            'timestamp': start + timedelta(minutes=index)
+        }
+        for index in range(count)
+    ])
+
 def test_store_message(chat_service, test_user_id):
     """Test storing chat messages."""
     user_message = "Hello"
@@ -100,4 +121,250 @@ def test_error_handling(chat_service, test_user_id):
         mock_categorize.side_effect = Exception("AI service error")
         response = chat_service.process_message(test_user_id, "Hello")
         assert "error" in response['bot_response'].lower()
-        assert response['shopping_list'] == [] 
\ No newline at end of file
+        assert response['shopping_list'] == [] 
+
+
+def test_process_message_async(chat_service, test_user_id):
+    """Test the async pipeline awaits the AI service and stores the exchange."""
+    async def generate(*args, **kwargs):
+        return "Here's a recipe..."
+    
+    async def extract(chat_history, strict=False):
+        return ["pasta"]
+    
+    with patch.object(AIService, 'generate_response_async', side_effect=generate) as mock_generate, \
+         patch.object(AIService, 'extract_ingredients_async', side_effect=extract), \
+         patch.object(ShoppingListService, 'add_items') as mock_add_items, \
+         patch.object(ShoppingListService, 'get_shopping_list') as mock_get_list:
+        mock_get_list.return_value = ["pasta"]
+        
+        response = asyncio.run(chat_service.process_message_async(
+            test_user_id,
+            "How do I make pasta?",
+            user_preferences={"vegetarian": "yes"},
+            message_type="Recipe type"
+        ))
+        
+        assert response['bot_response'] == "Here's a recipe..."
+        assert response['shopping_list'] == ["pasta"]
+        mock_add_items.assert_called_once_with(test_user_id, ["pasta"])
+        assert mock_generate.call_args[1]['user_preferences'] == {"vegetarian": "yes"}
+        assert len(chat_service.get_chat_history(test_user_id)) == 2
+
+def test_deadline_reaches_every_stage(chat_service, test_user_id):
+    """Stages see what is left of the request deadline; a spent deadline ends the turn with the error reply."""
+    seen = []
+    
+    async def generate(*args, **kwargs):
+        seen.append(remaining())
+        return "Here's a recipe..."
+    
+    with patch.object(AIService, 'generate_response_async', side_effect=generate), \
+         patch.object(AIService, 'extract_ingredients_async', return_value=[]), \
+         patch.object(ShoppingListService, 'get_shopping_list', return_value=[]):
+        response = asyncio.run(chat_service.process_message_async(
+            test_user_id,
+            "How do I make pasta?",
+            user_preferences={},
+            message_type="Recipe type",
+            deadline=deadline_after(10)
+        ))
+        assert response['bot_response'] == "Here's a recipe..."
+        assert 0 < seen[0] <= 10
+        
+        # Classification is refused before it starts
+        response = asyncio.run(chat_service.process_message_async(
+            test_user_id,
+            "How do I make pasta?",
+            user_preferences={},
+            deadline=time.monotonic() - 1
+        ))
+        assert response['bot_response'].startswith("I apologize")
+        assert len(seen) == 1
+
+def test_stream_message_async(chat_service, test_user_id):
+    """Test streamed chunks are followed by a done event carrying the shopping list."""
+    async def stream(*args, **kwargs):
+        for text in ["Here's ", "a recipe..."]:
+            yield text
+    
+    async def extract(chat_history, strict=False):
+        return []
+    
+    async def collect():
+        return [event async for event in chat_service.stream_message_async(
+            test_user_id,
+            "How do I make pasta?",
+            user_preferences={},
+            message_type="Recipe type"
+        )]
+    
+    with patch.object(AIService, 'stream_response_async', side_effect=stream), \
+         patch.object(AIService, 'extract_ingredients_async', side_effect=extract), \
+         patch.object(ShoppingListService, 'get_shopping_list') as mock_get_list:
+        mock_get_list.return_value = ["pasta"]
+        events = asyncio.run(collect())
+    
+    assert [event['event'] for event in events] == ['chunk', 'chunk', 'done']
+    assert events[-1]['data']['bot_response'] == "Here's a recipe..."
+    assert events[-1]['data']['shopping_list'] == ["pasta"]
+    assert chat_service.get_chat_history(test_user_id)[1]['message'] == "Here's a recipe..."
+
+def test_extract_new_ingredients_only_mines_new_turns(chat_service, test_user_id):
+    """Test extraction covers the newest exchange and skips turns behind the watermark."""
+    with patch.object(AIService, 'extract_ingredients') as mock_extract, \
+         patch.object(ShoppingListService, 'add_items') as mock_add_items:
+        mock_extract.return_value = ["pasta"]
+        
+        chat_service.store_message(test_user_id, "How do I make pasta?", "Boil the pasta.")
+        assert chat_service.extract_new_ingredients(test_user_id) == ["pasta"]
+        assert mock_extract.call_args[0][0] == [
+            {'role': 'user', 'message': "How do I make pasta?"},
+            {'role': 'assistant', 'message': "Boil the pasta."}
+        ]
+        mock_add_items.assert_called_once_with(test_user_id, ["pasta"])
+        
+        # Nothing new since the last extraction
+        mock_extract.reset_mock()
+        assert chat_service.extract_new_ingredients(test_user_id) == []
+        mock_extract.assert_not_called()
+        
+        chat_service.store_message(test_user_id, "And a sauce?", "Use tomatoes.")
+        chat_service.extract_new_ingredients(test_user_id)
+        assert [message['message'] for message in mock_extract.call_args[0][0]] == ["And a sauce?", "Use tomatoes."]
+
+def test_failed_extraction_keeps_turns_unextracted(chat_service, test_user_id, monkeypatch):
+    """Test a failed model extraction leaves the turns to be mined again and fails the background job."""
+    monkeypatch.setattr(settings, "INGREDIENT_EXTRACTOR", "llm")
+    monkeypatch.setattr(chat_service_module, "chat_service", Mock(get=Mock(return_value=chat_service)))
+    payload = {
+        'user_id': test_user_id,
+        'user_message': "Add milk to my list",
+        'bot_response': "Added.",
+        'message_id': f"{test_user_id}-1"
+    }
+    
+    with patch.object(AIService, 'generate_response_async', side_effect=TimeoutError()), \
+         patch.object(ShoppingListService, 'add_items') as mock_add_items:
+        # The job raises so the queue retries the turn
+        with pytest.raises(IngredientExtractionError):
+            asyncio.run(chat_service_module._complete_turn_job(payload))
+        mock_add_items.assert_not_called()
+    assert chat_service.watermarks.find_one({'user_id': test_user_id}) is None
+    assert len(chat_service.get_unextracted_turns(test_user_id)) == 1
+    
+    async def generate(*args, **kwargs):
+        return '["milk"]'
+    
+    with patch.object(AIService, 'generate_response_async', side_effect=generate), \
+         patch.object(ShoppingListService, 'add_items') as mock_add_items:
+        asyncio.run(chat_service_module._complete_turn_job(payload))
+        mock_add_items.assert_called_once_with(test_user_id, ["milk"])
+    assert chat_service.get_unextracted_turns(test_user_id) == []
+
+def test_background_turn_is_queued(chat_service, test_user_id, monkeypatch):
+    """Test storage and extraction are handed to the job queue when background jobs are enabled."""
+    monkeypatch.setattr(settings, "BACKGROUND_JOBS_ENABLED", True)
+    
+    async def generate(*args, **kwargs):
+        return "Here's a recipe..."
+    
+    with patch.object(AIService, 'generate_response_async', side_effect=generate), \
+         patch.object(job_queue, 'enqueue', new_callable=AsyncMock) as mock_enqueue, \
+         patch.object(ShoppingListService, 'get_shopping_list', return_value=[]):
+        mock_enqueue.return_value = "job-1"
+        response = asyncio.run(chat_service.process_message_async(
+            test_user_id,
+            "How do I make pasta?",
+            user_preferences={},
+            message_type="Recipe type"
+        ))
+    
+    assert response['job_id'] == "job-1"
+    job_type, payload = mock_enqueue.call_args[0]
+    assert job_type == 'complete_turn'
+    assert payload['bot_response'] == "Here's a recipe..."
+    # One user's turns are completed in order, stamped with the response time
+    assert mock_enqueue.call_args[1] == {'key': test_user_id}
+    assert isinstance(payload['timestamp'], datetime)
+    assert chat_service.get_chat_history(test_user_id) == []
+
+def test_queued_turn_keeps_its_response_time(chat_service, test_user_id):
+    """Test a turn stored by a late job keeps the time its response was produced."""
+    responded_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    message_id = f"{test_user_id}-response-time"
+    chat_service.store_message(test_user_id, "Hello", "Hi there!", message_id=message_id, timestamp=responded_at)
+    stored = chat_service.collection.find_one({'_id': message_id})
+    assert stored['timestamp'].replace(tzinfo=timezone.utc) == responded_at
+
+def test_store_message_is_idempotent(chat_service, test_user_id):
+    """Test a retried store with the same message id keeps a single exchange."""
+    message_id = f"{test_user_id}-idempotent"
+    assert chat_service.store_message(test_user_id, "Hello", "Hi there!", message_id=message_id)
+    assert chat_service.store_message(test_user_id, "Hello", "Hi there!", message_id=message_id)
+    assert len(chat_service.get_chat_history(test_user_id)) == 2
+
+def test_chat_history_keeps_latest_turns(chat_service, test_user_id, monkeypatch):
+    """Test the window is filled from the newest exchange back, not from the oldest."""
+    monkeypatch.setattr(settings, "CHAT_HISTORY_MAX_TURNS", 10)
+    _store_exchanges(chat_service, test_user_id, 12)
+    
+    history = chat_service.get_chat_history(test_user_id)
+    assert len(history) == 20
+    assert history[0]['message'] == "Question 2"
+    assert history[-2]['message'] == "Question 11"
+
+def test_chat_history_token_budget(chat_service, test_user_id, monkeypatch):
+    """Test long replies shrink the window so the history stays within the token budget."""
+    monkeypatch.setattr(settings, "CHAT_HISTORY_TOKEN_BUDGET", 1000)
+    monkeypatch.setattr(settings, "CHAT_SUMMARY_MAX_TOKENS", 200)
+    # About 260 tokens per exchange, so three fit into the 800 left after the summary reserve
+    _store_exchanges(chat_service, test_user_id, 8, reply="word " * 200)
+    
+    history = chat_service.get_chat_history(test_user_id)
+    assert [message['message'] for message in history[::2]] == ["Question 5", "Question 6", "Question 7"]
+
+def test_rolling_summary(chat_service, test_user_id, monkeypatch):
+    """Test exchanges leaving the window are folded into the summary incrementally and prepended to the history."""
+    monkeypatch.setattr(settings, "CHAT_HISTORY_MAX_TURNS", 3)
+    _store_exchanges(chat_service, test_user_id, 5)
+    
+    with patch.object(AIService, 'summarize_history', return_value="Asked questions 0 and 1.") as mock_summarize:
+        chat_service.update_summary(test_user_id)
+        summary, turns = mock_summarize.call_args[0]
+        assert summary is None
+        assert [message['message'] for message in turns[::2]] == ["Question 0", "Question 1"]
+        
+        history = chat_service.get_chat_history(test_user_id)
+        assert history[0] == {'role': 'summary', 'message': "Asked questions 0 and 1."}
+        assert history[1]['message'] == "Question 2"
+        
+        # Nothing new has left the window
+        chat_service.update_summary(test_user_id)
+        assert mock_summarize.call_count == 1
+    
+    chat_service.collection.insert_one({
+        'user_id': test_user_id,
+        'user_message': "Question 5",
+        'bot_response': "Sure.",
+        'timestamp': datetime(2024, 1, 1, 0, 5, tzinfo=timezone.utc)
+    })
+    with patch.object(AIService, 'summarize_history', return_value="Asked questions 0 to 2.") as mock_summarize:
+        chat_service.update_summary(test_user_id)
+        summary, turns = mock_summarize.call_args[0]
+        assert summary == "Asked questions 0 and 1."
+        assert [message['message'] for message in turns[::2]] == ["Question 2"]
+    
+    assert chat_service.get_chat_history(test_user_id)[0]['message'] == "Asked questions 0 to 2."
+
+def test_summary_failure_keeps_previous_summary(chat_service, test_user_id, monkeypatch):
+    """Test a failed summarization leaves the summary unchanged so the turns are folded later."""
+    monkeypatch.setattr(settings, "CHAT_HISTORY_MAX_TURNS", 3)
+    _store_exchanges(chat_service, test_user_id, 5)
+    
+    with patch.object(AIService, 'summarize_history', side_effect=Exception("API Error")):
+        chat_service.update_summary(test_user_id)
+    
+    assert chat_service.summaries.find_one({'user_id': test_user_id}) is None
+    _, turns = chat_service.get_unsummarized_turns(test_user_id)
+    assert len(turns) == 2
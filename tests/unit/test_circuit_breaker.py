@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from src.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from src.core.metrics import metrics
+
+def _fail(breaker):
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("API Error")
+
+def _succeed(breaker):
+    with breaker.guard():
+        pass
+
+def test_opens_on_error_rate():
+    breaker = CircuitBreaker("test_errors", window_size=10, min_calls=4, failure_rate=0.6)
+    _succeed(breaker)
+    _fail(breaker)
+    _fail(breaker)
+    assert breaker.state == CLOSED  # Too few calls to judge
+    _succeed(breaker)
+    assert breaker.state == CLOSED
+    _fail(breaker)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    with pytest.raises(CircuitOpenError):
+        _succeed(breaker)
+    assert metrics.snapshot()["gauges"]["circuit_breaker_state{breaker=test_errors}"] == 2
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker("test_slow", min_calls=2, slow_call_ms=0, slow_call_rate=1.0)
+    _succeed(breaker)
+    _succeed(breaker)
+    assert breaker.state == OPEN
+
+def test_half_open_probes_close_or_reopen():
+    now = [0.0]
+    breaker = CircuitBreaker("test_probes", min_calls=1, open_seconds=30, half_open_calls=2, clock=lambda: now[0])
+    _fail(breaker)
+    assert breaker.state == OPEN
+
+    now[0] = 30.0
+    assert breaker.state == HALF_OPEN
+    _fail(breaker)
+    assert breaker.state == OPEN
+
+    now[0] = 60.0
+    with breaker.guard():
+        with breaker.guard():
+            # Only two probes are admitted at a time
+            with pytest.raises(CircuitOpenError):
+                _succeed(breaker)
+    assert breaker.state == CLOSED
+    assert metrics.snapshot()["gauges"]["circuit_breaker_state{breaker=test_probes}"] == 0
+
+def test_cancelled_slow_call_counts_as_failure():
+    """A call cancelled by its deadline after running slowly counts against the dependency."""
+    breaker = CircuitBreaker("test_cancelled", min_calls=1, slow_call_ms=10)
+
+    async def call():
+        async with breaker.guard_async():
+            await asyncio.sleep(1)
+
+    async def run_all():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(call(), 0.05)
+
+    asyncio.run(run_all())
+    assert breaker.state == OPEN
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker("test_disabled", min_calls=1, enabled=False)
+    _fail(breaker)
+    assert breaker.state == CLOSED
+    breaker.check()
@@ -0,0 +1,81 @@
+import threading
+import pytest
+from unittest.mock import Mock
+from src.services.classification_batcher import ClassificationBatcher
+
+@pytest.fixture
+def classifier():
+    classifier = Mock()
+    classifier.classify_batch.side_effect = lambda messages: [f"category:{m}" for m in messages]
+    classifier.classify_message.side_effect = lambda message: f"inline:{message}"
+    return classifier
+
+@pytest.fixture
+def batcher(classifier):
+    batcher = ClassificationBatcher(classifier, max_batch_size=8, max_wait_ms=50)
+    yield batcher
+    batcher.stop()
+
+def test_concurrent_messages_share_a_batch(batcher, classifier):
+    """Test that messages arriving within the window are classified together."""
+    messages = [f"message {i}" for i in range(8)]
+    results = {}
+    
+    def classify(message):
+        results[message] = batcher.classify_message(message, timeout=5)
+    
+    threads = [threading.Thread(target=classify, args=(m,)) for m in messages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # Every caller receives its own result
+    assert results == {m: f"category:{m}" for m in messages}
+    # Fewer model calls than requests
+    assert classifier.classify_batch.call_count < len(messages)
+
+def test_batch_errors_propagate(batcher, classifier):
+    """Test that a failing batch raises in every caller."""
+    classifier.classify_batch.side_effect = RuntimeError("model failure")
+    with pytest.raises(RuntimeError):
+        batcher.classify_message("hello", timeout=5)
+
+def test_full_queue_classifies_inline(classifier):
+    """Test the inline fallback when the queue is full."""
+    batcher = ClassificationBatcher(classifier, max_queue_size=1)
+    batcher.start = Mock()  # keep the worker from draining the queue
+    batcher.submit("queued")
+    assert batcher.classify_message("overflow") == "inline:overflow"
+
+def test_cancelled_callers_do_not_stop_the_batcher(batcher, classifier):
+    """Test a caller that gave up is skipped and the rest of its batch still gets results."""
+    started = threading.Event()
+    release = threading.Event()
+    
+    def classify_batch(messages):
+        started.set()
+        release.wait(5)
+        return [f"category:{m}" for m in messages]
+    
+    classifier.classify_batch.side_effect = classify_batch
+    blocker = batcher.submit("first")
+    assert started.wait(5)
+    abandoned = batcher.submit("abandoned")
+    kept = batcher.submit("kept")
+    assert abandoned.cancel()
+    release.set()
+    
+    assert blocker.result(5) == "category:first"
+    assert kept.result(5) == "category:kept"
+    assert batcher.classify_message("later", timeout=5) == "category:later"
+    assert all("abandoned" not in call.args[0] for call in classifier.classify_batch.call_args_list)
+
+def test_failures_while_resolving_do_not_stop_the_batcher(batcher, classifier):
+    """Test an unexpected error in a batch fails its callers but not later ones."""
+    batcher._process = Mock(side_effect=RuntimeError("bookkeeping"))
+    with pytest.raises(RuntimeError):
+        batcher.classify_message("hello", timeout=5)
+    
+    del batcher._process
+    assert batcher.classify_message("later", timeout=5) == "category:later"
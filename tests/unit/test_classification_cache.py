@@ -0,0 +1,80 @@
+import threading
+import pytest
+from src.core.cache import TTLCache, normalize_message
+from src.core.constants import CATEGORY_EXAMPLES
+from src.services.message_classifier import ClassificationCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_normalize_message():
+    """Test that case, punctuation and whitespace are folded."""
+    assert normalize_message("  Add MILK to my list!! ") == "add milk to my list"
+    assert normalize_message("What's the price?") == normalize_message("what s   the PRICE")
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiry():
+    """Test that entries expire after their TTL."""
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("key", "value")
+    clock.now = 4
+    assert cache.get("key") == "value"
+    clock.now = 6
+    assert cache.get("key") is None
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_classification_cache_normalizes_keys():
+    """Test lookups of differently formatted messages."""
+    cache = ClassificationCache(max_size=10)
+    cache.set("Hello!", "Others")
+    assert cache.get("hello") == "Others"
+    assert cache.get("  HELLO ") == "Others"
+
+def test_preload_from_examples():
+    """Test that preloaded examples are served and do not expire."""
+    clock = FakeClock()
+    cache = ClassificationCache(max_size=100, ttl_seconds=1, clock=clock)
+    cache.preload(CATEGORY_EXAMPLES)
+    clock.now = 1000
+    for category, examples in CATEGORY_EXAMPLES.items():
+        for example in examples:
+            assert cache.get(example) == category
+
+def test_concurrent_access():
+    """Test that concurrent writers keep the cache within its bounds."""
+    cache = TTLCache(max_size=50)
+    
+    def worker(offset):
+        for i in range(500):
+            cache.set(offset + i, i)
+            cache.get(offset + i - 1)
+    
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(cache) == 50
+    assert cache.stats()["hits"] + cache.stats()["misses"] == 8 * 500
@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import Mock
+from src.services.message_classifier import MessageClassifier
+
+def scores_for(category, confidence):
+    scores = {
+        "Recipe type": 0.0,
+        "Item Addition type": 0.0,
+        "Item Information type": 0.0,
+        "Update Cart type": 0.0,
+        "Others": 0.0
+    }
+    scores[category] = confidence
+    return scores
+
+@pytest.fixture
+def classifier():
+    """Cascade of rules -> a local model -> Gemini, with the model tiers mocked."""
+    classifier = MessageClassifier("gemini", cascade=["rules", "gemini"], default_cascade_margin=0.1)
+    classifier.cascade = ["rules", "bart", "gemini"]
+    classifier._score_messages = Mock()
+    classifier.provider = Mock()
+    classifier.provider.generate.return_value = "Item Information type"
+    return classifier
+
+def test_rules_settle_obvious_messages(classifier):
+    """Test that rule matches never reach the model tiers."""
+    result = classifier.classify_with_details("Add bread to my shopping list")
+    assert result["tier"] == "rules"
+    classifier._score_messages.assert_not_called()
+    classifier.provider.generate.assert_not_called()
+
+def test_confident_model_tier_stops_cascade(classifier):
+    """Test that a tier clearing threshold plus margin decides."""
+    # Recipe threshold is 0.7, so 0.85 clears the 0.1 margin
+    classifier._score_messages.return_value = [scores_for("Recipe type", 0.85)]
+    result = classifier.classify_with_details("Something warming for a cold night")
+    assert result == {"category": "Recipe type", "confidence": 0.85, "tier": "bart"}
+    classifier.provider.generate.assert_not_called()
+
+def test_doubtful_model_tier_escalates(classifier):
+    """Test that scores within the margin are escalated to the next tier."""
+    classifier._score_messages.return_value = [scores_for("Recipe type", 0.75)]
+    result = classifier.classify_with_details("Something warming for a cold night")
+    assert result["tier"] == "gemini"
+    assert result["category"] == "Item Information type"
+
+def test_last_tier_applies_thresholds(classifier):
+    """Test that the final tier is accepted but still subject to category thresholds."""
+    classifier.cascade = ["rules", "bart"]
+    classifier._score_messages.return_value = [scores_for("Recipe type", 0.5)]
+    result = classifier.classify_with_details("Something warming for a cold night")
+    assert result["category"] == "Others"
+    assert result["tier"] == "bart"
+
+def test_failing_tier_is_skipped(classifier):
+    """Test that an erroring tier escalates instead of failing the request."""
+    classifier._score_messages.side_effect = RuntimeError("model unavailable")
+    result = classifier.classify_with_details("Something warming for a cold night")
+    assert result["tier"] == "gemini"
+    assert classifier.cascade_stats()["bart"]["errors"] >= 1
+
+def test_batch_escalates_only_unsure_messages(classifier):
+    """Test that a batch only sends doubtful messages to the next tier."""
+    classifier._score_messages.return_value = [
+        scores_for("Recipe type", 0.9),
+        scores_for("Update Cart type", 0.72)
+    ]
+    results = classifier.classify_batch_with_details([
+        "Something warming for a cold night",
+        "Swap the oat milk for almond",
+        "Remove eggs from my list"
+    ])
+    assert [result["tier"] for result in results] == ["bart", "gemini", "rules"]
+    assert classifier.provider.generate.call_count == 1
@@ -0,0 +1,49 @@
+import asyncio
+import time
+import pytest
+from src.core.deadline import (
+    DeadlineExceededError,
+    budget,
+    deadline_after,
+    deadline_scope,
+    expired,
+    remaining
+)
+
+def test_budget_is_capped_by_the_time_left():
+    assert remaining() is None
+    assert budget(30) == 30
+    assert deadline_after(0) is None
+
+    with deadline_scope(deadline_after(5)):
+        assert budget(30) == pytest.approx(5, abs=0.1)
+        assert budget(1) == 1
+        assert budget(None) == pytest.approx(5, abs=0.1)
+        # An inner scope cannot extend the enclosing deadline
+        with deadline_scope(deadline_after(60)):
+            assert remaining() == pytest.approx(5, abs=0.1)
+        with deadline_scope(deadline_after(2)):
+            assert remaining() == pytest.approx(2, abs=0.1)
+    assert remaining() is None
+
+def test_passed_deadline_stops_new_stages():
+    with deadline_scope(time.monotonic() - 1):
+        assert expired()
+        with pytest.raises(asyncio.TimeoutError):
+            budget(30)
+        with pytest.raises(DeadlineExceededError):
+            budget(None)
+
+def test_deadline_reaches_worker_threads_and_tasks():
+    async def left():
+        return remaining()
+
+    async def run():
+        with deadline_scope(deadline_after(5)):
+            in_thread = await asyncio.to_thread(remaining)
+            in_task = await asyncio.create_task(left())
+        return in_thread, in_task
+
+    in_thread, in_task = asyncio.run(run())
+    assert in_thread == pytest.approx(5, abs=0.5)
+    assert in_task == pytest.approx(5, abs=0.5)
@@ -0,0 +1,48 @@
+import json
+import pytest
+from src.core.constants import CATEGORIES, CATEGORY_EXAMPLES
+from src.services.embedding_classifier import (
+    EmbeddingClassifier,
+    load_labelled_examples,
+    merge_examples
+)
+
+def test_load_labelled_examples(tmp_path):
+    """Test loading extra labelled examples from JSONL."""
+    path = tmp_path / "examples.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"message": "Bake me some cookies", "category": "Recipe type"}),
+        json.dumps({"message": "Unknown label", "category": "Nope"}),
+        "",
+        json.dumps({"message": "Drop the cheese", "category": "Update Cart type"})
+    ]))
+    
+    examples = load_labelled_examples(str(path))
+    assert examples == {
+        "Recipe type": ["Bake me some cookies"],
+        "Update Cart type": ["Drop the cheese"]
+    }
+    
+    merged = merge_examples(CATEGORY_EXAMPLES, examples)
+    assert merged["Recipe type"][-1] == "Bake me some cookies"
+    assert len(merged["Others"]) == len(CATEGORY_EXAMPLES["Others"])
+
+@pytest.fixture(scope="module")
+def embedding_classifier():
+    pytest.importorskip("sentence_transformers")
+    return EmbeddingClassifier()
+
+def test_centroid_matrix(embedding_classifier):
+    """Test that one unit-length centroid is kept per category."""
+    centroids = embedding_classifier.centroids
+    assert centroids.shape[0] == len(CATEGORIES)
+    assert centroids == pytest.approx(centroids / (centroids ** 2).sum(axis=1, keepdims=True) ** 0.5)
+
+def test_score_batch(embedding_classifier):
+    """Test that scores form a distribution that ranks the examples' own category first."""
+    messages = [examples[0] for examples in CATEGORY_EXAMPLES.values()]
+    scores = embedding_classifier.score_batch(messages)
+    
+    for category, message_scores in zip(CATEGORY_EXAMPLES, scores):
+        assert sum(message_scores.values()) == pytest.approx(1.0)
+        assert max(message_scores, key=message_scores.get) == category
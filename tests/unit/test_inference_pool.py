@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+from src.core.deadline import deadline_after, deadline_scope
+from src.services import inference_pool as inference_pool_module
+from src.services.inference_pool import InferencePool, InferencePoolFull
+
+@pytest.fixture
+def worker_classifier(monkeypatch):
+    classifier = Mock()
+    classifier.classify_with_details.return_value = {
+        "category": "Recipe type",
+        "confidence": 0.9,
+        "tier": "bart"
+    }
+    monkeypatch.setattr(inference_pool_module, "_worker_classifier", classifier)
+    return classifier
+
+@pytest.fixture
+def pool(worker_classifier):
+    # Threads stand in for worker processes so the test needs no model
+    pool = InferencePool(workers=2, max_pending=2, timeout_seconds=1)
+    pool._executor = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+def test_model_tiers_run_in_workers(pool, worker_classifier):
+    """Test that messages missed by cache and rules are classified by a worker."""
+    result = asyncio.run(pool.classify_with_details("Something for a rainy evening?"))
+    assert result["category"] == "Recipe type"
+    worker_classifier.classify_with_details.assert_called_once()
+    
+    # The parent caches worker results
+    assert asyncio.run(pool.classify_with_details("something for a rainy evening"))["tier"] == "cache"
+
+def test_fast_tiers_stay_in_process(pool, worker_classifier):
+    """Test that rule matches never reach a worker."""
+    assert asyncio.run(pool.classify("Remove eggs from my list")) == "Update Cart type"
+    worker_classifier.classify_with_details.assert_not_called()
+
+def test_timeout_falls_back_to_others(pool, worker_classifier):
+    """Test that slow workers do not hold the request."""
+    release = threading.Event()
+    worker_classifier.classify_with_details.side_effect = lambda message: release.wait(5)
+    pool.timeout_seconds = 0.05
+    
+    result = asyncio.run(pool.classify_with_details("Something unusual"))
+    release.set()
+    assert result == {"category": "Others", "confidence": 0.0, "tier": "error"}
+
+def test_wait_is_bounded_by_the_request_deadline(pool, worker_classifier):
+    """The pool waits no longer than the request has left, and sends nothing once it has passed."""
+    release = threading.Event()
+    worker_classifier.classify_with_details.side_effect = lambda message: release.wait(5)
+    
+    async def run():
+        with deadline_scope(deadline_after(0.05)):
+            started_at = time.perf_counter()
+            first = await pool.classify_with_details("Something unusual")
+            elapsed = time.perf_counter() - started_at
+            await asyncio.sleep(0.05)
+            second = await pool.classify_with_details("Something else unusual")
+        return first, elapsed, second
+    
+    first, elapsed, second = asyncio.run(run())
+    release.set()
+    assert elapsed < pool.timeout_seconds / 2
+    assert first["tier"] == second["tier"] == "error"
+    worker_classifier.classify_with_details.assert_called_once()
+
+def test_pending_limit(pool, worker_classifier):
+    """Test that requests beyond the pending limit are rejected."""
+    release = threading.Event()
+    worker_classifier.classify_with_details.side_effect = lambda message: release.wait(5) and {
+        "category": "Others", "confidence": 0.5, "tier": "bart"
+    }
+    
+    async def run():
+        first = asyncio.create_task(pool.classify("unusual one"))
+        second = asyncio.create_task(pool.classify("unusual two"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferencePoolFull):
+            await pool.classify("unusual three")
+        release.set()
+        return await asyncio.gather(first, second)
+    
+    assert asyncio.run(run()) == ["Others", "Others"]
+
+def test_timed_out_work_stays_pending(pool, worker_classifier):
+    """A timed-out classification still occupies the pool until its worker finishes."""
+    release = threading.Event()
+    worker_classifier.classify_with_details.side_effect = lambda message: release.wait(5) and {
+        "category": "Others", "confidence": 0.5, "tier": "bart"
+    }
+    pool.timeout_seconds = 0.05
+    
+    asyncio.run(pool.classify("unusual one"))
+    asyncio.run(pool.classify("unusual two"))
+    assert pool._pending == 2
+    with pytest.raises(InferencePoolFull):
+        asyncio.run(pool.classify("unusual three"))
+    
+    release.set()
+    pool._executor.shutdown(wait=True)
+    assert pool._pending == 0
@@ -0,0 +1,59 @@
+import pytest
+
+from src.services.ingredient_extractor import IngredientExtractor, singularize
+
+@pytest.fixture(scope="module")
+def extractor():
+    return IngredientExtractor(extra_synonyms={"tahini": ["sesame paste"]})
+
+def test_singularize():
+    """Plural and singular forms reduce to the same stem."""
+    for plural, singular in [
+        ("tomatoes", "tomato"),
+        ("berries", "berry"),
+        ("leaves", "leaf"),
+        ("peaches", "peach"),
+        ("eggs", "egg"),
+        ("cheeses", "cheese")
+    ]:
+        assert singularize(plural) == singularize(singular)
+    assert singularize("asparagus") == "asparagus"
+    assert singularize("couscous") == "couscous"
+
+def test_extract_plurals_and_synonyms(extractor):
+    """Plurals, synonyms and punctuation map to canonical names."""
+    assert extractor.extract("I bought a tomato, two Eggs and some courgettes!") == ["eggs", "tomatoes", "zucchini"]
+    assert extractor.extract("Use icing-sugar and spring onions") == ["powdered sugar", "scallions"]
+    assert extractor.extract("A jar of sesame paste") == ["tahini"]
+
+def test_extract_prefers_longest_match(extractor):
+    """Multi-word terms win over the single words they contain."""
+    assert extractor.extract("olive oil, peanut butter and red pepper flakes") == [
+        "chili flakes",
+        "olive oil",
+        "peanut butter"
+    ]
+    assert extractor.extract("Season with pepper") == ["black pepper"]
+
+def test_unknown_terms(extractor):
+    """Item-like phrases outside the lexicon are reported for the fallback."""
+    text = "Add 2 cups of flour, a pinch of saffron and 3 kohlrabi to my list. Bake for 20 minutes."
+    assert extractor.unknown_terms(text) == ["saffron", "kohlrabi"]
+    assert extractor.unknown_terms("Add milk and eggs to my shopping list") == []
+    assert extractor.unknown_terms("How do I make pasta?") == []
+
+def test_unknown_terms_skip_counted_non_items(extractor):
+    """Numbers of money, people, time or servings are not taken for unknown items."""
+    for text in [
+        "I only have 2 dollars left",
+        "Dinner for 3 people, maybe 2 adults and 4 kids",
+        "Bake for 20 mins, then rest it 2 days",
+        "It should make 6 portions"
+    ]:
+        assert extractor.unknown_terms(text) == []
+
+def test_canonicalize(extractor):
+    """Whole names are canonicalized; unknown names are only normalized."""
+    assert extractor.canonicalize("Cherry Tomatoes") == "tomatoes"
+    assert extractor.canonicalize(" Saffron ") == "saffron"
+    assert extractor.canonicalize("tomato soup") == "tomato soup"
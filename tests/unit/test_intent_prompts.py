@@ -0,0 +1,44 @@
+from src.core.message_contexts import MESSAGE_CONTEXTS
+from src.services.intent_prompts import IntentPrompts, render_dynamic_prompt, render_static_prompt
+
+def test_static_prompt_holds_intent_context_and_safety():
+    """The static prompt carries everything that does not change between requests."""
+    context = MESSAGE_CONTEXTS["Recipe type"]
+    static_prompt = render_static_prompt("Recipe type")
+
+    assert context['persona'] in static_prompt
+    assert context['task'] in static_prompt
+    assert all(ref in static_prompt for ref in context['references'])
+    assert "Safety Guidelines:" in static_prompt
+    assert render_static_prompt("Unknown type") == render_static_prompt("Others")
+
+def test_dynamic_prompt_holds_only_request_data():
+    dynamic_prompt = render_dynamic_prompt(
+        "How do I make pasta?",
+        "User: Hi\nAssistant: Hello",
+        {"dietary_restrictions": "vegetarian", "budget": "not_set"}
+    )
+
+    assert "- dietary_restrictions: vegetarian" in dynamic_prompt
+    assert "budget" not in dynamic_prompt
+    assert "User: Hi" in dynamic_prompt
+    assert dynamic_prompt.endswith("User Message: How do I make pasta?")
+    assert "Safety Guidelines:" not in dynamic_prompt
+    assert "No previous conversation." in render_dynamic_prompt("Hi", None, None)
+
+def test_dynamic_contents_with_system_instruction():
+    """When the provider takes system instructions only the dynamic part is sent as contents."""
+    prompts = IntentPrompts(system_instruction_supported=True)
+
+    assert prompts.system_instruction_for("Recipe type") == render_static_prompt("Recipe type")
+    assert prompts.system_instruction_for("Unknown type") == render_static_prompt("Others")
+    assert prompts.contents_for("Recipe type", "User Message: hi") == "User Message: hi"
+
+def test_static_prefix_without_system_instruction():
+    """Otherwise the precompiled static prompt is sent as a prefix."""
+    prompts = IntentPrompts(system_instruction_supported=False)
+
+    assert prompts.system_instruction_for("Recipe type") is None
+    contents = prompts.contents_for("Recipe type", "User Message: hi")
+    assert contents == render_static_prompt("Recipe type") + "\n\nUser Message: hi"
+    assert prompts.contents_for("Unknown type", "x").startswith(render_static_prompt("Others"))
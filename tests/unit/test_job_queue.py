@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+
+from src.core.metrics import metrics
+from src.services.job_queue import JobQueue
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_jobs_run_in_background():
+    """Enqueue returns immediately and the job runs on a worker."""
+    seen = []
+    
+    async def handler(payload):
+        await asyncio.sleep(0.01)
+        seen.append(payload['value'])
+    
+    async def scenario():
+        queue = JobQueue(workers=2)
+        queue.register('record', handler)
+        job_ids = [await queue.enqueue('record', {'value': i}) for i in range(5)]
+        assert seen == []
+        results = [await queue.wait(job_id, timeout=1) for job_id in job_ids]
+        await queue.stop()
+        return results
+    
+    assert asyncio.run(scenario()) == [True] * 5
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+    assert metrics.get_counter("jobs_processed_total", type="record") == 5
+
+def test_failed_jobs_are_retried():
+    """A failing job is retried with backoff until it succeeds."""
+    attempts = []
+    
+    async def flaky(payload):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("transient")
+    
+    async def scenario():
+        queue = JobQueue(workers=1, retry_base_seconds=0.01)
+        queue.register('flaky', flaky)
+        job_id = await queue.enqueue('flaky', {})
+        result = await queue.wait(job_id, timeout=1)
+        await queue.stop()
+        return result
+    
+    assert asyncio.run(scenario()) is True
+    assert len(attempts) == 3
+    assert metrics.get_counter("jobs_retried_total", type="flaky") == 2
+
+def test_jobs_give_up_after_max_attempts():
+    async def broken(payload):
+        raise RuntimeError("permanent")
+    
+    async def scenario():
+        queue = JobQueue(workers=1, max_attempts=2, retry_base_seconds=0.01)
+        queue.register('broken', broken)
+        job_id = await queue.enqueue('broken', {})
+        result = await queue.wait(job_id, timeout=1)
+        await queue.stop()
+        return result
+    
+    assert asyncio.run(scenario()) is False
+    assert metrics.get_counter("jobs_failed_total", type="broken") == 1
+
+def test_unknown_job_type():
+    queue = JobQueue()
+    with pytest.raises(ValueError):
+        asyncio.run(queue.enqueue('missing', {}))
+
+def test_durable_jobs_are_acknowledged_and_recovered():
+    """Durable jobs are deleted once done; jobs with an expired lease are picked up again."""
+    collection = mongomock.MongoClient()['test']['job_queue']
+    seen = []
+    
+    async def handler(payload):
+        seen.append(payload['value'])
+    
+    async def scenario():
+        queue = JobQueue(workers=1, durable=True, poll_seconds=0.02)
+        queue._open_collection = lambda: collection
+        queue.register('record', handler)
+        
+        job_id = await queue.enqueue('record', {'value': 'new'})
+        assert await queue.wait(job_id, timeout=1)
+        assert collection.count_documents({}) == 0
+        
+        # A job claimed by a process that died before finishing it
+        now = datetime.now(timezone.utc)
+        collection.insert_one({
+            '_id': 'orphan',
+            'type': 'record',
+            'payload': {'value': 'orphan'},
+            'attempts': 0,
+            'status': 'processing',
+            'available_at': now - timedelta(minutes=5),
+            'lease_expires_at': now - timedelta(minutes=1)
+        })
+        for _ in range(50):
+            if 'orphan' in seen:
+                break
+            await asyncio.sleep(0.02)
+        await queue.stop()
+    
+    asyncio.run(scenario())
+    assert seen == ['new', 'orphan']
+    assert collection.count_documents({}) == 0
+
+def test_jobs_with_a_key_run_in_order():
+    """Jobs sharing a key run one at a time in enqueue order, even while the first one is retried."""
+    seen = []
+    failures = []
+    
+    async def handler(payload):
+        if payload['value'] == 'first' and len(failures) < 2:
+            failures.append(1)
+            raise RuntimeError("transient")
+        await asyncio.sleep(0.01)
+        seen.append(payload['value'])
+    
+    async def scenario():
+        queue = JobQueue(workers=4, retry_base_seconds=0.02)
+        queue.register('record', handler)
+        job_ids = [
+            await queue.enqueue('record', {'value': value}, key='user-1')
+            for value in ('first', 'second', 'third')
+        ]
+        other = await queue.enqueue('record', {'value': 'other'}, key='user-2')
+        results = [await queue.wait(job_id, timeout=1) for job_id in job_ids + [other]]
+        await queue.stop()
+        return results
+    
+    assert asyncio.run(scenario()) == [True] * 4
+    # The other key was not held up by user-1's retries
+    assert seen == ['other', 'first', 'second', 'third']
@@ -0,0 +1,54 @@
+import threading
+import pytest
+from unittest.mock import Mock
+from src.core import lazy
+from src.core.lazy import LazyService, service_status, warm_up_services
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(lazy, "_registry", [])
+
+class Service:
+    def __init__(self):
+        self.value = 42
+    
+    def double(self):
+        return self.value * 2
+
+def test_construction_is_deferred():
+    """Test that the factory only runs on first attribute access."""
+    factory = Mock(side_effect=Service)
+    service = LazyService("service", factory)
+    assert not service.is_ready
+    factory.assert_not_called()
+    
+    assert service.double() == 84
+    assert service.is_ready
+    service.value = 1
+    assert service.double() == 2
+    factory.assert_called_once()
+
+def test_concurrent_first_use_builds_once():
+    """Test that racing threads share a single instance."""
+    factory = Mock(side_effect=Service)
+    service = LazyService("service", factory)
+    threads = [threading.Thread(target=service.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    factory.assert_called_once()
+
+def test_warm_up_reports_status():
+    """Test parallel warm-up and failure reporting."""
+    LazyService("healthy", Service)
+    broken = LazyService("broken", Mock(side_effect=RuntimeError("no connection")))
+    pending = LazyService("pending", Service)
+    lazy._registry.remove(pending)
+    
+    assert warm_up_services() == {"healthy": "ready", "broken": "failed"}
+    with pytest.raises(RuntimeError):
+        broken.get()
+    
+    lazy._registry.append(pending)
+    assert service_status()["pending"] == "pending"
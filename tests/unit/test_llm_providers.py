@@ -0,0 +1,128 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+import src.services.llm_providers as llm_providers
+from src.core.config import settings
+from src.core.constants import CHAT_SUMMARY_PROMPT, INGREDIENT_EXTRACTION_PROMPT
+from src.services.llm_providers import GeminiProvider, StubProvider, build_llm_provider
+from src.services.llm_routing import LLMRoute, route_for
+
+def test_gemini_builds_one_model_per_system_instruction():
+    """Each intent's model is built once with its system instruction and reused."""
+    with patch.object(llm_providers, "SYSTEM_INSTRUCTION_SUPPORTED", True), \
+         patch.object(llm_providers.genai, "GenerativeModel") as model_class:
+        model_class.return_value.generate_content.return_value = Mock(text="Hello")
+        provider = GeminiProvider("test-key", "gemini-test")
+
+        assert provider.generate("hi", "Be a chef") == "Hello"
+        assert provider.generate("hi again", "Be a chef") == "Hello"
+        provider.generate("hi", None)
+
+        assert model_class.call_count == 2
+        model_class.assert_any_call("gemini-test", system_instruction="Be a chef")
+        model_class.assert_any_call("gemini-test")
+
+def test_gemini_blocked_response_is_empty():
+    """The SDK raises on .text for blocked candidates; that surfaces as an empty answer."""
+    blocked = Mock()
+    type(blocked).text = property(lambda self: (_ for _ in ()).throw(ValueError("blocked")))
+    with patch.object(llm_providers.genai, "GenerativeModel") as model_class:
+        model_class.return_value.generate_content.return_value = blocked
+        assert GeminiProvider("test-key", "gemini-test").generate("hi") == ""
+
+def test_gemini_requires_a_key():
+    with pytest.raises(ValueError):
+        GeminiProvider("", "gemini-test")
+
+def test_stub_answers_by_prompt_kind():
+    """Built-in templates cover chat, classification, extraction and summaries; configured ones win."""
+    stub = StubProvider(responses={r"price of (?P<item>\w+)": "{item} is $2"}, latency_ms=0, tokens_per_second=0)
+
+    assert stub.generate("User Message: What's the price of tomatoes?") == "tomatoes is $2"
+    assert '"Tips for dinner"' in stub.generate("Chat History:\nNone\n\nUser Message: Tips for dinner")
+    assert stub.generate(INGREDIENT_EXTRACTION_PROMPT + "User: pasta") == "[]"
+    summary = stub.generate(CHAT_SUMMARY_PROMPT.format(max_words=10, summary="", conversation=""))
+    assert summary.startswith("The user has been")
+    assert stub.generate("Categorize: You are an AI assistant that categorizes user messages") == "Others"
+
+def test_stub_latency_and_token_rate():
+    stub = StubProvider(latency_ms=50, latency_distribution="fixed", tokens_per_second=100)
+    answer = stub.answer("User Message: hi")
+
+    started_at = time.perf_counter()
+    stub.generate("User Message: hi")
+    elapsed = time.perf_counter() - started_at
+    # 50ms to the first token, then the answer at 100 tokens per second
+    assert elapsed >= 0.05 + (len(answer) // 4) / 100 - 0.01
+
+    async def collect():
+        chunks = await stub.stream_async("User Message: hi")
+        return [chunk async for chunk in chunks]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == answer
+
+def test_stub_latency_draws_are_seeded():
+    first = StubProvider(latency_ms=800, latency_spread=0.5, seed=7)
+    second = StubProvider(latency_ms=800, latency_spread=0.5, seed=7)
+    draws = [first._draw()[0] for _ in range(200)]
+
+    assert draws == [second._draw()[0] for _ in range(200)]
+    assert 0.6 < sorted(draws)[100] < 1.0  # Median near 800ms
+    assert StubProvider(latency_ms=100, latency_distribution="fixed")._draw() == (0.1, False)
+    with pytest.raises(ValueError):
+        StubProvider(latency_distribution="pareto")
+
+def test_stub_error_rate():
+    stub = StubProvider(latency_ms=0, tokens_per_second=0, error_rate=1.0)
+    with pytest.raises(ConnectionError):
+        asyncio.run(stub.generate_async("User Message: hi"))
+
+def test_incomplete_provider_cannot_be_created():
+    """A provider must implement every generation method before it can be built."""
+    class SyncOnlyProvider(llm_providers.LLMProvider):
+        def generate(self, prompt, system_instruction=None, route=None):
+            return "Others"
+
+    with pytest.raises(TypeError):
+        SyncOnlyProvider()
+
+def test_provider_is_selected_by_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "stub")
+    assert isinstance(build_llm_provider(), StubProvider)
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "unknown")
+    with pytest.raises(ValueError):
+        build_llm_provider()
+
+def test_gemini_uses_the_routed_model_and_config():
+    route = LLMRoute("Others", "gemini-flash-test", {"max_output_tokens": 64})
+    with patch.object(llm_providers.genai, "GenerativeModel") as model_class:
+        model_class.return_value.generate_content.return_value = Mock(text="Hello")
+        provider = GeminiProvider("test-key", "gemini-test")
+
+        provider.generate("hi", route=route)
+        provider.generate("hi again", route=route)
+        provider.generate("hi")
+
+        assert model_class.call_count == 2
+        model_class.assert_any_call("gemini-flash-test")
+        model_class.return_value.generate_content.assert_any_call("hi", generation_config={"max_output_tokens": 64})
+        model_class.return_value.generate_content.assert_called_with("hi", generation_config=None)
+
+def test_stub_honours_max_output_tokens():
+    stub = StubProvider(latency_ms=0, tokens_per_second=0)
+    answer = stub.generate("User Message: hi", route=LLMRoute("Others", "stub", {"max_output_tokens": 5}))
+    assert 0 < len(answer) <= 20
+
+def test_routes_resolve_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTES", {
+        "Recipe type": {"model": "gemini-pro-test", "temperature": 0.7},
+        "Others": {"max_output_tokens": 32, "safety": "off"}
+    })
+    assert route_for("Recipe type") == LLMRoute("Recipe type", "gemini-pro-test", {"temperature": 0.7})
+    assert route_for("extraction") == LLMRoute("extraction", settings.GEMINI_MODEL_NAME, {})
+    with pytest.raises(ValueError):
+        route_for("Others")
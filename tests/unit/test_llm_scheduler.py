@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+import pytest
+from google.api_core import exceptions as google_exceptions
+from src.core.metrics import metrics
+from src.services.llm_scheduler import LLMScheduler, Priority, SchedulerOverloadedError, TokenBucket
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(per_minute=60, clock=lambda: now[0])
+
+    assert bucket.wait_time(60) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    now[0] = 2.0
+    assert bucket.wait_time(2) == 0
+    # Oversized requests only need a full bucket
+    assert bucket.wait_time(1000) == pytest.approx(58.0)
+    assert TokenBucket(per_minute=0).wait_time(10 ** 9) == 0
+
+def test_concurrency_is_bounded():
+    scheduler = LLMScheduler(max_concurrency=3)
+    running, peak = [0], [0]
+
+    async def call():
+        async with scheduler.slot_async(Priority.INTERACTIVE):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+    async def run_all():
+        await asyncio.gather(*[call() for _ in range(20)])
+
+    asyncio.run(run_all())
+    assert peak[0] == 3
+    assert scheduler.depth() == 0
+
+def test_waiters_are_served_by_priority():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    async def call(priority, name):
+        async with scheduler.slot_async(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def run_all():
+        async with scheduler.slot_async(Priority.INTERACTIVE):
+            tasks = [
+                asyncio.create_task(call(Priority.BACKGROUND, "extraction")),
+                asyncio.create_task(call(Priority.CLASSIFICATION, "classification")),
+                asyncio.create_task(call(Priority.INTERACTIVE, "chat"))
+            ]
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run_all())
+    assert order == ["chat", "classification", "extraction"]
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def run_all():
+        async with scheduler.slot_async(Priority.INTERACTIVE):
+            with pytest.raises(asyncio.TimeoutError):
+                async with scheduler.slot_async(Priority.INTERACTIVE, timeout=0.01):
+                    pass
+        async with scheduler.slot_async(Priority.INTERACTIVE, timeout=0.1):
+            return True
+
+    assert asyncio.run(run_all())
+
+def test_cancelled_waiters_do_not_fill_the_queue():
+    """Waiters that gave up free their queue place even before dispatch drops them."""
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=2)
+
+    async def run_all():
+        async with scheduler.slot_async(Priority.INTERACTIVE):
+            for _ in range(3):
+                with pytest.raises(asyncio.TimeoutError):
+                    async with scheduler.slot_async(Priority.BACKGROUND, timeout=0.01):
+                        pass
+            assert scheduler.depth() == 0
+            waiters = [asyncio.create_task(run_one()) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            assert scheduler.depth() == 2
+            with pytest.raises(SchedulerOverloadedError):
+                async with scheduler.slot_async(Priority.INTERACTIVE):
+                    pass
+            waiters[0].cancel()
+            await asyncio.sleep(0.01)
+            assert scheduler.depth() == 1
+            waiters.append(asyncio.create_task(run_one()))
+            await asyncio.sleep(0.01)
+        return await asyncio.gather(*waiters[1:])
+
+    async def run_one():
+        async with scheduler.slot_async(Priority.INTERACTIVE):
+            return True
+
+    assert asyncio.run(run_all()) == [True, True]
+    assert scheduler.depth() == 0
+
+def test_quota_error_throttles_following_calls():
+    """A provider quota rejection is counted and drains the request bucket for every caller."""
+    scheduler = LLMScheduler(max_concurrency=4, requests_per_minute=600)
+    before = metrics.snapshot()["counters"].get("llm_quota_rejections_total", 0)
+
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        with scheduler.slot(Priority.INTERACTIVE):
+            raise google_exceptions.ResourceExhausted("quota")
+
+    started_at = time.perf_counter()
+    with scheduler.slot(Priority.INTERACTIVE, timeout=1):
+        waited = time.perf_counter() - started_at
+
+    assert waited >= 0.08  # One request refills every 0.1s at 600/minute
+    assert metrics.snapshot()["counters"]["llm_quota_rejections_total"] - before == 1
+
+def test_blocking_caller_times_out():
+    scheduler = LLMScheduler(max_concurrency=1)
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot(Priority.BACKGROUND):
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    with pytest.raises(SchedulerOverloadedError):
+        with scheduler.slot(Priority.INTERACTIVE, timeout=0.01):
+            pass
+    release.set()
+    thread.join()
+
+    with scheduler.slot(Priority.INTERACTIVE, timeout=0.1):
+        pass
@@ -1,5 +1,6 @@
 import pytest
 from src.services.message_classifier import MessageClassifier
+from src.services.rule_classifier import RuleClassifier
 from src.core.constants import CATEGORIES, CATEGORY_EXAMPLES
 
 @pytest.fixture
@@ -41,4 +42,30 @@ def test_get_category_examples(classifier):
         assert isinstance(examples, list)
         assert len(examples) > 0
         assert all(isinstance(example, str) for example in examples)
-        assert examples == CATEGORY_EXAMPLES[category] 
\ No newline at end of file
+        assert examples == CATEGORY_EXAMPLES[category]
+
+def test_single_pass_matches_per_category_scores(classifier):
+    """Test that the batched forward pass reproduces the per-category pipeline scores."""
+    for examples in CATEGORY_EXAMPLES.values():
+        for message in examples[:2]:
+            classifier.bart_mode = "single_pass"
+            batched = classifier.score_message(message)
+            classifier.bart_mode = "per_category"
+            per_category = classifier.score_message(message)
+            
+            assert set(batched) == set(CATEGORIES)
+            for category in CATEGORIES:
+                assert batched[category] == pytest.approx(per_category[category], abs=1e-4)
+
+def test_classification_tiers(classifier):
+    """Test that results report which tier decided them."""
+    classifier.rules = RuleClassifier()
+    
+    result = classifier.classify_with_details("Add oat milk to my shopping list")
+    assert result["category"] == "Item Addition type"
+    assert result["tier"] == "rules"
+    
+    result = classifier.classify_with_details("Any ideas for a light dinner tonight?")
+    assert result["tier"] == "bart"
+    
+    assert classifier.classify_with_details("")["tier"] == "invalid"
@@ -0,0 +1,36 @@
+import pytest
+from src.core.metrics import MetricsRegistry
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(max_samples=100)
+
+def test_counters_and_gauges(registry):
+    """Test counter increments and gauge updates, including labels."""
+    registry.increment("requests_total")
+    registry.increment("requests_total", 2)
+    registry.increment("requests_total", tier="rules")
+    registry.set_gauge("queue_depth", 7)
+    
+    assert registry.get_counter("requests_total") == 3
+    assert registry.get_counter("requests_total", tier="rules") == 1
+    assert registry.get_gauge("queue_depth") == 7
+    
+    snapshot = registry.snapshot()
+    assert snapshot["counters"]["requests_total{tier=rules}"] == 1
+    assert snapshot["gauges"]["queue_depth"] == 7
+
+def test_histograms(registry):
+    """Test histogram summaries and percentiles."""
+    for value in range(1, 101):
+        registry.observe("latency_ms", value)
+    
+    summary = registry.snapshot()["histograms"]["latency_ms"]
+    assert summary["count"] == 100
+    assert summary["mean"] == pytest.approx(50.5)
+    assert summary["max"] == 100
+    assert registry.percentile("latency_ms", 50) == pytest.approx(50.5)
+    assert registry.percentile("missing", 95) == 0.0
+    
+    registry.reset()
+    assert registry.snapshot() == {"counters": {}, "gauges": {}, "histograms": {}}
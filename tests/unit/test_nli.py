@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from src.core.constants import CATEGORY_HYPOTHESIS_TEMPLATES
+from src.services.nli import category_scores, entailment_ids, entailment_probabilities, hypothesis_pairs
+
+def test_hypothesis_pairs_are_message_major():
+    """Test that each message is paired with every category hypothesis in order."""
+    premises, hypotheses = hypothesis_pairs(["first", "second"])
+    categories = list(CATEGORY_HYPOTHESIS_TEMPLATES)
+    
+    assert premises == ["first"] * len(categories) + ["second"] * len(categories)
+    assert hypotheses[0] == CATEGORY_HYPOTHESIS_TEMPLATES[categories[0]].format(categories[0])
+    assert hypotheses[len(categories)] == hypotheses[0]
+
+def test_entailment_ids():
+    """Test locating the entailment and contradiction logits."""
+    assert entailment_ids({"contradiction": 0, "neutral": 1, "entailment": 2}) == (2, 0)
+    assert entailment_ids({"ENTAILMENT": 0, "neutral": 1, "contradiction": 2}) == (0, -1)
+
+def test_category_scores():
+    """Test the two-way softmax and reshaping into per-message dicts."""
+    categories = list(CATEGORY_HYPOTHESIS_TEMPLATES)
+    logits = np.zeros((2 * len(categories), 3))
+    logits[0] = [0.0, 5.0, np.log(3.0)]  # neutral logit is ignored
+    
+    probabilities = entailment_probabilities(logits, 2, 0)
+    assert probabilities[0] == pytest.approx(0.75)
+    assert probabilities[1] == pytest.approx(0.5)
+    
+    scores = category_scores(logits, 2, 2, 0)
+    assert len(scores) == 2
+    assert scores[0][categories[0]] == pytest.approx(0.75)
+    assert scores[1] == {category: pytest.approx(0.5) for category in categories}
@@ -0,0 +1,24 @@
+import os
+import pytest
+from src.core.config import settings
+from src.core.constants import CATEGORY_CONFIDENCE_THRESHOLDS
+from src.services.onnx_classifier import INT8_MODEL_FILE, OnnxNLIClassifier, verify_parity
+
+@pytest.fixture(scope="module")
+def onnx_classifier():
+    pytest.importorskip("onnxruntime")
+    if not os.path.exists(os.path.join(settings.ONNX_MODEL_DIR, INT8_MODEL_FILE)):
+        pytest.skip("Quantized model not exported; run scripts/export_onnx_classifier.py")
+    return OnnxNLIClassifier(settings.ONNX_MODEL_DIR)
+
+def test_missing_model_directory(tmp_path):
+    """Test that a helpful error is raised before the model is exported."""
+    pytest.importorskip("onnxruntime")
+    with pytest.raises(FileNotFoundError):
+        OnnxNLIClassifier(str(tmp_path))
+
+def test_parity_with_pytorch(onnx_classifier):
+    """Test that the quantized model makes the same decisions on the category examples."""
+    report = verify_parity(onnx_classifier, CATEGORY_CONFIDENCE_THRESHOLDS)
+    assert report["decision_agreement"] == 1.0
+    assert report["max_score_difference"] < 0.1
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import mongomock
+import pytest
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.services.response_cache import ResponseCache
+
+HISTORY = [{"role": "user", "message": "Hi"}, {"role": "assistant", "message": "Hello!"}]
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_TTL_SECONDS", {"Item Information type": 60, "Recipe type": 60})
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_HISTORY_INDEPENDENT", ["Item Information type"])
+
+def test_key_normalizes_message_and_preferences():
+    cache = ResponseCache()
+    key = cache.key_for("What's the price of tomatoes?", None, "Item Information type", {"diet": "vegan", "budget": "not_set"})
+
+    assert key == cache.key_for("what's the PRICE of tomatoes", None, "Item Information type", {"diet": "vegan"})
+    assert key != cache.key_for("What's the price of tomatoes?", None, "Item Information type", {"diet": "vegetarian"})
+    assert key != cache.key_for("What's the price of tomatoes?", None, "Recipe type", {"diet": "vegan"})
+
+def test_key_bypass_rules(monkeypatch):
+    """Uncached intents and history-dependent requests get no key."""
+    cache = ResponseCache()
+
+    assert cache.key_for("Add milk", None, "Item Addition type", None) is None
+    # Recipes depend on the conversation once there is one
+    assert cache.key_for("How do I make pasta?", None, "Recipe type", None) is not None
+    assert cache.key_for("How do I make pasta?", HISTORY, "Recipe type", None) is None
+    # Item questions do not, unless they refer back to earlier turns
+    assert cache.key_for("What's the price of tomatoes?", HISTORY, "Item Information type", None) is not None
+    assert cache.key_for("How much does that cost?", HISTORY, "Item Information type", None) is None
+
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", False)
+    assert cache.key_for("What's the price of tomatoes?", None, "Item Information type", None) is None
+
+def test_memory_hit_records_saved_latency():
+    cache = ResponseCache()
+    key = cache.key_for("What's the price of tomatoes?", None, "Item Information type", None)
+    saved_key = "response_cache_saved_latency_ms_total{intent=Item Information type}"
+    saved_before = metrics.snapshot()["counters"].get(saved_key, 0)
+
+    assert cache.get(key, "Item Information type") is None
+    cache.set(key, "Item Information type", "About $2 per pound.", latency_ms=850.0)
+    assert cache.get(key, "Item Information type") == "About $2 per pound."
+
+    assert cache.stats()["hit_ratio"] == 0.5
+    assert metrics.snapshot()["counters"][saved_key] - saved_before == 850.0
+
+def test_shared_tier_is_used_across_processes():
+    """An entry written by one process is found by another, and expired documents are ignored."""
+    collection = mongomock.MongoClient()['test']['response_cache']
+    writer, reader = ResponseCache(shared=True), ResponseCache(shared=True)
+    writer._collection = reader._collection = collection
+    key = writer.key_for("What's the price of tomatoes?", None, "Item Information type", None)
+
+    asyncio.run(writer.set_async(key, "Item Information type", "About $2 per pound.", latency_ms=500.0))
+    assert collection.find_one({'_id': key})['expires_at'] > datetime.now(timezone.utc).replace(tzinfo=None)
+    assert asyncio.run(reader.get_async(key, "Item Information type")) == "About $2 per pound."
+
+    other = writer.key_for("What's the price of onions?", None, "Item Information type", None)
+    collection.insert_one({
+        '_id': other,
+        'response': "stale",
+        'latency_ms': 500.0,
+        'expires_at': datetime.now(timezone.utc) - timedelta(seconds=1)
+    })
+    assert reader.get(other, "Item Information type") is None
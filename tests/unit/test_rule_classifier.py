@@ -0,0 +1,55 @@
+import pytest
+from src.core.constants import CATEGORY_EXAMPLES
+from src.services.message_classifier import classify_fast
+from src.services.rule_classifier import RuleClassifier
+
+@pytest.fixture
+def rules():
+    return RuleClassifier()
+
+def test_examples_match_exactly(rules):
+    """Test that every labelled example resolves to its category."""
+    for category, examples in CATEGORY_EXAMPLES.items():
+        for example in examples:
+            assert rules.classify(example) == (category, RuleClassifier.EXACT_CONFIDENCE)
+
+def test_patterns(rules):
+    """Test the curated patterns on unseen messages."""
+    assert rules.classify("Recipe for lasagna")[0] == "Recipe type"
+    assert rules.classify("how can I bake banana bread?")[0] == "Recipe type"
+    assert rules.classify("Please add onions and garlic to my shopping list")[0] == "Item Addition type"
+    assert rules.classify("What is the price of apples?")[0] == "Item Information type"
+    assert rules.classify("Remove the butter from my cart")[0] == "Update Cart type"
+    assert rules.classify("Hey there!")[0] == "Others"
+
+def test_leading_keywords_are_derived_from_examples(rules):
+    """Test that first words unique to one category become keyword rules."""
+    assert rules.leading_keywords == {"add": "Item Addition type", "remove": "Update Cart type"}
+    assert rules.classify("add oat milk to my list please") == ("Item Addition type", RuleClassifier.KEYWORD_CONFIDENCE)
+    # Without list or cart context the verb says nothing about the cart
+    assert rules.classify("add oat milk") is None
+    
+    # A keyword match is only a hint: the fast path leaves it to the model
+    assert classify_fast("add oat milk to my list please", None, rules) is None
+    assert classify_fast("Remove the butter from my cart", None, rules)["tier"] == "rules"
+
+def test_misleading_messages_are_not_decided(rules):
+    """Test messages that merely share words with a category are left to the model."""
+    assert rules.classify("Remove the skin before cooking chicken, how long?") is None
+    assert rules.classify("Add salt to taste — how much salt for pasta?") is None
+    assert rules.classify("how do I make my shopping list shorter") is None
+    assert rules.classify("What is the recipe for disaster") is None
+
+def test_ambiguous_messages_defer_to_model(rules):
+    """Test that unknown or conflicting messages are not decided by rules."""
+    assert rules.classify("Tell me something interesting about cheese") is None
+    assert rules.classify("") is None
+    
+    conflicting = RuleClassifier(extra_patterns={"Others": [r"^recipe for"]})
+    assert conflicting.classify("recipe for lasagna") is None
+
+def test_extra_patterns(rules):
+    """Test configuring extra rules."""
+    custom = RuleClassifier(extra_patterns={"Item Information type": [r"\bcalories\b"]})
+    assert rules.classify("calories in an avocado") is None
+    assert custom.classify("calories in an avocado")[0] == "Item Information type"
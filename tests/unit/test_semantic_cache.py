@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from src.core.config import settings
+from src.services.response_cache import ResponseCache
+from src.services.semantic_cache import SemanticIndex
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def test_search_returns_nearest_in_partition():
+    index = SemanticIndex(dimensions=3, max_entries=10)
+    index.add(_unit(1, 0, 0), partition=1, value="pancakes", ttl_seconds=60)
+    index.add(_unit(0, 1, 0), partition=1, value="waffles", ttl_seconds=60)
+    index.add(_unit(1, 0.1, 0), partition=2, value="other profile", ttl_seconds=60)
+
+    value, similarity = index.search(_unit(1, 0.2, 0), partition=1, threshold=0.9)
+    assert value == "pancakes"
+    assert similarity == pytest.approx(0.98, abs=0.01)
+    assert index.search(_unit(0, 0, 1), partition=1, threshold=0.9) is None
+    assert index.search(_unit(1, 0, 0), partition=3, threshold=0.5) is None
+
+def test_oldest_entries_are_evicted_and_expired_ones_ignored():
+    now = [0.0]
+    index = SemanticIndex(dimensions=2, max_entries=10, max_entries_per_partition=2, clock=lambda: now[0])
+    index.add(_unit(1, 0), partition=1, value="first", ttl_seconds=60)
+    index.add(_unit(0, 1), partition=1, value="second", ttl_seconds=10)
+    index.add(_unit(1, 1), partition=1, value="third", ttl_seconds=60)
+
+    assert len(index) == 2
+    assert index.search(_unit(1, 0), partition=1, threshold=0.99) is None
+    assert index.search(_unit(0, 1), partition=1, threshold=0.99)[0] == "second"
+
+    now[0] = 11.0
+    assert index.search(_unit(0, 1), partition=1, threshold=0.99) is None
+
+def test_least_recently_used_partition_is_dropped():
+    index = SemanticIndex(dimensions=2, max_entries=3, max_entries_per_partition=2)
+    index.add(_unit(1, 0), partition="a", value="a1", ttl_seconds=60)
+    index.add(_unit(1, 0), partition="b", value="b1", ttl_seconds=60)
+    index.search(_unit(1, 0), partition="a", threshold=0.5)
+    index.add(_unit(0, 1), partition="c", value="c1", ttl_seconds=60)
+    index.add(_unit(1, 1), partition="c", value="c2", ttl_seconds=60)
+
+    assert len(index) == 3
+    assert index.search(_unit(1, 0), partition="b", threshold=0.5) is None
+    assert index.search(_unit(1, 0), partition="a", threshold=0.5)[0] == "a1"
+
+def test_partition_grows_past_initial_capacity():
+    index = SemanticIndex(dimensions=2, max_entries=1000, max_entries_per_partition=500)
+    for i in range(300):
+        index.add(_unit(1, i / 300), partition=1, value=i, ttl_seconds=60)
+    assert len(index) == 300
+    assert index.search(_unit(1, 0), partition=1, threshold=0.99)[0] == 0
+
+def test_paraphrase_reuses_cached_answer(monkeypatch):
+    """An exact miss falls through to the semantic tier for the same intent and preferences only."""
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_THRESHOLD", 0.7)
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_TTL_SECONDS", {"Recipe type": 60})
+    vocabulary = ["pancake", "waffle"]
+
+    def encode(messages):
+        rows = []
+        for message in messages:
+            words = message.lower()
+            row = np.array([float(word in words) for word in vocabulary], dtype=np.float32) + 1e-3
+            rows.append(row / np.linalg.norm(row))
+        return np.stack(rows)
+
+    cache = ResponseCache()
+    cache._encoder = encode
+    cache._semantic_index = SemanticIndex(dimensions=len(vocabulary), max_entries=100)
+
+    key = cache.key_for("How do I make pancakes?", None, "Recipe type", {"diet": "vegan"})
+    assert cache.get(key, "Recipe type", "How do I make pancakes?", {"diet": "vegan"}) is None
+    cache.set(key, "Recipe type", "Mix flour, milk and eggs...", 900.0, "How do I make pancakes?", {"diet": "vegan"})
+
+    paraphrase = "Pancake recipe please"
+    other_key = cache.key_for(paraphrase, None, "Recipe type", {"diet": "vegan"})
+    assert cache.get(other_key, "Recipe type", paraphrase, {"diet": "vegan"}) == "Mix flour, milk and eggs..."
+    assert cache.get(other_key, "Recipe type", paraphrase, {"diet": "keto"}) is None
+    waffle_key = cache.key_for("Waffle recipe please", None, "Recipe type", {"diet": "vegan"})
+    assert cache.get(waffle_key, "Recipe type", "Waffle recipe please", {"diet": "vegan"}) is None
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.core.metrics import metrics
+from src.core.single_flight import SingleFlight
+
+def _coalesced(name):
+    return metrics.snapshot()["counters"].get(f"coalesced_calls_total{{flight={name}}}", 0)
+
+def test_async_callers_share_one_call():
+    """Concurrent callers with the same key share the result; other keys run separately."""
+    flight = SingleFlight("test_async")
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return f"result {key}"
+
+    async def run_all():
+        return await asyncio.gather(
+            *[flight.do_async("a", lambda: fetch("a")) for _ in range(10)],
+            flight.do_async("b", lambda: fetch("b"))
+        )
+
+    before = _coalesced("test_async")
+    results = asyncio.run(run_all())
+
+    assert results == ["result a"] * 10 + ["result b"]
+    assert calls == ["a", "b"]
+    assert _coalesced("test_async") - before == 9
+    assert flight.in_flight() == 0
+
+def test_async_error_is_shared_and_not_remembered():
+    """Every waiter gets the error, and the next call after it runs again."""
+    flight = SingleFlight("test_async_error")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+
+    async def run_all():
+        return await asyncio.gather(*[flight.do_async("a", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run_all())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 1
+
+    asyncio.run(run_all())
+    assert len(calls) == 2
+
+def test_cancelled_caller_leaves_call_running():
+    """A caller timing out does not cancel the call other callers are waiting for."""
+    flight = SingleFlight("test_cancel")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run_all():
+        impatient = asyncio.wait_for(flight.do_async("a", slow), 0.01)
+        patient = flight.do_async("a", slow)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(run_all())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == "done"
+
+def test_threads_share_one_call():
+    flight = SingleFlight("test_sync")
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("a", fetch)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("a", fetch))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert results == ["result"] * 6
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        flight.do("b", lambda: (_ for _ in ()).throw(ValueError("upstream")))
+    assert flight.in_flight() == 0